@@ -1,23 +1,22 @@
+import json
 from datetime import datetime
 
-from flask import Flask, jsonify, request
+import numpy as np
+from flask import Flask, jsonify, request, stream_with_context
 from flask_cors import CORS
 
 from config import Config
-from services.traffic_service import TrafficService
-from services.commute_service import CommuteService
-from services.notification_service import NotificationService
-from services.ml_service import MLService
+from services import aio, registry
 
 app = Flask(__name__)
 CORS(app)
 app.config.from_object(Config)
 
-# Service singletons
-traffic_service = TrafficService()
-commute_service = CommuteService()
-notification_service = NotificationService()
-ml_service = MLService()
+# FIX: Services come from the registry instead of being built at import.
+# WHY: Importing app used to build two TrafficServices, the timetable and
+#      train the ML model — in every gunicorn worker. Now each service is
+#      built once on first use, or once in the master when preloaded
+#      (gunicorn.conf.py) and shared copy-on-write by all workers.
 
 
 # ---------------------------------------------------------------------------
@@ -25,14 +24,25 @@ ml_service = MLService()
 # ---------------------------------------------------------------------------
 @app.route('/health', methods=['GET'])
 def health_check():
-    return jsonify({'status': 'healthy', 'service': 'NikLo Backend'}), 200
+    # 'degraded' = still serving, but road times are Haversine estimates
+    traffic_service = registry.get('traffic')
+    return jsonify({
+        'status':  'degraded' if traffic_service.degraded() else 'healthy',
+        'service': 'NikLo Backend',
+        'traffic': traffic_service.stats(),
+    }), 200
 
 
 # ---------------------------------------------------------------------------
 # Raw traffic (utility / debug)
 # ---------------------------------------------------------------------------
+# FIX: The traffic endpoints are async views awaiting the shared event loop.
+# WHY: They are pure upstream I/O. The request thread only waits; the
+#      calls themselves are multiplexed with every other request's on the
+#      worker's loop (services/aio.py), so a worker is no longer limited
+#      to one in-flight OSRM/Nominatim call per thread.
 @app.route('/api/traffic', methods=['POST'])
-def get_traffic():
+async def get_traffic():
     data = request.json or {}
     origin = data.get('origin')
     destination = data.get('destination')
@@ -40,15 +50,45 @@ def get_traffic():
     if not origin or not destination:
         return jsonify({'error': 'origin and destination are required'}), 400
 
-    result = traffic_service.get_travel_time(origin, destination)
+    result = await aio.call(
+        registry.get('traffic').get_travel_time_async(origin, destination)
+    )
     if 'error' in result:
         return jsonify(result), 500
     return jsonify(result), 200
 
 
+# ---------------------------------------------------------------------------
+# Travel-time matrix — many origins × many destinations in one call
+# Accepts: origins, destinations (lists of addresses or [lng, lat] pairs)
+# ---------------------------------------------------------------------------
+@app.route('/api/traffic/matrix', methods=['POST'])
+async def get_traffic_matrix():
+    data = request.json or {}
+    origins = data.get('origins')
+    destinations = data.get('destinations')
+
+    if not isinstance(origins, list) or not isinstance(destinations, list) \
+            or not origins or not destinations:
+        return jsonify({'error': 'origins and destinations must be non-empty lists'}), 400
+    if len(origins) > Config.MATRIX_MAX_POINTS or len(destinations) > Config.MATRIX_MAX_POINTS:
+        return jsonify({
+            'error': f'at most {Config.MATRIX_MAX_POINTS} origins and destinations'
+        }), 400
+
+    try:
+        return jsonify(await aio.call(
+            registry.get('traffic').get_travel_time_matrix_async(origins, destinations)
+        )), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 # ---------------------------------------------------------------------------
 # Commute plan
 # Accepts: origin, arrival_time (HH:MM), delay_buffer_mins (optional int)
+# Sweep mode: arrival_from + arrival_to (HH:MM) and step_mins (default 5)
+#             instead of arrival_time → leave-by arrays for every slot.
 # Destination is always hardcoded to KJSCE Vidyavihar on the backend.
 # ---------------------------------------------------------------------------
 @app.route('/api/commute', methods=['POST'])
@@ -66,6 +106,9 @@ def get_commute_plan():
     except (ValueError, TypeError):
         delay_buffer_mins = 0
 
+    if origin and 'arrival_from' in data:
+        return _commute_sweep(data, origin, delay_buffer_mins)
+
     if not origin or not arrival_time:
         return jsonify({'error': 'origin and arrival_time are required'}), 400
 
@@ -76,14 +119,155 @@ def get_commute_plan():
         return jsonify({'error': 'arrival_time must be HH:MM format'}), 400
 
     try:
-        plan = commute_service.calculate_best_route(
+        plan, etag, fresh_for, status = registry.get('commute').cached_best_route(
             origin, arrival_time, delay_buffer_mins
         )
-        return jsonify(plan), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    # FIX: Let the app revalidate repeat taps with If-None-Match.
+    # WHY: An unchanged plan then costs a 304 with no body; stale plans
+    #      are still answered instantly while the server refreshes them.
+    if etag in request.if_none_match:
+        response = app.response_class(status=304)
+    else:
+        response = jsonify(plan)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = (
+        f"private, max-age={int(fresh_for)}, "
+        f"stale-while-revalidate={int(Config.PLAN_CACHE_STALE_SECS)}"
+    )
+    response.headers['X-Cache'] = status.upper()
+    return response
+
+
+def _commute_sweep(data, origin, delay_buffer_mins):
+    arrival_from = data.get('arrival_from')
+    arrival_to = data.get('arrival_to')
+    try:
+        start = datetime.strptime(arrival_from, '%H:%M')
+        end = datetime.strptime(arrival_to, '%H:%M')
+    except (ValueError, TypeError):
+        return jsonify({'error': 'arrival_from and arrival_to must be HH:MM format'}), 400
+    try:
+        step_mins = int(data.get('step_mins', 5))
+    except (ValueError, TypeError):
+        return jsonify({'error': 'step_mins must be an integer'}), 400
+
+    if end < start:
+        return jsonify({'error': 'arrival_to must not be before arrival_from'}), 400
+    if not 1 <= step_mins <= 60:
+        return jsonify({'error': 'step_mins must be between 1 and 60'}), 400
+    if (end - start).seconds // 60 // step_mins + 1 > Config.COMMUTE_SWEEP_MAX_SLOTS:
+        return jsonify({
+            'error': f'at most {Config.COMMUTE_SWEEP_MAX_SLOTS} arrival slots per sweep'
+        }), 400
+
+    try:
+        sweep = registry.get('commute').calculate_sweep(
+            origin, arrival_from, arrival_to, step_mins, delay_buffer_mins
+        )
+        return jsonify(sweep), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+# ---------------------------------------------------------------------------
+# Streaming commute plan — same inputs as /api/commute
+# Emits estimate → road → hybrid… → final as Server-Sent Events, or as
+# NDJSON lines ({"event": ..., "data": ...}) with Accept: application/x-ndjson
+# ---------------------------------------------------------------------------
+@app.route('/api/commute/stream', methods=['POST'])
+def stream_commute_plan():
+    data = request.json or {}
+    origin = data.get('origin')
+    arrival_time = data.get('arrival_time')
+    try:
+        delay_buffer_mins = max(0, min(60, int(data.get('delay_buffer_mins', 0))))
+    except (ValueError, TypeError):
+        delay_buffer_mins = 0
+
+    if not origin or not arrival_time:
+        return jsonify({'error': 'origin and arrival_time are required'}), 400
+    try:
+        datetime.strptime(arrival_time, '%H:%M')
+    except ValueError:
+        return jsonify({'error': 'arrival_time must be HH:MM format'}), 400
+
+    ndjson = request.accept_mimetypes.best_match(
+        ['text/event-stream', 'application/x-ndjson']
+    ) == 'application/x-ndjson'
+
+    def _frame(event, payload):
+        if ndjson:
+            return json.dumps({'event': event, 'data': payload}) + '\n'
+        return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+    def _events():
+        try:
+            for event, payload in registry.get('commute').stream_best_route(
+                    origin, arrival_time, delay_buffer_mins):
+                yield _frame(event, payload)
+        except Exception as e:
+            yield _frame('error', {'error': str(e)})
+
+    response = app.response_class(
+        stream_with_context(_events()),
+        mimetype='application/x-ndjson' if ndjson else 'text/event-stream',
+    )
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'      # don't let a proxy buffer it
+    return response
+
+
+# ---------------------------------------------------------------------------
+# Batch commute plans — many users in one call
+# Accepts: requests, a list of {origin, arrival_time, delay_buffer_mins?}
+# Returns: results in the same order; a bad entry gets {'error': ...}
+# ---------------------------------------------------------------------------
+@app.route('/api/commute/batch', methods=['POST'])
+def get_commute_plans():
+    data = request.json or {}
+    items = data.get('requests')
+
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'requests must be a non-empty list'}), 400
+    if len(items) > Config.COMMUTE_BATCH_MAX_ITEMS:
+        return jsonify({
+            'error': f'at most {Config.COMMUTE_BATCH_MAX_ITEMS} requests per batch'
+        }), 400
+
+    results = [None] * len(items)
+    valid, positions = [], []
+    for i, item in enumerate(items):
+        item = item if isinstance(item, dict) else {}
+        origin = item.get('origin')
+        arrival_time = item.get('arrival_time')
+        try:
+            delay_buffer_mins = max(0, min(60, int(item.get('delay_buffer_mins', 0))))
+        except (ValueError, TypeError):
+            delay_buffer_mins = 0
+
+        if not isinstance(origin, str) or not origin.strip() or not arrival_time:
+            results[i] = {'error': 'origin and arrival_time are required'}
+            continue
+        try:
+            datetime.strptime(arrival_time, '%H:%M')
+        except (ValueError, TypeError):
+            results[i] = {'error': 'arrival_time must be HH:MM format'}
+            continue
+        valid.append((origin, arrival_time, delay_buffer_mins))
+        positions.append(i)
+
+    try:
+        plans = registry.get('commute').calculate_batch(valid) if valid else []
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    for i, plan in zip(positions, plans):
+        results[i] = plan
+    return jsonify({'results': results}), 200
+
+
 # ---------------------------------------------------------------------------
 # ML prediction
 # ---------------------------------------------------------------------------
@@ -106,7 +290,7 @@ def predict_commute():
         day_int = int(day)
         if not (0 <= day_int <= 6):
             return jsonify({'error': 'day_of_week must be 0 (Mon) to 6 (Sun)'}), 400
-        prediction = ml_service.predict_commute_time(dt.hour, dt.minute, day_int)
+        prediction = registry.get('ml').predict_commute_time(dt.hour, dt.minute, day_int)
         return jsonify({'predicted_duration_mins': prediction}), 200
     except ValueError:
         return jsonify({'error': 'time must be HH:MM format'}), 400
@@ -114,6 +298,92 @@ def predict_commute():
         return jsonify({'error': str(e)}), 500
 
 
+# ---------------------------------------------------------------------------
+# Batch ML prediction — every day × every time in one call
+# Accepts: times  — list of "HH:MM", or {"from": "HH:MM", "to": "HH:MM",
+#                   "step_mins": 5} (inclusive)
+#          days   — list of 0=Mon … 6=Sun, or {"from": 0, "to": 6};
+#                   all seven if omitted
+# Returns: predicted_duration_mins[day][time]
+# ---------------------------------------------------------------------------
+@app.route('/api/predict/batch', methods=['POST'])
+def predict_commute_batch():
+    data = request.json or {}
+    try:
+        minutes = _minutes_of_day(data.get('times'))
+        days = _days_of_week(data.get('days', {'from': 0, 'to': 6}))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if len(minutes) * len(days) > Config.PREDICT_BATCH_MAX_CELLS:
+        return jsonify({
+            'error': f'at most {Config.PREDICT_BATCH_MAX_CELLS} predictions per batch'
+        }), 400
+
+    try:
+        predictions = registry.get('ml').predict_batch(days, minutes)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    return jsonify({
+        'times': [f"{m // 60:02d}:{m % 60:02d}" for m in minutes.tolist()],
+        'days':  days.tolist(),
+        'predicted_duration_mins':
+            None if predictions is None else np.round(predictions.astype(float), 2).tolist(),
+    }), 200
+
+
+def _minutes_of_day(times):
+    """``times`` (list of "HH:MM" or a from/to/step_mins range) → int array of minutes."""
+    if isinstance(times, dict):
+        try:
+            start, end = (datetime.strptime(times[k], '%H:%M') for k in ('from', 'to'))
+            step = int(times.get('step_mins', 5))
+        except (KeyError, ValueError, TypeError):
+            raise ValueError('times range needs from/to as HH:MM and an integer step_mins')
+        if not 1 <= step <= 60:
+            raise ValueError('step_mins must be between 1 and 60')
+        if end < start:
+            raise ValueError('times.to must not be before times.from')
+        return np.arange(start.hour * 60 + start.minute, end.hour * 60 + end.minute + 1, step)
+
+    if not isinstance(times, list) or not times \
+            or len(times) > Config.PREDICT_BATCH_MAX_CELLS \
+            or not all(isinstance(t, str) for t in times):
+        raise ValueError('times must be a non-empty list of HH:MM strings or a range')
+    # One pass over the code points: "HH:MM" with digits around the colon
+    raw = np.array(times, dtype=str)
+    ok = np.char.str_len(raw) == 5
+    codes = raw.astype('<U5').view(np.uint32).reshape(-1, 5)
+    digits = codes[:, [0, 1, 3, 4]] - ord('0')
+    ok &= (codes[:, 2] == ord(':')) & (digits <= 9).all(axis=1)
+    hours = digits[:, 0] * 10 + digits[:, 1]
+    mins = digits[:, 2] * 10 + digits[:, 3]
+    ok &= (hours < 24) & (mins < 60)
+    if not ok.all():
+        bad = times[int(np.argmin(ok))]
+        raise ValueError(f'times must be HH:MM format (got {bad!r})')
+    return (hours * 60 + mins).astype(np.intp)
+
+
+def _days_of_week(days):
+    """``days`` (list of ints or a from/to range) → int array in [0, 6]."""
+    if isinstance(days, dict):
+        try:
+            first, last = int(days['from']), int(days['to'])
+        except (KeyError, ValueError, TypeError, OverflowError):
+            raise ValueError('days range needs integer from/to')
+        # Bounds before range(): {"to": 10**7} would build the list first
+        if not 0 <= first <= last <= 6:
+            raise ValueError('days range needs 0 <= from <= to <= 6')
+        days = list(range(first, last + 1))
+    if not isinstance(days, list) or not days \
+            or not all(isinstance(d, int) and not isinstance(d, bool) for d in days):
+        raise ValueError('days must be a non-empty list of integers or a range')
+    days = np.array(days, dtype=np.intp)
+    if ((days < 0) | (days > 6)).any():
+        raise ValueError('day_of_week must be 0 (Mon) to 6 (Sun)')
+    return days
+
+
 # ---------------------------------------------------------------------------
 # Push notifications
 # ---------------------------------------------------------------------------
@@ -127,7 +397,7 @@ def send_notification():
     if not all([token, title, body]):
         return jsonify({'error': 'token, title, and body are required'}), 400
 
-    result = notification_service.send_push_notification(token, title, body)
+    result = registry.get('notification').send_push_notification(token, title, body)
     return jsonify(result), 200
 
 
@@ -0,0 +1,169 @@
+"""
+Load test: the traffic endpoints on one gunicorn gthread worker with the
+same thread count, upstream calls made by a blocking client in each
+request thread (the path before services/aio.py) vs on the worker's
+shared event loop.
+
+Upstreams are the local stand-in (standin_server.py) with simulated
+latency. Every request is a distinct station pair, so each one costs a
+live OSRM call — no route cache hits, no offline matrix. Matrix requests
+are split into several /table chunks (OSRM_TABLE_MAX_LOCATIONS).
+
+With equal threads a request that makes one upstream call waits the same
+either way, so /api/traffic is capped at threads ÷ latency in both modes;
+the loop pays off when one request fans out into several calls, which it
+issues at once instead of one after another.
+
+    python bench_async_load.py [requests] [concurrency] [upstream_delay_s] [threads]
+"""
+import os
+import sys
+import time
+import socket
+import asyncio
+import tempfile
+import itertools
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import standin_server
+from services.traffic_service import STATION_COORDS
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+MODES = [
+    # label,                   gunicorn app
+    ('blocking client',        'bench_async_load:blocking_app()'),
+    ('shared event loop',      'app:app'),
+]
+TABLE_MAX_LOCATIONS = 10      # a 12 × 8 matrix → 6 /table chunks
+
+
+class _BlockingClient:
+    """AsyncHttpClient's interface over a pooled requests.Session — blocks the thread awaiting it."""
+
+    def __init__(self, client):
+        self.base_url = client.base_url
+        self._session = requests.Session()
+        self._session.headers.update(client.headers)
+        self._session.mount('http://', requests.adapters.HTTPAdapter(
+            pool_maxsize=client.pool_size))
+
+    async def get(self, path, params=None):
+        return self._session.get(f"{self.base_url}{path}", params=params, timeout=(3.05, 10))
+
+
+def blocking_app():
+    """
+    gunicorn app factory: the same app, but every coroutine runs in the
+    request thread's own loop and each upstream call blocks that thread —
+    so a request's calls go out one after another, as they did before.
+    """
+    from app import app
+    from services import aio, traffic_service
+
+    async def call(coro):
+        return await coro
+
+    aio.call = call
+    aio.run = lambda coro, timeout=None: asyncio.run(coro)
+    traffic_service._osrm = _BlockingClient(traffic_service._osrm)
+    traffic_service._nominatim = _BlockingClient(traffic_service._nominatim)
+    return app
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.exceptions.RequestException:
+            time.sleep(0.1)
+    raise RuntimeError(f"gunicorn did not come up at {url}")
+
+
+def _load(url, bodies, concurrency, check):
+    session = requests.Session()
+    session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=concurrency))
+
+    def _one(body):
+        t0 = time.perf_counter()
+        resp = session.post(url, json=body)
+        resp.raise_for_status()
+        check(resp.json())
+        return time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as ex:
+        latencies = sorted(ex.map(_one, bodies))
+    elapsed = time.perf_counter() - t0
+    return len(bodies) / elapsed, latencies[len(latencies) // 2], \
+        latencies[int(len(latencies) * 0.99) - 1]
+
+
+def _check_route(result):
+    assert 'fallback' not in result, result
+
+
+def _check_matrix(result):
+    assert not any(any(row) for row in result['fallback']), result['fallback']
+
+
+def bench(n_requests=400, concurrency=64, delay=0.1, threads=16):
+    server, upstream = standin_server.start(delay=delay)
+    tmp = tempfile.mkdtemp()
+    stations = [name for name in STATION_COORDS if name != 'KJSCE'][:60]
+    pairs = list(itertools.islice(itertools.permutations(stations, 2), n_requests))
+    coords = [STATION_COORDS[name] for name in stations]
+    workloads = [
+        ('/api/traffic', _check_route,
+         [{'origin': a, 'destination': b} for a, b in pairs]),
+        ('/api/traffic/matrix', _check_matrix,
+         [{'origins': coords[i % 40:i % 40 + 12], 'destinations': coords[40 + i % 12:][:8]}
+          for i in range(n_requests // 4)]),
+    ]
+
+    print(f"{n_requests} route / {n_requests // 4} matrix requests, {concurrency} concurrent "
+          f"clients, {delay * 1000:.0f} ms upstream latency, 1 gthread worker × {threads} threads\n")
+    print(f"{'':40}{'req/s':>8}{'p50':>9}{'p99':>9}")
+    try:
+        for label, target in MODES:
+            port = _free_port()
+            env = dict(os.environ, NOMINATIM_BASE_URL=upstream, OSRM_BASE_URL=upstream,
+                       OSRM_POOL_SIZE=str(concurrency),
+                       OSRM_TABLE_MAX_LOCATIONS=str(TABLE_MAX_LOCATIONS),
+                       OFFLINE_MATRIX_PATH=os.path.join(tmp, 'none.npz'),
+                       GEOCODE_DB_PATH=os.path.join(tmp, 'geocode.sqlite3'),
+                       ML_MODEL_PATH=os.path.join(tmp, 'model.joblib'),
+                       TRIP_STORE_PATH=os.path.join(tmp, 'trips'),
+                       PRELOAD_SERVICES='traffic',
+                       GUNICORN_THREADS=str(threads))
+            proc = subprocess.Popen(
+                [sys.executable, '-m', 'gunicorn', target, '-c', 'gunicorn.conf.py',
+                 '--workers', '1', '--bind', f"127.0.0.1:{port}"],
+                cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            try:
+                base = f"http://127.0.0.1:{port}"
+                _wait_ready(f"{base}/health")
+                for path, check, bodies in workloads:
+                    rps, p50, p99 = _load(base + path, bodies, concurrency, check)
+                    print(f"{label + ' ' + path:40}{rps:8.1f}{p50 * 1000:7.0f}ms{p99 * 1000:7.0f}ms")
+            finally:
+                proc.terminate()
+                proc.wait()
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    bench(*(cast(arg) for cast, arg in zip((int, int, float, int), sys.argv[1:])))
@@ -0,0 +1,55 @@
+"""
+Micro-benchmark: per-call requests.get vs the pooled keep-alive
+AsyncHttpClient, driven from a plain thread through services.aio.
+
+Runs against the local stand-in server, so it measures connection setup
+and client overhead only (no TLS — against the real HTTPS upstreams the
+gap is larger, since each new connection also pays a TLS handshake).
+
+    python bench_http_pool.py [N]
+"""
+import sys
+import time
+import statistics
+
+import requests
+
+import standin_server
+from services import aio
+from services.async_http import AsyncHttpClient
+
+
+def _measure(label, call, n):
+    samples = []
+    for i in range(n):
+        t0 = time.perf_counter()
+        resp = call(i)
+        resp.raise_for_status()
+        resp.json()
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    print(f"{label:<28} mean {statistics.mean(samples):6.3f} ms   "
+          f"p50 {samples[len(samples) // 2]:6.3f} ms   "
+          f"p95 {samples[int(len(samples) * 0.95)]:6.3f} ms")
+    return statistics.mean(samples)
+
+
+def bench(n=500):
+    server, base = standin_server.start()
+    path = '/route/v1/driving/72.9615,19.1820;72.9041,19.0712'
+    params = {'overview': 'false', 'steps': 'false'}
+    client = AsyncHttpClient(base, pool_size=4)
+
+    try:
+        print(f"{n} sequential GETs against {base}")
+        plain = _measure('requests.get (new conn)',
+                         lambda i: requests.get(base + path, params=params, timeout=10), n)
+        pooled = _measure('AsyncHttpClient (keep-alive)',
+                          lambda i: aio.run(client.get(path, params=params)), n)
+        print(f"speed-up: {plain / pooled:.2f}x per request")
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
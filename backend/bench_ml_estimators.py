@@ -0,0 +1,92 @@
+"""
+Benchmark: the two ML_ESTIMATOR modes — RandomForest refit vs the online
+EWMA estimator — on update cost and prediction error.
+
+Trips are synthetic: a weekday/weekend base, morning and evening peaks
+and Gaussian noise. Halfway through the stream every commute gets
+DRIFT_MINS slower (roadworks), to show how each model follows a change.
+Error is the mean absolute difference from the noise-free truth of the
+*current* regime, over every minute from 06:00 to 22:00 of every day.
+
+    python bench_ml_estimators.py [n_trips]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from config import Config
+from services.ml_service import MLService
+from services.online_estimator import EwmaEstimator
+
+NOISE_SD = 4.0
+DRIFT_MINS = 10.0
+
+
+def _truth(minute_of_day, day, drift=0.0):
+    base = np.where(day >= 5, 35.0, 45.0)
+    peaks = (20 * np.exp(-((minute_of_day - 540) / 60.0) ** 2)
+             + 25 * np.exp(-((minute_of_day - 1110) / 75.0) ** 2))
+    return base + np.where(day >= 5, 0.4, 1.0) * peaks + drift
+
+
+def _trips(n, rng):
+    day = rng.integers(0, 7, n)
+    minute_of_day = rng.integers(6 * 60, 22 * 60, n)
+    drift = np.where(np.arange(n) >= n // 2, DRIFT_MINS, 0.0)
+    duration = _truth(minute_of_day, day, drift) + rng.normal(0, NOISE_SD, n)
+    return minute_of_day // 60, minute_of_day % 60, day, duration
+
+
+def _mae(table, drift):
+    day, mod = np.meshgrid(np.arange(7), np.arange(6 * 60, 22 * 60), indexing='ij')
+    predicted = table.reshape(7, 1440)[:, 6 * 60:22 * 60]
+    return float(np.abs(predicted - _truth(mod, day, drift)).mean())
+
+
+def _forest_table(hours, minutes, days, durations):
+    model = MLService._new_model()
+    model.fit(pd.DataFrame({'hour': hours, 'minute': minutes, 'day_of_week': days}),
+              durations)
+    return MLService.compile_table(model)
+
+
+def bench(n_trips=4000):
+    rng = np.random.default_rng(42)
+    hours, minutes, days, durations = _trips(n_trips, rng)
+    half = n_trips // 2
+
+    # ── Update cost ───────────────────────────────────────────────────
+    print("Cost of taking one trip into account")
+    for n in (100, 1000, n_trips):
+        t0 = time.perf_counter()
+        _forest_table(hours[:n], minutes[:n], days[:n], durations[:n])
+        print(f"  forest refit on {n:>6} trips   {(time.perf_counter() - t0) * 1000:9.1f} ms")
+
+    estimator = EwmaEstimator(Config.ML_EWMA_BUCKET_MINS, Config.ML_EWMA_HALF_LIFE)
+    rows = list(zip(hours.tolist(), minutes.tolist(), days.tolist(), durations.tolist()))
+    t0 = time.perf_counter()
+    for row in rows:
+        estimator.update(*row)
+    per_update = (time.perf_counter() - t0) / len(rows)
+    print(f"  ewma update (any history)      {per_update * 1e6:9.1f} us")
+
+    # ── Error ─────────────────────────────────────────────────────────
+    print(f"\nMean absolute error vs truth, minutes (noise sd {NOISE_SD})")
+    print(f"  {'':28}{'forest':>8}{'ewma':>8}")
+    for label, end, drift in [(f"before drift ({half} trips)", half, 0.0),
+                              (f"after +{DRIFT_MINS:.0f} min drift ({n_trips})",
+                               n_trips, DRIFT_MINS)]:
+        forest = _forest_table(hours[:end], minutes[:end], days[:end], durations[:end])
+        ewma = EwmaEstimator(Config.ML_EWMA_BUCKET_MINS, Config.ML_EWMA_HALF_LIFE)
+        ewma.fit(hours[:end], minutes[:end], days[:end], durations[:end])
+        print(f"  {label:28}{_mae(forest, drift):8.2f}{_mae(ewma.table, drift):8.2f}")
+
+    state = estimator.mean.nbytes + estimator.weight.nbytes
+    print(f"\newma state: {state / 1024:.1f} KB "
+          f"({Config.ML_EWMA_BUCKET_MINS}-min buckets, half-life {Config.ML_EWMA_HALF_LIFE:g} trips)")
+
+
+if __name__ == '__main__':
+    bench(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,73 @@
+"""
+Benchmark: worker startup — import time and first-request latency, with
+services built lazily on first request vs preloaded (as the gunicorn
+master does before forking).
+
+Each measurement runs in a fresh interpreter so imports are cold. Upstreams
+are the local stand-in (standin_server.py); the geocode cache and ML model
+go to a temp directory.
+
+    python bench_startup.py
+"""
+import os
+import sys
+import json
+import tempfile
+import subprocess
+
+import standin_server
+
+CHILD = r'''
+import json, sys, time
+t0 = time.perf_counter()
+import app
+from config import Config
+from services import registry
+timings = {'import_app': time.perf_counter() - t0}
+
+if sys.argv[1] == 'preload':
+    t0 = time.perf_counter()
+    registry.preload(Config.PRELOAD_SERVICES)
+    timings['preload'] = time.perf_counter() - t0
+
+client = app.app.test_client()
+for name, path, body in [
+    ('commute', '/api/commute', {'origin': 'Andheri', 'arrival_time': '09:30'}),
+    ('predict', '/api/predict', {'time': '08:30', 'day_of_week': 1}),
+    ('health',  '/health', None),
+]:
+    t0 = time.perf_counter()
+    resp = client.post(path, json=body) if body else client.get(path)
+    assert resp.status_code == 200, (path, resp.get_data(as_text=True))
+    timings['first_' + name] = time.perf_counter() - t0
+print(json.dumps(timings))
+'''
+
+
+def _run(mode, env):
+    out = subprocess.run([sys.executable, '-c', CHILD, mode], env=env, check=True,
+                         capture_output=True, text=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)))
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def bench():
+    server, base = standin_server.start()
+    tmp = tempfile.mkdtemp()
+    env = dict(os.environ, NOMINATIM_BASE_URL=base, OSRM_BASE_URL=base,
+               GEOCODE_DB_PATH=os.path.join(tmp, 'geocode.sqlite3'),
+               ML_MODEL_PATH=os.path.join(tmp, 'model.joblib'))
+    try:
+        _run('lazy', env)               # first run trains and saves the model
+        lazy, pre = _run('lazy', env), _run('preload', env)
+    finally:
+        server.shutdown()
+
+    print(f"{'':18}{'lazy':>10}{'preloaded':>12}")
+    for key in ('import_app', 'preload', 'first_commute', 'first_predict', 'first_health'):
+        cell = lambda t: f"{t[key] * 1000:9.1f}ms" if key in t else f"{'—':>11}"
+        print(f"{key:18}{cell(lazy)}{cell(pre):>12}")
+
+
+if __name__ == '__main__':
+    bench()
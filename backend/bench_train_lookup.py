@@ -0,0 +1,92 @@
+"""
+Benchmark: TrainService.get_next_trains — old dict/strptime timetable vs the
+array-backed timetable with bisect lookups.
+
+The "old" side is a verbatim copy of the previous implementation, so the
+numbers stay comparable after the real one changes.
+
+    python bench_train_lookup.py
+"""
+import time
+from datetime import datetime, timedelta
+
+from services.train_service import TrainService, UP_OFFSETS, DN_OFFSETS, STATION_ORDER
+
+
+class LegacyTrainService:
+    """Previous TrainService: dicts of 'HH:MM' strings, linear scan."""
+
+    def __init__(self):
+        self.schedules = {'up': self._generate_schedule('up'),
+                          'dn': self._generate_schedule('dn')}
+
+    def _generate_schedule(self, direction):
+        offsets = UP_OFFSETS if direction == 'up' else DN_OFFSETS
+        schedule = []
+        current = datetime(2000, 1, 1, 4, 0, 0)
+        end = current + timedelta(hours=20)
+        toggle = True
+        while current < end:
+            ttype = 'fast' if toggle else 'slow'
+            toggle = not toggle
+            schedule.append({
+                'train_id': f"{ttype[0].upper()}{current.strftime('%H%M')}",
+                'type': ttype.capitalize(),
+                'stations': {st: (current + timedelta(minutes=m)).strftime('%H:%M')
+                             for st, m in offsets[ttype].items()},
+            })
+            current += timedelta(minutes=5)
+        return schedule
+
+    def get_next_trains(self, source, destination, after_time_str=None, limit=5):
+        query_time = datetime.strptime(after_time_str, '%H:%M').time()
+        si, di = STATION_ORDER.index(source), STATION_ORDER.index(destination)
+        results = []
+        for train in self.schedules['up' if di > si else 'dn']:
+            dept_str = train['stations'][source]
+            arr_str = train['stations'][destination]
+            dept_t = datetime.strptime(dept_str, '%H:%M').time()
+            if dept_t < query_time:
+                continue
+            dept_dt = datetime.combine(datetime.today(), dept_t)
+            arr_dt = datetime.combine(datetime.today(),
+                                      datetime.strptime(arr_str, '%H:%M').time())
+            results.append({
+                'train_id': train['train_id'], 'type': train['type'],
+                'departure': dept_str, 'arrival': arr_str,
+                'duration_mins': int((arr_dt - dept_dt).total_seconds() / 60),
+            })
+            if len(results) >= limit:
+                break
+        return results
+
+
+QUERIES = [('Thane', 'Vidyavihar', '08:15'), ('Dadar', 'Vidyavihar', '17:40'),
+           ('Kalyan', 'Vidyavihar', '06:05'), ('CSMT', 'Thane', '21:30')]
+
+
+def _throughput(service, limit, seconds=1.0):
+    n, t0 = 0, time.perf_counter()
+    while time.perf_counter() - t0 < seconds:
+        for src, dst, after in QUERIES:
+            service.get_next_trains(src, dst, after_time_str=after, limit=limit)
+        n += len(QUERIES)
+    return n / (time.perf_counter() - t0)
+
+
+def bench():
+    t0 = time.perf_counter()
+    old = LegacyTrainService()
+    old_build = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    new = TrainService()
+    new_build = time.perf_counter() - t0
+    print(f"build            old {old_build * 1000:8.2f} ms   new {new_build * 1000:8.2f} ms")
+
+    for limit in (5, 200):
+        o, n = _throughput(old, limit), _throughput(new, limit)
+        print(f"limit={limit:<4} lookups/s  old {o:10,.0f}   new {n:10,.0f}   ({n / o:.1f}x)")
+
+
+if __name__ == '__main__':
+    bench()
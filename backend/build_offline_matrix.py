@@ -0,0 +1,74 @@
+"""
+Build the offline road-time matrix used by TrafficService.
+
+Covers a grid of zones over the Nominatim viewbox (72.75,18.85 → 73.25,19.40)
+against every entry in STATION_COORDS plus KJSCE, using OSRM's /table
+service. Cells OSRM cannot route are stored as missing (the live path
+handles those), never as Haversine guesses.
+
+    python build_offline_matrix.py [--cell 0.01] [--out offline_matrix.bin]
+
+Point OSRM_BASE_URL at your own OSRM instance for a full build — the public
+demo server is fine for a one-off, but be gentle with it.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from config import Config
+from services.offline_router import write_matrix, zone_grid, zone_centroids
+from services.traffic_service import TrafficService, STATION_COORDS, MUMBAI_VIEWBOX
+
+ZONES_PER_BATCH = 500
+
+
+def _targets():
+    """STATION_COORDS with the KJSCE aliases collapsed to one entry."""
+    seen, targets = set(), []
+    for name, (lng, lat) in STATION_COORDS.items():
+        if (lng, lat) not in seen:
+            seen.add((lng, lat))
+            targets.append((name, lng, lat))
+    return targets
+
+
+def build(out_path: str, cell_deg: float):
+    traffic = TrafficService()
+    targets = _targets()
+    lon0, lat0, nx, ny = zone_grid(MUMBAI_VIEWBOX, cell_deg)
+    zones = zone_centroids(lon0, lat0, cell_deg, nx, ny)
+    target_xy = [[lng, lat] for _name, lng, lat in targets]
+
+    durations = np.full((len(zones), len(targets)), np.nan)
+    distances = np.full((len(zones), len(targets)), np.nan)
+    print(f"{len(zones)} zones ({nx}×{ny} @ {cell_deg}°) × {len(targets)} targets")
+
+    t0 = time.time()
+    for start in range(0, len(zones), ZONES_PER_BATCH):
+        batch = zones[start:start + ZONES_PER_BATCH].tolist()
+        result = traffic.get_travel_time_matrix(batch, target_xy)
+        dur = np.array(result['durations_seconds'], dtype=float)
+        dist = np.array(result['distances_km'], dtype=float) * 1000
+        # Haversine-filled cells are not road times — leave them missing
+        estimated = np.array(result['fallback'], dtype=bool)
+        dur[estimated] = np.nan
+        dist[estimated] = np.nan
+        durations[start:start + len(batch)] = dur
+        distances[start:start + len(batch)] = dist
+        print(f"  zones {start:>5}–{start + len(batch) - 1:<5} "
+              f"({time.time() - t0:.0f}s elapsed)")
+
+    write_matrix(out_path, lon0, lat0, cell_deg, nx, ny, targets, durations, distances)
+    coverage = 1 - np.isnan(durations).mean()
+    print(f"Wrote {out_path} — {coverage:.1%} of cells routed")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--cell', type=float, default=Config.OFFLINE_CELL_DEG,
+                        help='zone size in degrees (default: %(default)s)')
+    parser.add_argument('--out', default=Config.OFFLINE_MATRIX_PATH,
+                        help='output file (default: %(default)s)')
+    args = parser.parse_args()
+    build(args.out, args.cell)
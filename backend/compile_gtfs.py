@@ -0,0 +1,33 @@
+"""
+Compile a GTFS feed into the memory-mapped timetable TrainService loads.
+
+Reads stops.txt, routes.txt, trips.txt and stop_times.txt from a feed zip or
+directory. Platforms are merged into their parent station, and station names
+lose a trailing " Railway Station"/" Station" so they match STATION_COORDS.
+Trip types come from route_short_name (e.g. "Fast" / "Slow").
+
+    python compile_gtfs.py feed.zip [--out timetable.bin] [--service WEEKDAY ...]
+
+Calendars are not modelled — pass --service to compile one day type.
+Restart the workers afterwards; the file is swapped in atomically.
+"""
+import argparse
+import time
+
+from config import Config
+from services.gtfs_store import compile_feed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('feed', help='GTFS zip file or directory')
+    parser.add_argument('--out', default=Config.GTFS_TIMETABLE_PATH,
+                        help='output file (default: %(default)s)')
+    parser.add_argument('--service', nargs='*', metavar='SERVICE_ID',
+                        help='keep only trips on these service_ids')
+    args = parser.parse_args()
+
+    t0 = time.time()
+    summary = compile_feed(args.feed, args.out, set(args.service or ()))
+    print(f"Wrote {args.out} — {summary['stations']} stations, {summary['trips']} trips, "
+          f"{summary['stop_times']} stop times ({time.time() - t0:.1f}s)")
@@ -8,3 +8,99 @@ class Config:
     DEBUG = os.getenv('FLASK_DEBUG', 'False').lower() in ('1', 'true', 'yes')
     KJSCE_ADDRESS = 'KJSCE, Vidyavihar West, Mumbai, Maharashtra'
     KJSCE_STATION = 'Vidyavihar'
+
+    # Geocode store — SQLite file shared by every worker on the host
+    GEOCODE_DB_PATH = os.getenv(
+        'GEOCODE_DB_PATH',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'geocode_cache.sqlite3')
+    )
+    GEOCODE_TTL_SECS = int(os.getenv('GEOCODE_TTL_SECS', 30 * 24 * 3600))
+    GEOCODE_NEGATIVE_TTL_SECS = int(os.getenv('GEOCODE_NEGATIVE_TTL_SECS', 6 * 3600))
+    GEOCODE_MAX_ENTRIES = int(os.getenv('GEOCODE_MAX_ENTRIES', 50000))
+    # Threads for geocode-store reads/writes made from the event loop
+    GEOCODE_STORE_WORKERS = int(os.getenv('GEOCODE_STORE_WORKERS', 4))
+
+    # OSRM route cache — in-memory, per worker
+    ROUTE_CACHE_GRID_M = int(os.getenv('ROUTE_CACHE_GRID_M', 100))
+    ROUTE_CACHE_BUCKET_MINS = int(os.getenv('ROUTE_CACHE_BUCKET_MINS', 30))
+    ROUTE_CACHE_TTL_SECS = int(os.getenv('ROUTE_CACHE_TTL_SECS', 15 * 60))
+    ROUTE_CACHE_FALLBACK_TTL_SECS = int(os.getenv('ROUTE_CACHE_FALLBACK_TTL_SECS', 60))
+    ROUTE_CACHE_MAX_ENTRIES = int(os.getenv('ROUTE_CACHE_MAX_ENTRIES', 5000))
+
+    # Upstream HTTP pools (Nominatim / OSRM). Base URLs are overridable so
+    # benchmarks can point at standin_server.py instead of the public hosts.
+    NOMINATIM_BASE_URL = os.getenv('NOMINATIM_BASE_URL', 'https://nominatim.openstreetmap.org')
+    OSRM_BASE_URL = os.getenv('OSRM_BASE_URL', 'https://router.project-osrm.org')
+    HTTP_CONNECT_TIMEOUT_SECS = float(os.getenv('HTTP_CONNECT_TIMEOUT_SECS', 3.05))
+    HTTP_READ_TIMEOUT_SECS = float(os.getenv('HTTP_READ_TIMEOUT_SECS', 10))
+    HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', 2))
+    # Longest Retry-After worth waiting for; a longer one fails the call
+    HTTP_MAX_RETRY_AFTER_SECS = float(os.getenv('HTTP_MAX_RETRY_AFTER_SECS', 5))
+    NOMINATIM_POOL_SIZE = int(os.getenv('NOMINATIM_POOL_SIZE', 2))
+    OSRM_POOL_SIZE = int(os.getenv('OSRM_POOL_SIZE', 16))
+    NOMINATIM_RATE_PER_SEC = float(os.getenv('NOMINATIM_RATE_PER_SEC', 1))
+    NOMINATIM_BURST = int(os.getenv('NOMINATIM_BURST', 1))
+    NOMINATIM_MAX_WAIT_SECS = float(os.getenv('NOMINATIM_MAX_WAIT_SECS', 5))
+    OSRM_BREAKER_WINDOW = int(os.getenv('OSRM_BREAKER_WINDOW', 20))
+    OSRM_BREAKER_MIN_CALLS = int(os.getenv('OSRM_BREAKER_MIN_CALLS', 5))
+    OSRM_BREAKER_FAILURE_RATE = float(os.getenv('OSRM_BREAKER_FAILURE_RATE', 0.5))
+    OSRM_BREAKER_PROBE_SECS = float(os.getenv('OSRM_BREAKER_PROBE_SECS', 30))
+    OSRM_TABLE_MAX_LOCATIONS = int(os.getenv('OSRM_TABLE_MAX_LOCATIONS', 100))
+    MATRIX_MAX_POINTS = int(os.getenv('MATRIX_MAX_POINTS', 200))
+
+    # Commute planner — legs resolve concurrently on the event loop
+    COMMUTE_DEADLINE_SECS = float(os.getenv('COMMUTE_DEADLINE_SECS', 8))
+    COMMUTE_CANDIDATE_STATIONS = int(os.getenv('COMMUTE_CANDIDATE_STATIONS', 3))
+    COMMUTE_BATCH_MAX_ITEMS = int(os.getenv('COMMUTE_BATCH_MAX_ITEMS', 200))
+    COMMUTE_BATCH_DEADLINE_SECS = float(os.getenv('COMMUTE_BATCH_DEADLINE_SECS', 30))
+    COMMUTE_SWEEP_MAX_SLOTS = int(os.getenv('COMMUTE_SWEEP_MAX_SLOTS', 288))   # a day at 5 min
+    PLAN_CACHE_TTL_SECS = float(os.getenv('PLAN_CACHE_TTL_SECS', 60))
+    PLAN_CACHE_STALE_SECS = float(os.getenv('PLAN_CACHE_STALE_SECS', 300))
+    PLAN_CACHE_MAX_ENTRIES = int(os.getenv('PLAN_CACHE_MAX_ENTRIES', 2000))
+    PLAN_CACHE_REFRESH_WORKERS = int(os.getenv('PLAN_CACHE_REFRESH_WORKERS', 2))
+    JOURNEY_MAX_TRANSFERS = int(os.getenv('JOURNEY_MAX_TRANSFERS', 2))
+    PLAN_TABLE_SLOT_MINS = int(os.getenv('PLAN_TABLE_SLOT_MINS', 5))
+
+    # ML — trips are queued and the model retrained in the background once
+    # ML_RETRAIN_BATCH trips are waiting or the oldest has waited
+    # ML_RETRAIN_DEBOUNCE_SECS, whichever comes first
+    ML_RETRAIN_BATCH = int(os.getenv('ML_RETRAIN_BATCH', 20))
+    ML_RETRAIN_DEBOUNCE_SECS = float(os.getenv('ML_RETRAIN_DEBOUNCE_SECS', 30))
+    # How often an idle worker checks for a model another worker saved
+    # (or, with ewma, for trips another worker logged)
+    ML_RELOAD_CHECK_SECS = float(os.getenv('ML_RELOAD_CHECK_SECS', 5))
+    # 'forest' — RandomForest refit in the background (see above)
+    # 'ewma'   — per (day, ML_EWMA_BUCKET_MINS) decayed means, O(1) per trip
+    ML_ESTIMATOR = os.getenv('ML_ESTIMATOR', 'forest').lower()
+    ML_EWMA_BUCKET_MINS = int(os.getenv('ML_EWMA_BUCKET_MINS', 15))
+    ML_EWMA_HALF_LIFE = float(os.getenv('ML_EWMA_HALF_LIFE', 20))     # trips per cell
+    TRIP_STORE_PATH = os.getenv(
+        'TRIP_STORE_PATH',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'trips')
+    )
+    TRIP_STORE_RETENTION_DAYS = float(os.getenv('TRIP_STORE_RETENTION_DAYS', 365))
+    TRIP_STORE_MAX_ROWS = int(os.getenv('TRIP_STORE_MAX_ROWS', 500_000))
+    PREDICT_BATCH_MAX_CELLS = int(os.getenv('PREDICT_BATCH_MAX_CELLS', 7 * 1440))   # a full week
+
+    # Services the gunicorn master builds before forking (gunicorn.conf.py).
+    # Notification stays lazy: firebase_admin's clients are not fork-safe.
+    PRELOAD_SERVICES = [
+        name.strip()
+        for name in os.getenv('PRELOAD_SERVICES', 'traffic,trains,commute,ml').split(',')
+        if name.strip()
+    ]
+
+    # Offline road-time matrix (built by build_offline_matrix.py)
+    OFFLINE_MATRIX_PATH = os.getenv(
+        'OFFLINE_MATRIX_PATH',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'offline_matrix.bin')
+    )
+    OFFLINE_CELL_DEG = float(os.getenv('OFFLINE_CELL_DEG', 0.01))      # ~1.1 km
+    OFFLINE_REFINE = os.getenv('OFFLINE_REFINE', 'True').lower() in ('1', 'true', 'yes')
+    OFFLINE_REFINE_WORKERS = int(os.getenv('OFFLINE_REFINE_WORKERS', 2))
+
+    # Compiled GTFS timetable (built by compile_gtfs.py); synthetic schedule if absent
+    GTFS_TIMETABLE_PATH = os.getenv(
+        'GTFS_TIMETABLE_PATH',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'timetable.bin')
+    )
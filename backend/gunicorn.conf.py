@@ -0,0 +1,33 @@
+"""
+gunicorn settings — picked up by the Procfile's ``-c gunicorn.conf.py``.
+
+The app is preloaded in the master, which then builds the services in
+Config.PRELOAD_SERVICES once. Workers fork afterwards and share those
+pages copy-on-write instead of each building its own timetable, planner,
+station index and ML model.
+"""
+import gc
+import os
+import time
+
+preload_app = True
+
+# Threaded workers: upstream I/O runs on each worker's event loop
+# (services/aio.py), so a request thread waiting on OSRM costs little
+# and one worker can keep many requests in flight.
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 32))
+
+
+def when_ready(server):
+    # Runs in the master after the app is imported, before any worker forks
+    from config import Config
+    from services import registry
+
+    t0 = time.perf_counter()
+    registry.preload(Config.PRELOAD_SERVICES)
+    # Keep the cyclic GC from touching (and so un-sharing) the preloaded
+    # objects' pages in the workers
+    gc.freeze()
+    server.log.info("Preloaded %s in %.0f ms", ', '.join(Config.PRELOAD_SERVICES),
+                    (time.perf_counter() - t0) * 1000)
@@ -0,0 +1,77 @@
+import os
+import atexit
+import asyncio
+import threading
+
+# One event loop per worker process, running in a daemon thread. All
+# async upstream I/O (aiohttp sessions, async single-flight) lives on it,
+# so request threads — sync or async views — share one set of pooled
+# connections and any number of calls can be in flight at once.
+# Like the thread pools in workers.py, the loop is rebuilt after fork.
+_loop = None
+_pid = None
+_lock = threading.Lock()
+_closers = []       # coroutine functions run on the loop at interpreter exit
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    global _loop, _pid
+    if _loop is None or _pid != os.getpid():
+        with _lock:
+            if _loop is None or _pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='aio-loop',
+                                 daemon=True).start()
+                _loop, _pid = loop, os.getpid()
+                _closers.clear()        # belonged to the parent's loop
+    return _loop
+
+
+def on_shutdown(closer):
+    """Register ``closer()`` (a coroutine function) to run on the loop at exit."""
+    _closers.append(closer)
+
+
+@atexit.register
+def _shutdown():
+    if _loop is None or _pid != os.getpid() or not _closers:
+        return
+
+    async def _close_all():
+        await asyncio.gather(*(closer() for closer in _closers), return_exceptions=True)
+
+    try:
+        submit(_close_all()).result(timeout=2)
+    except Exception:
+        pass
+
+
+def _on_loop() -> bool:
+    try:
+        return asyncio.get_running_loop() is _loop
+    except RuntimeError:
+        return False
+
+
+def submit(coro):
+    """Schedule ``coro`` on the shared loop; returns a concurrent.futures.Future."""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+def run(coro, timeout: float = None):
+    """
+    Run ``coro`` on the shared loop and block for its result — the bridge
+    the sync API uses. Never call it from the loop itself: it would wait
+    on the very thread that has to do the work.
+    """
+    if _on_loop():
+        coro.close()
+        raise RuntimeError('aio.run() called from the shared event loop')
+    return submit(coro).result(timeout)
+
+
+async def call(coro):
+    """Await ``coro`` on the shared loop from any event loop (e.g. an async Flask view)."""
+    if _on_loop():
+        return await coro
+    return await asyncio.wrap_future(submit(coro))
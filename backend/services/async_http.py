@@ -0,0 +1,152 @@
+import json
+import random
+import asyncio
+import logging
+
+import aiohttp
+import requests
+
+from services.aio import get_loop, on_shutdown
+
+logger = logging.getLogger(__name__)
+
+# Responses worth retrying: rate-limited or a transient upstream failure
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class Response:
+    """
+    The slice of ``requests.Response`` TrafficService uses, so sync and
+    async callers share response handling. Errors are raised as the
+    matching ``requests`` exceptions for the same reason.
+    """
+
+    def __init__(self, url: str, status_code: int, headers, content: bytes):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    def json(self):
+        try:
+            return json.loads(self.content)
+        except ValueError as e:
+            raise requests.exceptions.JSONDecodeError(e.msg, e.doc, e.pos)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(
+                f"{self.status_code} Error for url: {self.url}", response=self
+            )
+
+
+class AsyncHttpClient:
+    """
+    Keep-alive connection pool for a single upstream host, on aiohttp.
+
+    Connect and read timeouts are separate — a dead host fails fast on
+    connect, while a slow-but-alive one still gets the full read budget.
+    Each attempt as a whole — waiting for a pooled connection included —
+    is capped at their sum, so a queue or a trickling body can't stretch
+    it past that.
+    Connection errors (connect timeouts included) and 5xx/429 responses
+    are retried with full-jitter exponential backoff. A Retry-After is
+    honoured in full, and one longer than ``max_retry_after`` ends the
+    retries with that response. Read timeouts are NOT retried: the caller
+    has already waited the whole read budget once.
+
+    ``before_attempt`` (a coroutine function) is awaited before every
+    attempt, retries included — e.g. a rate limiter's acquire, so retries
+    count against the limit like first tries.
+
+    The session lives on the shared event loop (services.aio) and
+    ``pool_size`` caps open connections to the host — calls beyond that
+    queue inside aiohttp instead of holding a thread each.
+    """
+
+    def __init__(self, base_url: str, headers: dict = None, pool_size: int = 10,
+                 connect_timeout: float = 3.05, read_timeout: float = 10,
+                 max_retries: int = 2, backoff_base: float = 0.25,
+                 backoff_max: float = 2.0, max_retry_after: float = 5.0,
+                 before_attempt=None):
+        self.base_url = base_url
+        self.headers = headers or {}
+        self.pool_size = pool_size
+        # sock_read resets on every chunk and neither sock_* bound covers
+        # the wait for a free connection, so ``total`` is what caps an attempt
+        self.timeout = aiohttp.ClientTimeout(total=connect_timeout + read_timeout,
+                                             sock_connect=connect_timeout,
+                                             sock_read=read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_retry_after = max_retry_after
+        self.before_attempt = before_attempt
+
+        self._session = None
+        self._loop = None
+
+    # ------------------------------------------------------------------
+    def _get_session(self) -> aiohttp.ClientSession:
+        # Only ever called on the shared loop, which is single-threaded,
+        # so no lock. A new loop (after fork) gets a new session.
+        loop = get_loop()
+        if self._session is None or self._loop is not loop:
+            self._session = aiohttp.ClientSession(
+                headers=self.headers,
+                timeout=self.timeout,
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+            )
+            self._loop = loop
+            on_shutdown(self._session.close)
+        return self._session
+
+    def _backoff(self, attempt: int, resp: Response = None):
+        """Seconds to wait before the next attempt, or None to stop retrying."""
+        if resp is not None:
+            retry_after = resp.headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                wait = float(retry_after)
+                return wait if wait <= self.max_retry_after else None
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def _fetch(self, url: str, params: dict) -> Response:
+        try:
+            async with self._get_session().get(url, params=params) as resp:
+                return Response(str(resp.url), resp.status, resp.headers, await resp.read())
+        except aiohttp.ConnectionTimeoutError as e:
+            raise requests.exceptions.ConnectTimeout(str(e) or 'connect timeout') from e
+        except asyncio.TimeoutError as e:
+            raise requests.exceptions.ReadTimeout(str(e) or 'read timeout') from e
+        except aiohttp.ClientError as e:
+            raise requests.exceptions.ConnectionError(str(e)) from e
+
+    # ------------------------------------------------------------------
+    async def get(self, path: str, params: dict = None) -> Response:
+        """GET ``base_url + path``; raises requests exceptions like requests.get."""
+        url = f"{self.base_url}{path}"
+        attempt = 0
+        while True:
+            if self.before_attempt is not None:
+                await self.before_attempt()
+            try:
+                resp = await self._fetch(url, params)
+            except requests.exceptions.ConnectionError as e:
+                # Includes ConnectTimeout — but not ReadTimeout
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                logger.info("GET %s failed (%s), retry %d in %.2fs",
+                            url, e, attempt + 1, delay)
+            else:
+                if resp.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return resp
+                delay = self._backoff(attempt, resp)
+                if delay is None:
+                    logger.info("GET %s returned %d with Retry-After %s, giving up",
+                                url, resp.status_code, resp.headers.get('Retry-After'))
+                    return resp
+                logger.info("GET %s returned %d, retry %d in %.2fs",
+                            url, resp.status_code, attempt + 1, delay)
+            await asyncio.sleep(delay)
+            attempt += 1
@@ -0,0 +1,80 @@
+import time
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Thread-safe, size-bounded LRU cache with per-entry TTL.
+
+    ``get`` returns None on a miss or an expired entry, so None itself
+    must not be stored as a value.
+
+    With ``stale_secs`` > 0, expired entries are kept that much longer
+    for ``get_with_freshness`` (stale-while-revalidate); ``get`` still
+    treats them as misses.
+    """
+
+    def __init__(self, max_entries: int, ttl_secs: float, stale_secs: float = 0):
+        self.max_entries = max_entries
+        self.ttl_secs = ttl_secs
+        self.stale_secs = stale_secs
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._data = OrderedDict()   # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def _lookup(self, key, allow_stale):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] + self.stale_secs <= now:
+                del self._data[key]
+                entry = None
+            if entry is None or (entry[0] <= now and not allow_stale):
+                self.misses += 1
+                return None, None
+            self._data.move_to_end(key)
+            if entry[0] <= now:
+                self.stale_hits += 1
+            else:
+                self.hits += 1
+            return entry[1], entry[0] - now
+
+    def get(self, key):
+        return self._lookup(key, allow_stale=False)[0]
+
+    def get_with_freshness(self, key):
+        """
+        (value, seconds it stays fresh) — negative once stale — or
+        (None, None) on a miss or past the stale window.
+        """
+        return self._lookup(key, allow_stale=True)
+
+    def set(self, key, value, ttl_secs: float = None):
+        ttl = self.ttl_secs if ttl_secs is None else ttl_secs
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            served = self.hits + self.stale_hits
+            lookups = served + self.misses
+            return {
+                'entries':    len(self._data),
+                'hits':       self.hits,
+                'stale_hits': self.stale_hits,
+                'misses':     self.misses,
+                'hit_rate':   round(served / lookups, 3) if lookups else None,
+            }
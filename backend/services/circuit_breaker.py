@@ -0,0 +1,127 @@
+import time
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an upstream whose breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker over a sliding window of outcomes.
+
+    closed    — calls go through; once the window holds ``min_calls``
+                outcomes and the failure rate reaches ``failure_rate``,
+                the breaker opens.
+    open      — ``allow()`` returns False, so callers skip the upstream
+                entirely, until ``probe_interval`` seconds have passed.
+    half_open — exactly one probe call is let through. Success closes the
+                breaker (with a fresh window), failure re-opens it; a probe
+                abandoned before it finished (``release()``) lets the next
+                caller probe instead.
+
+    Every ``allow()`` that returned True must end in exactly one of
+    record_success / record_failure / release — otherwise a half-open
+    breaker waits forever on a probe that never reports back::
+
+        if breaker.allow():
+            try:
+                ...upstream call...
+            except SomeError:
+                breaker.record_failure()
+            except BaseException:
+                breaker.release()
+            else:
+                breaker.record_success()
+    """
+
+    def __init__(self, name: str, window: int = 20, min_calls: int = 5,
+                 failure_rate: float = 0.5, probe_interval: float = 30.0):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.probe_interval = probe_interval
+
+        self.state = CLOSED
+        self.opened_at = None
+        self.transitions = 0
+        self.short_circuited = 0
+        self._outcomes = deque(maxlen=window)   # True = failure
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    def _transition(self, new_state: str, reason: str):
+        logger.warning("Circuit breaker '%s': %s → %s (%s)",
+                       self.name, self.state, new_state, reason)
+        self.state = new_state
+        self.transitions += 1
+        if new_state == OPEN:
+            self.opened_at = time.monotonic()
+        elif new_state == CLOSED:
+            self.opened_at = None
+            self._outcomes.clear()
+
+    def allow(self) -> bool:
+        """Whether the caller may hit the upstream right now."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and \
+                    time.monotonic() - self.opened_at >= self.probe_interval:
+                self._transition(HALF_OPEN, 'probe interval elapsed')
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.short_circuited += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probe_in_flight = False
+                self._transition(CLOSED, 'probe succeeded')
+            elif self.state == CLOSED:
+                self._outcomes.append(False)
+
+    def record_failure(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probe_in_flight = False
+                self._transition(OPEN, 'probe failed')
+            elif self.state == CLOSED:
+                self._outcomes.append(True)
+                failures = sum(self._outcomes)
+                if len(self._outcomes) >= self.min_calls and \
+                        failures / len(self._outcomes) >= self.failure_rate:
+                    self._transition(
+                        OPEN, f"{failures}/{len(self._outcomes)} recent calls failed"
+                    )
+
+    def release(self):
+        """The allowed call ended without an outcome (e.g. it was cancelled)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    # ------------------------------------------------------------------
+    def status(self) -> dict:
+        with self._lock:
+            failures = sum(self._outcomes)
+            return {
+                'state':           self.state,
+                'recent_calls':    len(self._outcomes),
+                'recent_failures': failures,
+                'open_for_secs':   round(time.monotonic() - self.opened_at, 1)
+                                   if self.opened_at else None,
+                'transitions':     self.transitions,
+                'short_circuited': self.short_circuited,
+            }
@@ -1,8 +1,23 @@
-from datetime import datetime, timedelta
+from concurrent.futures import TimeoutError as FutureTimeout, as_completed
+from datetime import datetime, timedelta, date
+import hashlib
+import json
+import math
+import time
 import logging
+import threading
 
-from services.traffic_service import TrafficService, VIDYAVIHAR_TO_KJSCE_WALK_MINS
+from services.traffic_service import (
+    TrafficService, STATION_COORDS, VIDYAVIHAR_TO_KJSCE_WALK_MINS,
+)
 from services.train_service import TrainService
+from services.timetable import format_minutes, to_minutes
+from services.geocode_store import normalise_address
+from services.station_index import StationIndex
+from services.plan_table import StationPlanTable
+from services import aio
+from services.workers import get_executor
+from services.cache import LRUCache
 from config import Config
 
 logger = logging.getLogger(__name__)
@@ -15,77 +30,50 @@ class CommuteService:
     Destination is always KJSCE Vidyavihar (hardcoded via Config).
     Leg structure:
         Leg 1 — Home  → Origin station       (road, live ORS)
-        Leg 2 — Origin station → Vidyavihar   (train + delay buffer)
+        Leg 2 — Origin station → Vidyavihar   (train(s) + delay buffer)
         Leg 3 — Vidyavihar → KJSCE gate       (road, live ORS)
         Road  — Home  → KJSCE                 (direct drive, live ORS)
     """
 
     DESTINATION = Config.KJSCE_ADDRESS        # "KJSCE, Vidyavihar West, Mumbai..."
     DEST_STATION = Config.KJSCE_STATION       # "Vidyavihar"
+    DEST_STATION_RADIUS_KM = 2                # closer than this → road only
 
-    # Keyword → nearest Central Line station
-    STATION_MAP = {
-        # Central Line
-        'thane':      'Thane',
-        'mulund':     'Thane',
-        'dombivli':   'Dombivli',
-        'kalyan':     'Kalyan',
-        'ghatkopar':  'Ghatkopar',
-        'kurla':      'Kurla',
-        'dadar':      'Dadar',
-        'csmt':       'CSMT',
-        'fort':       'CSMT',
-        'vidyavihar': 'Vidyavihar',
-
-        # Trans-Harbour Line
-        'airoli':        'Thane',
-        'rabale':        'Thane',
-        'ghansoli':      'Thane',
-        'koparkhairane': 'Thane',
-        'turbhe':        'Thane',
-        'vashi':         'Kurla', # Faster via Harbour -> Kurla than Thane
-
-        # Harbour Line (Maps mostly to Kurla)
-        'panvel':     'Kurla',
-        'nerul':      'Kurla',
-        'sanpada':    'Kurla',
-        'mankhurd':   'Kurla',
-        'govandi':    'Kurla',
-        'chembur':    'Kurla',
-        'chunabhatti':'Kurla',
-        'wadala':     'Kurla',
-
-        # Western Line (Maps to Dadar)
-        'churchgate': 'Dadar',
-        'marine lines': 'Dadar',
-        'charni road': 'Dadar',
-        'grant road': 'Dadar',
-        'mumbai central': 'Dadar',
-        'mahalaxmi':  'Dadar',
-        'lower parel': 'Dadar',
-        'prabhadevi': 'Dadar',
-        'matunga road':'Dadar',
-        'mahim':      'Dadar',
-        'bandra':     'Dadar',
-        'khar':       'Dadar',
-        'santacruz':  'Dadar',
-        'vile parle': 'Dadar',
-        'andheri':    'Dadar',
-        'jogeshwari': 'Dadar',
-        'goregaon':   'Dadar',
-        'malad':      'Dadar',
-        'kandivali':  'Dadar',
-        'borivali':   'Dadar',
-        'dahisar':    'Dadar',
-        'mira road':  'Dadar',
-        'bhayandar':  'Dadar',
-        'vasai':      'Dadar',
-        'virar':      'Dadar',
-    }
-
-    def __init__(self):
-        self.traffic = TrafficService()
-        self.trains  = TrainService()
+    def __init__(self, traffic: TrafficService = None, trains: TrainService = None):
+        # Share the app's TrafficService so cache counters cover every call,
+        # and its TrainService so the timetable is built once
+        self.traffic = traffic or TrafficService()
+        self.trains  = trains or TrainService()
+        # FIX: Cache whole plans for a short time, serving stale ones while
+        #      a background refresh runs.
+        # WHY: Repeat taps seconds apart recomputed the same plan, upstream
+        #      lookups included. A plan only depends on the normalised
+        #      origin, arrival time, clamped buffer and today's date.
+        self.plan_cache = LRUCache(
+            max_entries=Config.PLAN_CACHE_MAX_ENTRIES,
+            ttl_secs=Config.PLAN_CACHE_TTL_SECS,
+            stale_secs=Config.PLAN_CACHE_STALE_SECS,
+        )
+        self._revalidating = set()
+        self._revalidate_lock = threading.Lock()
+
+        # Boarding stations = timetable stations we have coordinates for
+        self.station_index = StationIndex({
+            name: STATION_COORDS[name]
+            for name in self.trains.stations if name in STATION_COORDS
+        })
+
+        # FIX: Materialise every boarding station's train per arrival slot.
+        # WHY: The station → Vidyavihar train and the walk to the gate are
+        #      the same for every user; only the home → station drive is
+        #      not. Plans now take the train from one table lookup instead
+        #      of re-running the timetable search (and, for stations off
+        #      the Central line, the journey planner) on every request.
+        self.plan_table = StationPlanTable(
+            self.trains, self.station_index.names, self.DEST_STATION,
+            VIDYAVIHAR_TO_KJSCE_WALK_MINS,
+            slot_mins=Config.PLAN_TABLE_SLOT_MINS,
+        )
 
     # ------------------------------------------------------------------
     def calculate_best_route(self, origin: str, arrival_time_str: str,
@@ -97,6 +85,326 @@ class CommuteService:
         :param arrival_time_str:  "HH:MM" — desired arrival at KJSCE
         :param delay_buffer_mins: Extra buffer added to train leg for expected delays
         """
+        arrival_dt, delay_buffer_mins = self._parse_request(arrival_time_str, delay_buffer_mins)
+
+        # FIX: Resolve the independent legs concurrently under one deadline.
+        # WHY: The direct road route and leg 1 used to run back to back,
+        #      each geocoding the origin itself — worst case was the SUM of
+        #      four 10 s HTTP timeouts. Now the origin is geocoded once, the
+        #      road leg goes out the moment its coordinates are known, the
+        #      in-memory train lookup runs on this thread while it is in
+        #      flight, and the leg-1 drives follow in parallel — latency is
+        #      the slowest leg, capped at COMMUTE_DEADLINE_SECS. A leg that
+        #      misses the deadline degrades to its estimate and keeps running
+        #      in the background, warming the caches for the next request.
+        # FIX: Legs run as coroutines on the worker's event loop.
+        # WHY: Each leg used to hold a 'commute-leg' pool thread that only
+        #      sat in aio.run() waiting on the loop, so the pool — not the
+        #      upstreams — capped how many plans were in flight. Now only
+        #      the request thread waits, on the legs' futures.
+        deadline = time.monotonic() + Config.COMMUTE_DEADLINE_SECS
+        origin_future = aio.submit(self.traffic.resolve_coords_async(origin))
+        origin_coords = self._leg_result(origin_future, deadline, 'geocode', origin)
+        dest_coords = self.traffic.resolve_coords(self.DESTINATION)   # hardcoded, no HTTP
+
+        road_future = None
+        if origin_coords:
+            road_future = aio.submit(
+                self.traffic.get_travel_time_coords_async(origin_coords, dest_coords)
+            )
+        candidates = self._station_candidates(origin_coords, arrival_dt, delay_buffer_mins)
+        leg1_futures = {}
+        if origin_coords:
+            for station, station_coords, _best_train in candidates:
+                leg1_futures[station] = aio.submit(
+                    self.traffic.get_travel_time_coords_async(origin_coords, station_coords)
+                )
+
+        road_trip = self._leg_result(road_future, deadline, 'road', origin)
+        leg1s = {station: self._leg_result(future, deadline, 'leg1', origin)
+                 for station, future in leg1_futures.items()}
+        return self._build_plan(origin, origin_coords, dest_coords, arrival_dt,
+                                delay_buffer_mins, road_trip, candidates, leg1s)
+
+    # ------------------------------------------------------------------
+    def cached_best_route(self, origin: str, arrival_time_str: str,
+                          delay_buffer_mins: int = 0):
+        """
+        calculate_best_route through the plan cache. Returns
+        (plan, etag, fresh_for_secs, status) where status is 'hit',
+        'stale' (served while a background refresh runs) or 'miss'.
+        """
+        delay_buffer_mins = max(0, min(60, delay_buffer_mins))
+        key = self._plan_key(origin, arrival_time_str, delay_buffer_mins)
+
+        cached, fresh_for = self.plan_cache.get_with_freshness(key)
+        if cached is not None:
+            plan, etag = cached
+            if fresh_for > 0:
+                return plan, etag, fresh_for, 'hit'
+            self._revalidate_in_background(key, origin, arrival_time_str, delay_buffer_mins)
+            return plan, etag, 0, 'stale'
+
+        plan, etag = self._plan_and_cache(key, origin, arrival_time_str, delay_buffer_mins)
+        return plan, etag, Config.PLAN_CACHE_TTL_SECS, 'miss'
+
+    @staticmethod
+    def _plan_key(origin, arrival_time_str, delay_buffer_mins):
+        return (normalise_address(origin), arrival_time_str, delay_buffer_mins,
+                date.today().isoformat())
+
+    def _plan_and_cache(self, key, origin, arrival_time_str, delay_buffer_mins):
+        plan = self.calculate_best_route(origin, arrival_time_str, delay_buffer_mins)
+        return plan, self._cache_plan(key, plan)
+
+    def _cache_plan(self, key, plan):
+        """Store ``plan`` under ``key``; returns its ETag."""
+        etag = hashlib.sha1(json.dumps(plan, sort_keys=True).encode()).hexdigest()[:16]
+        self.plan_cache.set(key, (plan, etag))
+        return etag
+
+    def _revalidate_in_background(self, key, origin, arrival_time_str, delay_buffer_mins):
+        with self._revalidate_lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+
+        def _refresh():
+            try:
+                self._plan_and_cache(key, origin, arrival_time_str, delay_buffer_mins)
+            except Exception as e:
+                logger.warning("Background plan refresh for '%s' failed: %s", origin, e)
+            finally:
+                with self._revalidate_lock:
+                    self._revalidating.discard(key)
+
+        get_executor('plan-refresh', Config.PLAN_CACHE_REFRESH_WORKERS).submit(_refresh)
+
+    # ------------------------------------------------------------------
+    def stream_best_route(self, origin: str, arrival_time_str: str,
+                          delay_buffer_mins: int = 0):
+        """
+        calculate_best_route as a sequence of (event, payload) pairs:
+
+            estimate — whole plan from Haversine estimates and the timetable;
+                       immediate when the origin is a station or a cached
+                       geocode, otherwise right after geocoding
+            road     — {'road_route': ...} once OSRM answers the direct drive
+            hybrid   — {'train_route': ...} each time a leg-1 drive resolves
+            final    — the same plan calculate_best_route would return
+
+        Legs still running at COMMUTE_DEADLINE_SECS keep their estimates.
+        The final plan also goes into the plan cache.
+        """
+        arrival_dt, delay_buffer_mins = self._parse_request(arrival_time_str, delay_buffer_mins)
+        deadline = time.monotonic() + Config.COMMUTE_DEADLINE_SECS
+        dest_coords = self.traffic.resolve_coords(self.DESTINATION)
+
+        origin_coords = self.traffic.cached_coords(origin)
+        if origin_coords is None:
+            origin_coords = self._leg_result(
+                aio.submit(self.traffic.resolve_coords_async(origin)), deadline, 'geocode', origin
+            )
+        candidates = self._station_candidates(origin_coords, arrival_dt, delay_buffer_mins)
+
+        road_trip, leg1s = None, {}
+        yield 'estimate', self._build_plan(origin, origin_coords, dest_coords, arrival_dt,
+                                           delay_buffer_mins, road_trip, candidates, leg1s)
+
+        if origin_coords:
+            futures = {aio.submit(
+                self.traffic.get_travel_time_coords_async(origin_coords, dest_coords)
+            ): None}
+            for station, station_coords, _best_train in candidates:
+                futures[aio.submit(
+                    self.traffic.get_travel_time_coords_async(origin_coords, station_coords)
+                )] = station
+            try:
+                for future in as_completed(futures, timeout=max(0, deadline - time.monotonic())):
+                    station = futures[future]
+                    result = self._leg_result(
+                        future, deadline, 'road' if station is None else 'leg1', origin
+                    )
+                    if station is None:
+                        road_trip = result
+                    else:
+                        leg1s[station] = result
+                    plan = self._build_plan(origin, origin_coords, dest_coords, arrival_dt,
+                                            delay_buffer_mins, road_trip, candidates, leg1s)
+                    if station is None:
+                        yield 'road', {'road_route': plan['road_route']}
+                    else:
+                        yield 'hybrid', {'train_route': plan['train_route']}
+            except FutureTimeout:
+                logger.warning("Streaming plan for '%s' missed the %ss deadline",
+                               origin, Config.COMMUTE_DEADLINE_SECS)
+
+        plan = self._build_plan(origin, origin_coords, dest_coords, arrival_dt,
+                                delay_buffer_mins, road_trip, candidates, leg1s)
+        self._cache_plan(self._plan_key(origin, arrival_time_str, delay_buffer_mins), plan)
+        yield 'final', plan
+
+    # ------------------------------------------------------------------
+    def calculate_batch(self, requests):
+        """
+        Plans for many (origin, arrival_time_str, delay_buffer_mins) at
+        once, in order. Each distinct origin is geocoded once and each
+        distinct road leg fetched once, all on the event loop under one
+        deadline. An entry that fails becomes ``{'error': ...}`` instead
+        of failing the batch.
+        """
+        deadline = time.monotonic() + Config.COMMUTE_BATCH_DEADLINE_SECS
+        dest_coords = self.traffic.resolve_coords(self.DESTINATION)
+
+        # ── Distinct origins, geocoded once ──────────────────────────
+        geocodes = {}
+        for origin, _arrival, _buffer in requests:
+            key = normalise_address(origin)
+            if key not in geocodes:
+                geocodes[key] = aio.submit(self.traffic.resolve_coords_async(origin))
+
+        # ── Per entry: timetable work (in memory), road legs it needs ─
+        entries, legs = [], {}
+        for origin, arrival_time_str, delay_buffer_mins in requests:
+            try:
+                arrival_dt, buffer = self._parse_request(arrival_time_str, delay_buffer_mins)
+                origin_coords = self._geocode_result(
+                    geocodes[normalise_address(origin)], deadline, origin
+                )
+                candidates = self._station_candidates(origin_coords, arrival_dt, buffer)
+            except Exception as e:
+                entries.append({'error': str(e)})
+                continue
+            entries.append((origin, origin_coords, arrival_dt, buffer, candidates))
+            if origin_coords:
+                for target in [dest_coords] + [c[1] for c in candidates]:
+                    pair = (tuple(origin_coords), tuple(target))
+                    if pair not in legs:
+                        legs[pair] = aio.submit(
+                            self.traffic.get_travel_time_coords_async(origin_coords, target)
+                        )
+
+        # ── Assemble, in request order ───────────────────────────────
+        results = []
+        for entry in entries:
+            if isinstance(entry, dict):
+                results.append(entry)
+                continue
+            origin, origin_coords, arrival_dt, buffer, candidates = entry
+            try:
+                road_trip = leg1s = None
+                if origin_coords:
+                    o = tuple(origin_coords)
+                    road_trip = self._leg_result(legs[(o, tuple(dest_coords))],
+                                                 deadline, 'road', origin)
+                    leg1s = {station: self._leg_result(legs[(o, tuple(coords))],
+                                                       deadline, 'leg1', origin)
+                             for station, coords, _train in candidates}
+                results.append(self._build_plan(origin, origin_coords, dest_coords,
+                                                arrival_dt, buffer, road_trip,
+                                                candidates, leg1s or {}))
+            except Exception as e:
+                logger.warning("Batch plan for '%s' failed: %s", origin, e)
+                results.append({'error': str(e)})
+        return results
+
+    # ------------------------------------------------------------------
+    def calculate_sweep(self, origin: str, arrival_from: str, arrival_to: str,
+                        step_mins: int = 5, delay_buffer_mins: int = 0):
+        """
+        Road and hybrid leave-at times for every arrival slot from
+        `arrival_from` to `arrival_to` (HH:MM, inclusive) every `step_mins`.
+
+        Road legs are resolved once for the whole window and each
+        candidate station's trains are found in one timetable sweep, so
+        the cost is close to a single calculate_best_route. Slots come
+        back as parallel arrays; hybrid entries are None where no train
+        makes the slot.
+        """
+        start, end = to_minutes(arrival_from), to_minutes(arrival_to)
+        arrivals = list(range(start, end + 1, step_mins))
+        delay_buffer_mins = max(0, min(60, delay_buffer_mins))   # as in _parse_request
+        leg3_mins = VIDYAVIHAR_TO_KJSCE_WALK_MINS
+
+        deadline = time.monotonic() + Config.COMMUTE_DEADLINE_SECS
+        origin_coords = self._leg_result(
+            aio.submit(self.traffic.resolve_coords_async(origin)), deadline, 'geocode', origin
+        )
+        dest_coords = self.traffic.resolve_coords(self.DESTINATION)
+
+        stations = self._candidate_stations(origin_coords) if origin_coords else []
+        station_coords = {st: self.traffic.resolve_coords(st) for st in stations}
+        road_future = None
+        leg1_futures = {}
+        if origin_coords:
+            road_future = aio.submit(
+                self.traffic.get_travel_time_coords_async(origin_coords, dest_coords)
+            )
+            for st in stations:
+                leg1_futures[st] = aio.submit(
+                    self.traffic.get_travel_time_coords_async(origin_coords, station_coords[st])
+                )
+
+        # Timetable sweeps run while the road legs are in flight
+        train_deadlines = [a - leg3_mins for a in arrivals]
+        trains = {st: self.trains.latest_departures_by(
+                      st, self.DEST_STATION, train_deadlines, delay_buffer_mins)
+                  for st in stations}
+
+        road_trip = self._road_or_estimate(
+            self._leg_result(road_future, deadline, 'road', origin), origin_coords, dest_coords
+        )
+        road_mins = road_trip['duration_seconds'] / 60
+        leg1_mins = {
+            st: self._leg1_mins(self._leg_result(leg1_futures[st], deadline, 'leg1', origin),
+                                origin, origin_coords, st, station_coords[st])
+            for st in stations
+        }
+
+        train = {'leave_at': [], 'duration_mins': [], 'station': [],
+                 'departure': [], 'arrival': [], 'transfers': []}
+        recommendation = []
+        for i, arrival in enumerate(arrivals):
+            best = None       # (total_mins, leave_at, station, train)
+            for st in stations:
+                row = trains[st][i]
+                if row is None:
+                    continue
+                leave = to_minutes(row['departure']) - leg1_mins[st]
+                total = int(arrival - leave)
+                if best is None or total < best[0]:
+                    best = (total, leave, st, row)
+            if best:
+                total, leave, st, row = best
+                train['leave_at'].append(format_minutes(math.floor(leave)))
+                train['duration_mins'].append(total)
+                train['station'].append(st)
+                train['departure'].append(row['departure'])
+                train['arrival'].append(row['arrival'])
+                train['transfers'].append(row.get('transfers', 0))
+            else:
+                for column in train.values():
+                    column.append(None)
+            recommendation.append(
+                'Train' if best and best[0] < int(road_mins) else 'Road'
+            )
+
+        return {
+            'arrival_times':  [format_minutes(a) for a in arrivals],
+            'delay_buffer_mins': delay_buffer_mins,
+            'road': {
+                'duration_mins': int(road_mins),
+                'distance_text': road_trip['distance_text'],
+                'leave_at': [format_minutes(math.floor(a - road_mins)) for a in arrivals],
+            },
+            'train': train,
+            'recommendation': recommendation,
+        }
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _parse_request(arrival_time_str, delay_buffer_mins):
+        """(arrival datetime today, clamped buffer) — ValueError on a bad time."""
         arrival_dt = datetime.combine(
             datetime.now().date(),
             datetime.strptime(arrival_time_str, '%H:%M').time()
@@ -106,18 +414,46 @@ class CommuteService:
         # WHY: A corrupt or malicious value (e.g. 9999 or -30) would push
         #      the departure time into the previous day or skip all trains.
         #      60 minutes is a generous upper bound for Mumbai local delays.
-        delay_buffer_mins = max(0, min(60, delay_buffer_mins))
+        return arrival_dt, max(0, min(60, delay_buffer_mins))
+
+    def _station_candidates(self, origin_coords, arrival_dt, delay_buffer_mins):
+        """
+        [(station, station_coords, best_train)] for the boarding stations
+        near the origin that have a train making the deadline. Timetable
+        only — no HTTP.
+        """
+        if not origin_coords:
+            return []
+        # Latest the train can arrive at Vidyavihar, in minutes since the
+        # arrival day's midnight — negative when the walk starts the day
+        # before, where no train of that day can make it
+        arrival_min = arrival_dt.hour * 60 + arrival_dt.minute
+        train_deadline_min = arrival_min - VIDYAVIHAR_TO_KJSCE_WALK_MINS
+        # The table is keyed by gate arrival less the buffer; off-slot
+        # times (09:02) and unlisted stations are looked up live
+        candidates = []
+        for station in self._candidate_stations(origin_coords):
+            found, best_train = self.plan_table.lookup(
+                station, arrival_min - delay_buffer_mins
+            )
+            if not found:
+                best_train = self._find_best_train(
+                    station, train_deadline_min, delay_buffer_mins
+                )
+            if best_train:
+                candidates.append((station, self.traffic.resolve_coords(station), best_train))
+        return candidates
+
+    def _build_plan(self, origin, origin_coords, dest_coords, arrival_dt,
+                    delay_buffer_mins, road_trip, candidates, leg1s):
+        """
+        Turn resolved legs into the response. ``road_trip`` / ``leg1s``
+        values of None (leg missed the deadline) fall back to estimates.
+        """
+        leg3_mins = VIDYAVIHAR_TO_KJSCE_WALK_MINS  # fixed walk: Vidyavihar stn → KJSCE gate
 
         # ── Road-only route ──────────────────────────────────────────
-        road_trip = self.traffic.get_travel_time(origin, self.DESTINATION)
-        if 'error' in road_trip:
-            logger.warning("Road-only OSRM failed, using 30-min estimate: %s", road_trip['error'])
-            road_trip = {
-                'duration_seconds': 1800,
-                'duration_text': '~30 mins (est)',
-                'distance_text': 'est',
-                'fallback': True
-            }
+        road_trip = self._road_or_estimate(road_trip, origin_coords, dest_coords)
         road_mins       = road_trip['duration_seconds'] / 60
         road_depart_dt  = arrival_dt - timedelta(minutes=road_mins)
 
@@ -132,87 +468,18 @@ class CommuteService:
         }
 
         # ── Hybrid route (road + train) ──────────────────────────────
-        origin_station = self._nearest_station(origin)
-        train_route    = None
-
-        if origin_station and origin_station != self.DEST_STATION:
-            leg1 = self.traffic.get_travel_time(
-                origin, f"{origin_station} Railway Station, Mumbai"
+        # Every candidate station gets a full plan; the shortest wins.
+        train_route = None
+        for station, station_coords, best_train in candidates:
+            leg1_mins = self._leg1_mins(leg1s.get(station), origin, origin_coords,
+                                        station, station_coords)
+            route = self._hybrid_route(
+                station, best_train, leg1_mins, leg3_mins,
+                arrival_dt, delay_buffer_mins,
             )
-            # FIX: Log a warning when leg1 road lookup fails.
-            # WHY: Silently defaulting to 15 mins is a reasonable fallback,
-            #      but without a log you'd never know the geocoding or OSRM
-            #      call failed — makes debugging production issues very hard.
-            if 'error' in leg1:
-                logger.warning(
-                    "Leg1 road lookup failed for '%s' → '%s Station': %s. "
-                    "Defaulting to 15 mins.",
-                    origin, origin_station, leg1['error']
-                )
-            leg1_mins = (leg1['duration_seconds'] / 60
-                         if 'error' not in leg1 else 15)
-
-            leg3_mins = VIDYAVIHAR_TO_KJSCE_WALK_MINS  # fixed walk: Vidyavihar stn → KJSCE gate
-
-            # Latest the train can arrive at Vidyavihar
-            # (subtract walking leg + delay buffer already baked into buffer)
-            train_must_arrive_by = arrival_dt - timedelta(minutes=leg3_mins)
-
-            # Find the latest suitable train (arrives before deadline)
-            # We search trains from early morning and pick the last valid one
-            trains = self.trains.get_next_trains(
-                origin_station, self.DEST_STATION,
-                after_time_str='04:00',
-                limit=200,
-            )
-
-            best_train = None
-            for train in trains:
-                arr_t  = datetime.strptime(train['arrival'], '%H:%M').time()
-                arr_dt = datetime.combine(datetime.now().date(), arr_t)
-                # Add predicted delay buffer to train arrival
-                effective_arr_dt = arr_dt + timedelta(minutes=delay_buffer_mins)
-                if effective_arr_dt <= train_must_arrive_by:
-                    best_train = train   # keep updating — last valid wins
-                # trains are sorted ascending; once they're past deadline, done
-                elif arr_dt > train_must_arrive_by:
-                    break
-
-            if best_train:
-                dept_t  = datetime.strptime(best_train['departure'], '%H:%M').time()
-                dept_dt = datetime.combine(datetime.now().date(), dept_t)
-
-                # Leave home early enough to catch the train
-                home_depart_dt = dept_dt - timedelta(minutes=leg1_mins)
-
-                # Total journey from home to KJSCE gate
-                total_mins = int(
-                    (arrival_dt - home_depart_dt).total_seconds() / 60
-                )
-
-                train_route = {
-                    'mode':               'Hybrid (Road + Train)',
-                    'leave_at':           home_depart_dt.strftime('%H:%M'),
-                    'total_duration_mins': total_mins,
-                    'delay_buffer_mins':  delay_buffer_mins,
-                    'details': {
-                        'leg1_road':  (
-                            f"Home → {origin_station} Station "
-                            f"({int(leg1_mins)} mins)"
-                        ),
-                        'leg2_train': (
-                            f"{best_train['type']} train "
-                            f"{origin_station} → {self.DEST_STATION} "
-                            f"({best_train['departure']} – {best_train['arrival']})"
-                            + (f" + {delay_buffer_mins} min delay buffer"
-                               if delay_buffer_mins else '')
-                        ),
-                        'leg3_walk':  (
-                            f"Vidyavihar Station → KJSCE gate "
-                            f"({int(leg3_mins)} mins)"
-                        ),
-                    },
-                }
+            if train_route is None or \
+                    route['total_duration_mins'] < train_route['total_duration_mins']:
+                train_route = route
 
         # ── Pick recommendation ───────────────────────────────────────
         if train_route:
@@ -230,10 +497,150 @@ class CommuteService:
             'recommendation': recommend,
         }
 
+    def _road_or_estimate(self, road_trip, origin_coords, dest_coords):
+        """The road leg, its Haversine estimate, or a flat 30-minute guess."""
+        if road_trip is None and origin_coords:
+            road_trip = self.traffic.estimate_travel_time(origin_coords, dest_coords)
+        if not road_trip or 'error' in road_trip:
+            logger.warning("Road-only OSRM failed, using 30-min estimate: %s",
+                           road_trip['error'] if road_trip else 'no origin coordinates')
+            road_trip = {
+                'duration_seconds': 1800,
+                'duration_text': '~30 mins (est)',
+                'distance_text': 'est',
+                'fallback': True
+            }
+        return road_trip
+
+    def _leg1_mins(self, leg1, origin, origin_coords, station, station_coords):
+        """Minutes from home to ``station``; None legs fall back to an estimate."""
+        if leg1 is None:
+            leg1 = self.traffic.estimate_travel_time(origin_coords, station_coords)
+        # FIX: Log a warning when leg1 road lookup fails.
+        # WHY: Silently defaulting to 15 mins is a reasonable fallback,
+        #      but without a log you'd never know the geocoding or OSRM
+        #      call failed — makes debugging production issues very hard.
+        if 'error' in leg1:
+            logger.warning(
+                "Leg1 road lookup failed for '%s' → '%s Station': %s. "
+                "Defaulting to 15 mins.",
+                origin, station, leg1['error']
+            )
+        return leg1['duration_seconds'] / 60 if 'error' not in leg1 else 15
+
+    # ------------------------------------------------------------------
+    def _hybrid_route(self, origin_station, best_train, leg1_mins, leg3_mins,
+                      arrival_dt, delay_buffer_mins):
+        dept_t  = datetime.strptime(best_train['departure'], '%H:%M').time()
+        dept_dt = datetime.combine(datetime.now().date(), dept_t)
+
+        # Leave home early enough to catch the train
+        home_depart_dt = dept_dt - timedelta(minutes=leg1_mins)
+
+        # Total journey from home to KJSCE gate
+        total_mins = int(
+            (arrival_dt - home_depart_dt).total_seconds() / 60
+        )
+
+        # Direct trains are a single leg; planned journeys carry their own
+        legs = best_train.get('legs') or [
+            dict(best_train, **{'from': origin_station, 'to': self.DEST_STATION})
+        ]
+
+        return {
+            'mode':               'Hybrid (Road + Train)',
+            'leave_at':           home_depart_dt.strftime('%H:%M'),
+            'total_duration_mins': total_mins,
+            'delay_buffer_mins':  delay_buffer_mins,
+            'transfers':          len(legs) - 1,
+            'details': {
+                'leg1_road':  (
+                    f"Home → {origin_station} Station "
+                    f"({int(leg1_mins)} mins)"
+                ),
+                'leg2_train': (
+                    ', then '.join(
+                        f"{leg['type']} train {leg['from']} → {leg['to']} "
+                        f"({leg['departure']} – {leg['arrival']})"
+                        for leg in legs
+                    )
+                    + (f" + {delay_buffer_mins} min delay buffer"
+                       if delay_buffer_mins else '')
+                ),
+                'leg3_walk':  (
+                    f"Vidyavihar Station → KJSCE gate "
+                    f"({int(leg3_mins)} mins)"
+                ),
+            },
+        }
+
     # ------------------------------------------------------------------
-    def _nearest_station(self, location: str) -> str:
-        loc_lower = location.lower()
-        for keyword, station in self.STATION_MAP.items():
-            if keyword in loc_lower:
-                return station
-        return 'Thane'   # sensible Mumbai default
+    def _find_best_train(self, origin_station, deadline_min,
+                         delay_buffer_mins):
+        """
+        Latest train to Vidyavihar whose buffered arrival meets the
+        deadline (minutes since midnight; negative means none can) — a
+        direct one if any, else a journey with changes.
+        """
+        # FIX: One indexed lookup instead of listing 200 trains.
+        # WHY: The old loop materialised every train from 04:00, strptime'd
+        #      each arrival and stopped at the first late one — which also
+        #      missed fast trains that leave later but overtake a slow one.
+        direct = self.trains.latest_departure_arriving_by(
+            origin_station, self.DEST_STATION, deadline_min, delay_buffer_mins,
+        )
+        if direct:
+            return direct
+        # No direct train (Western, Harbour, Trans-Harbour stations) —
+        # plan a journey with changes instead
+        return self.trains.latest_journey_arriving_by(
+            origin_station, self.DEST_STATION, deadline_min, delay_buffer_mins,
+        )
+
+    @staticmethod
+    def _leg_result(future, deadline, leg, origin):
+        """
+        Wait for a leg until the request deadline. Returns None if the leg
+        was never started, failed to geocode, or ran out of time.
+        """
+        if future is None:
+            return None
+        try:
+            return future.result(timeout=max(0, deadline - time.monotonic()))
+        except FutureTimeout:
+            logger.warning("%s lookup for '%s' missed the %ss deadline",
+                           leg, origin, Config.COMMUTE_DEADLINE_SECS)
+        except Exception as e:
+            logger.warning("%s lookup for '%s' failed: %s", leg, origin, e)
+        return None
+
+    @staticmethod
+    def _geocode_result(future, deadline, origin):
+        """
+        Like _leg_result for a batch origin, but a failed or late geocode
+        raises: a plan for an unknown origin would be a made-up 30-minute
+        guess, so the entry reports the error instead.
+        """
+        try:
+            return future.result(timeout=max(0, deadline - time.monotonic()))
+        except FutureTimeout:
+            raise TimeoutError(f"Geocoding '{origin}' missed the "
+                               f"{Config.COMMUTE_BATCH_DEADLINE_SECS}s deadline") from None
+
+    # ------------------------------------------------------------------
+    def _candidate_stations(self, origin_coords):
+        """
+        The COMMUTE_CANDIDATE_STATIONS stations nearest the origin that the
+        timetable serves, closest first. Empty when the origin is right next
+        to Vidyavihar — a train ride to the destination station makes no
+        sense there.
+        """
+        nearest = self.station_index.nearest(
+            origin_coords[0], origin_coords[1],
+            k=Config.COMMUTE_CANDIDATE_STATIONS + 1,
+        )
+        if not nearest or (nearest[0][0] == self.DEST_STATION
+                           and nearest[0][1] <= self.DEST_STATION_RADIUS_KM):
+            return []
+        return [name for name, _km in nearest
+                if name != self.DEST_STATION][:Config.COMMUTE_CANDIDATE_STATIONS]
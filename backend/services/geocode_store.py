@@ -0,0 +1,160 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Disk-backed geocode cache shared by every gunicorn worker on the host.
+#
+# SQLite in WAL mode lets many readers run concurrently with one writer, so
+# all workers can hit the same file without stepping on each other. Each
+# row is either a positive result (lon/lat) or a negative one (lon/lat NULL)
+# for addresses Nominatim could not resolve.
+# ---------------------------------------------------------------------------
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocode (
+    key        TEXT PRIMARY KEY,
+    lon        REAL,
+    lat        REAL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+)
+"""
+_INDEX = "CREATE INDEX IF NOT EXISTS geocode_created ON geocode (created_at)"
+
+
+def normalise_address(address: str) -> str:
+    """Lower-case and collapse whitespace so trivial variants share a key."""
+    return ' '.join(address.lower().split())
+
+
+class GeocodeStore:
+    """
+    Persistent address → (lon, lat) cache with TTL, size-bounded eviction
+    and negative caching.
+
+    Lookups return ``(found, coords)``:
+        (False, None)     — miss, caller should geocode
+        (True,  (lo, la)) — positive hit
+        (True,  None)     — negative hit, address is known not to geocode
+    """
+
+    # Evicting on every write would mean a COUNT(*) per insert; checking
+    # every N writes keeps the table within ~N rows of max_entries.
+    EVICT_EVERY = 32
+
+    def __init__(self, path: str, ttl_secs: int, negative_ttl_secs: int,
+                 max_entries: int):
+        self.path = path
+        self.ttl_secs = ttl_secs
+        self.negative_ttl_secs = negative_ttl_secs
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.errors = 0
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    # ------------------------------------------------------------------
+    def _conn(self):
+        """
+        One connection per thread, reopened after fork.
+        WHY: sqlite3 connections must not cross threads, and a connection
+             inherited from the gunicorn master must not be reused by the
+             forked worker.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(_SCHEMA)
+        conn.execute(_INDEX)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _fail(self, op: str, e: Exception):
+        # A broken cache must never break geocoding — log and carry on
+        # as if every lookup were a miss.
+        with self._lock:
+            self.errors += 1
+        logger.warning("Geocode store %s failed (%s): %s", op, self.path, e)
+
+    # ------------------------------------------------------------------
+    def get(self, address: str):
+        key = normalise_address(address)
+        try:
+            row = self._conn().execute(
+                'SELECT lon, lat FROM geocode WHERE key = ? AND expires_at > ?',
+                (key, time.time()),
+            ).fetchone()
+        except sqlite3.Error as e:
+            self._fail('read', e)
+            return False, None
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return False, None
+            if row[0] is None:
+                self.negative_hits += 1
+                return True, None
+            self.hits += 1
+        return True, (row[0], row[1])
+
+    def put(self, address: str, coords):
+        self._write(address, coords[0], coords[1], self.ttl_secs)
+
+    def put_negative(self, address: str):
+        self._write(address, None, None, self.negative_ttl_secs)
+
+    def _write(self, address, lon, lat, ttl):
+        now = time.time()
+        try:
+            conn = self._conn()
+            conn.execute(
+                'INSERT OR REPLACE INTO geocode '
+                '(key, lon, lat, created_at, expires_at) VALUES (?, ?, ?, ?, ?)',
+                (normalise_address(address), lon, lat, now, now + ttl),
+            )
+            with self._lock:
+                self._writes += 1
+                evict = self._writes % self.EVICT_EVERY == 0
+            if evict:
+                self._evict(conn, now)
+        except sqlite3.Error as e:
+            self._fail('write', e)
+
+    def _evict(self, conn, now):
+        """Drop expired rows, then the oldest rows beyond max_entries."""
+        conn.execute('DELETE FROM geocode WHERE expires_at <= ?', (now,))
+        conn.execute(
+            'DELETE FROM geocode WHERE key IN ('
+            '  SELECT key FROM geocode ORDER BY created_at DESC'
+            '  LIMIT -1 OFFSET ?)',
+            (self.max_entries,),
+        )
+
+    # ------------------------------------------------------------------
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.negative_hits + self.misses
+            return {
+                'hits':          self.hits,
+                'negative_hits': self.negative_hits,
+                'misses':        self.misses,
+                'errors':        self.errors,
+                'hit_rate':      round((self.hits + self.negative_hits) / lookups, 3)
+                                 if lookups else None,
+            }
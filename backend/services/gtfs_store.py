@@ -0,0 +1,271 @@
+import io
+import os
+import csv
+import sys
+import json
+import mmap
+import struct
+import logging
+import zipfile
+from array import array
+
+from services.timetable import Timetable
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Compiled GTFS timetable.
+#
+# compile_feed() turns a GTFS feed (zip or directory) into one binary file
+# of flat integer columns; load() memory-maps it and hands the columns to
+# Timetable as-is. Nothing is parsed or copied at boot, and every worker
+# that maps the file shares the same pages.
+#
+# Columns are exactly Timetable's arrays, plus the derived departure index
+# so workers do not rebuild it:
+#   trip_ptr   I  per trip      CSR offsets into the stop-time columns
+#   trip_type  H  per trip      index into meta["types"]
+#   id_ptr     I  per trip + 1  offsets into id_blob
+#   id_blob    B                UTF-8 trip_ids, concatenated
+#   st_station H  per stop time interned station id (index into meta["stations"])
+#   st_arr     H  per stop time minutes since midnight (may exceed 1440)
+#   st_dep     H  per stop time
+#   st_trip    I  per stop time
+#   dep_ptr    I  per station + 1
+#   dep_min    H  per departure
+#   dep_row    I  per departure
+#
+# File layout:
+#   magic     8s     b'NKLGTT01'
+#   meta_len  <I     length of the JSON blob that follows
+#   meta      JSON   {"byteorder", "stations", "types", "columns": {name: [typecode, offset, count]}}
+#   padding   to an 8-byte boundary; column offsets are relative to here
+#   columns   native byte order (recorded in meta), each 8-byte aligned
+# ---------------------------------------------------------------------------
+
+MAGIC = b'NKLGTT01'
+
+# Suffixes dropped from stop names so feed stations line up with
+# STATION_COORDS ("Thane Railway Station" → "Thane")
+_NAME_SUFFIXES = (' Railway Station', ' Station')
+
+_COLUMNS = ('trip_ptr', 'trip_type', 'id_ptr', 'id_blob',
+            'st_station', 'st_arr', 'st_dep',
+            'st_trip', 'dep_ptr', 'dep_min', 'dep_row')
+
+
+def _gtfs_minutes(hms: str) -> int:
+    """GTFS 'H:MM:SS' (hours may run past 24) → whole minutes."""
+    h, m, _s = hms.strip().split(':')
+    return int(h) * 60 + int(m)
+
+
+def _station_name(stop_name: str) -> str:
+    name = stop_name.strip()
+    for suffix in _NAME_SUFFIXES:
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def _read_rows(feed_path: str, name: str):
+    """Yield dict rows of ``name`` from a GTFS zip or directory."""
+    if zipfile.is_zipfile(feed_path):
+        with zipfile.ZipFile(feed_path) as zf:
+            with zf.open(name) as raw:
+                yield from csv.DictReader(io.TextIOWrapper(raw, encoding='utf-8-sig'))
+    else:
+        with open(os.path.join(feed_path, name), encoding='utf-8-sig', newline='') as f:
+            yield from csv.DictReader(f)
+
+
+# ---------------------------------------------------------------------------
+# Compile
+# ---------------------------------------------------------------------------
+
+def compile_feed(feed_path: str, out_path: str, service_ids=None) -> dict:
+    """
+    Compile a GTFS feed into ``out_path``. Platform-level stops are merged
+    into their parent station. ``service_ids``, if given, keeps only trips
+    running on those calendar services (calendar dates are not modelled —
+    compile one file per day type). Returns a small summary dict.
+    """
+    # Station of each stop_id — platforms collapse onto their parent
+    stops = {row['stop_id']: row for row in _read_rows(feed_path, 'stops.txt')}
+    stop_station = {}
+    for stop_id, row in stops.items():
+        parent = (row.get('parent_station') or '').strip()
+        owner = stops.get(parent, row)
+        stop_station[stop_id] = _station_name(owner['stop_name'])
+
+    route_label = {
+        row['route_id']: (row.get('route_short_name') or row.get('route_long_name')
+                          or row['route_id']).strip()
+        for row in _read_rows(feed_path, 'routes.txt')
+    }
+    trip_route = {}
+    for row in _read_rows(feed_path, 'trips.txt'):
+        if service_ids and row['service_id'] not in service_ids:
+            continue
+        trip_route[row['trip_id']] = row['route_id']
+
+    stop_times = {}
+    for row in _read_rows(feed_path, 'stop_times.txt'):
+        if row['trip_id'] not in trip_route:
+            continue
+        arr = row.get('arrival_time') or row.get('departure_time')
+        dep = row.get('departure_time') or arr
+        if not arr:
+            continue                     # untimed stop — interpolation not supported
+        stop_times.setdefault(row['trip_id'], []).append((
+            int(row['stop_sequence']),
+            stop_station[row['stop_id']],
+            _gtfs_minutes(arr),
+            _gtfs_minutes(dep),
+        ))
+
+    trips = []
+    for trip_id, rows in stop_times.items():
+        rows.sort()
+        stops_in_order = []
+        for _seq, station, arr, dep in rows:
+            if stops_in_order and stops_in_order[-1][0] == station:
+                # Two platforms of one station back to back — keep one stop
+                stops_in_order[-1] = (station, stops_in_order[-1][1], dep)
+            else:
+                stops_in_order.append((station, arr, dep))
+        if len(stops_in_order) >= 2:
+            trips.append((trip_id, route_label[trip_route[trip_id]], stops_in_order))
+
+    # First departure order keeps each station's rows roughly time-sorted
+    trips.sort(key=lambda trip: trip[2][0][2])
+    timetable = Timetable.from_trips(trips)
+    write_timetable(out_path, timetable)
+    return {'stations': len(timetable.stations), 'trips': len(trips),
+            'stop_times': len(timetable.st_station)}
+
+
+def write_timetable(path: str, timetable: Timetable):
+    """
+    Serialise ``timetable``'s columns. Written to a temp file and renamed
+    so running workers never map a half-written file.
+    """
+    types = sorted(set(timetable.trip_types))
+    type_code = {name: i for i, name in enumerate(types)}
+    id_ptr, id_blob = array('I', [0]), bytearray()
+    for trip_id in timetable.trip_ids:
+        id_blob += trip_id.encode()
+        id_ptr.append(len(id_blob))
+
+    columns = {
+        'trip_ptr':   timetable.trip_ptr,
+        'trip_type':  array('H', (type_code[t] for t in timetable.trip_types)),
+        'id_ptr':     id_ptr,
+        'id_blob':    array('B', id_blob),
+        'st_station': timetable.st_station,
+        'st_arr':     timetable.st_arr,
+        'st_dep':     timetable.st_dep,
+        'st_trip':    timetable.st_trip,
+        'dep_ptr':    timetable.dep_ptr,
+        'dep_min':    timetable.dep_min,
+        'dep_row':    timetable.dep_row,
+    }
+
+    layout, body, offset = {}, [], 0
+    for name in _COLUMNS:
+        data = array(columns[name].typecode, columns[name]).tobytes()
+        layout[name] = [columns[name].typecode, offset, len(columns[name])]
+        pad = b'\0' * (-len(data) % 8)
+        body += [data, pad]
+        offset += len(data) + len(pad)
+
+    meta = json.dumps({
+        'byteorder': sys.byteorder,
+        'stations':  timetable.stations,
+        'types':     types,
+        'columns':   layout,
+    }).encode()
+    head = MAGIC + struct.pack('<I', len(meta)) + meta
+    head += b'\0' * (-len(head) % 8)
+
+    tmp = f"{path}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(head)
+        for chunk in body:
+            f.write(chunk)
+    os.replace(tmp, path)
+
+
+# ---------------------------------------------------------------------------
+# Load
+# ---------------------------------------------------------------------------
+
+class _TripIds:
+    """trip_id lookup over the mapped id_ptr / id_blob columns."""
+
+    def __init__(self, ptr, blob):
+        self._ptr = ptr
+        self._blob = blob
+
+    def __len__(self):
+        return len(self._ptr) - 1
+
+    def __getitem__(self, i):
+        return self._blob[self._ptr[i]:self._ptr[i + 1]].tobytes().decode()
+
+
+class _TripTypes:
+    """Trip type names from the mapped per-trip type codes."""
+
+    def __init__(self, codes, names):
+        self._codes = codes
+        self._names = names
+
+    def __len__(self):
+        return len(self._codes)
+
+    def __getitem__(self, i):
+        return self._names[self._codes[i]]
+
+
+def _open(path: str) -> Timetable:
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a compiled timetable")
+        meta_len, = struct.unpack('<I', f.read(4))
+        meta = json.loads(f.read(meta_len))
+        base = f.tell() + (-f.tell() % 8)
+        if meta['byteorder'] != sys.byteorder:
+            raise ValueError(f"{path} was compiled on a {meta['byteorder']}-endian host")
+        # The mapping outlives the file object; memoryviews keep it alive
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    view = memoryview(mapped)
+    cols = {}
+    for name, (typecode, offset, count) in meta['columns'].items():
+        size = array(typecode).itemsize
+        start = base + offset
+        cols[name] = view[start:start + count * size].cast(typecode)
+
+    return Timetable(
+        meta['stations'],
+        _TripIds(cols['id_ptr'], cols['id_blob']),
+        _TripTypes(cols['trip_type'], meta['types']),
+        cols['trip_ptr'], cols['st_station'], cols['st_arr'], cols['st_dep'],
+        indexes=(cols['st_trip'], cols['dep_ptr'], cols['dep_min'], cols['dep_row']),
+    )
+
+
+def load(path: str):
+    """Return a memory-mapped Timetable, or None if the file is missing or invalid."""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        timetable = _open(path)
+    except Exception as e:
+        logger.warning("Could not load compiled timetable %s: %s", path, e)
+        return None
+    logger.info("Compiled timetable loaded: %s (%d stations, %d trips, %d stop times)",
+                path, len(timetable.stations), len(timetable.trip_ids),
+                len(timetable.st_station))
+    return timetable
@@ -0,0 +1,266 @@
+from array import array
+from bisect import bisect_left
+
+INF = 1 << 30
+
+# Change time at a station with no INTERCHANGE_WALK_MINS entry —
+# crossing to another platform of the same line
+DEFAULT_CHANGE_MINS = 2
+
+
+class _Route:
+    """
+    Trips that share a stop sequence and never overtake one another, so
+    for every stop position the departure and arrival columns are sorted
+    and "first trip leaving at or after T" is one bisect.
+    """
+    __slots__ = ('stops', 'trips', 'dep', 'arr')
+
+    def __init__(self, stops):
+        self.stops = stops            # station ids in travel order
+        self.trips = []               # timetable trip index, earliest first
+        self.dep = [array('H') for _ in stops]   # dep[pos][i] for trip i
+        self.arr = [array('H') for _ in stops]
+
+    def add(self, trip, deps, arrs):
+        self.trips.append(trip)
+        for pos in range(len(self.stops)):
+            self.dep[pos].append(deps[pos])
+            self.arr[pos].append(arrs[pos])
+
+    def accepts(self, deps, arrs):
+        """Whether a trip can follow the last one without overtaking it."""
+        if not self.trips:
+            return True
+        return all(self.dep[pos][-1] <= deps[pos] and self.arr[pos][-1] <= arrs[pos]
+                   for pos in range(len(self.stops)))
+
+
+class JourneyPlanner:
+    """
+    Round-based transit router (RAPTOR) over a Timetable.
+
+    Round k relaxes every route serving a stop improved in round k - 1,
+    so after k rounds ``tau[k][s]`` is the earliest arrival at station s
+    using at most k trains. Changing trains at a station costs its
+    interchange walk; the origin needs none. Work per round is one scan of
+    the touched routes with a bisect per boarding, which keeps a query
+    across all four suburban lines in the low milliseconds.
+
+    Journeys are returned as dicts::
+
+        {'departure': min, 'arrival': min, 'transfers': n,
+         'legs': [(trip, from_station, to_station, dep_min, arr_min), ...]}
+    """
+
+    def __init__(self, timetable, change_mins: dict = None,
+                 default_change_mins: int = DEFAULT_CHANGE_MINS):
+        self.timetable = timetable
+        n = len(timetable.stations)
+        change_mins = change_mins or {}
+        self._change = [change_mins.get(name, default_change_mins)
+                        for name in timetable.stations]
+        self._routes = self._build_routes(timetable)
+        self._stop_routes = [[] for _ in range(n)]
+        for r, route in enumerate(self._routes):
+            for pos, s in enumerate(route.stops[:-1]):   # nobody boards at the terminus
+                self._stop_routes[s].append((r, pos))
+
+    @staticmethod
+    def _build_routes(tt):
+        """Group trips by stop sequence, then split each group into non-overtaking chains."""
+        patterns = {}
+        for t in range(len(tt.trip_ptr) - 1):
+            lo, hi = tt.trip_ptr[t], tt.trip_ptr[t + 1]
+            stops = tuple(tt.st_station[lo:hi])
+            patterns.setdefault(stops, []).append(
+                (tt.st_dep[lo], t, tt.st_dep[lo:hi].tolist(), tt.st_arr[lo:hi].tolist())
+            )
+
+        routes = []
+        for stops, trips in patterns.items():
+            chains = []
+            for _first_dep, t, deps, arrs in sorted(trips):
+                for route in chains:
+                    if route.accepts(deps, arrs):
+                        break
+                else:
+                    route = _Route(stops)
+                    chains.append(route)
+                route.add(t, deps, arrs)
+            routes.extend(chains)
+        return routes
+
+    # ------------------------------------------------------------------
+    def _rounds(self, tau, parent, source, dest, marked):
+        """
+        Run RAPTOR rounds 1..len(tau) - 1 from the stops in ``marked``,
+        improving ``tau`` / ``parent`` in place. Labels already present
+        (from a later departure, in a profile query) prune the search.
+        """
+        change, routes, stop_routes = self._change, self._routes, self._stop_routes
+        for k in range(1, len(tau)):
+            prev, cur, par = tau[k - 1], tau[k], parent[k]
+            for p in range(len(cur)):
+                if prev[p] < cur[p]:
+                    cur[p] = prev[p]
+
+            queue = {}
+            for p in marked:
+                for r, pos in stop_routes[p]:
+                    if pos < queue.get(r, INF):
+                        queue[r] = pos
+            marked = set()
+
+            for r, start in queue.items():
+                route = routes[r]
+                stops = route.stops
+                trip = board = None
+                for pos in range(start, len(stops)):
+                    p = stops[pos]
+                    if trip is not None:
+                        a = route.arr[pos][trip]
+                        if a < cur[p] and a < cur[dest]:
+                            cur[p] = a
+                            par[p] = (r, trip, board, pos)
+                            marked.add(p)
+                    if prev[p] >= INF or pos == len(stops) - 1:
+                        continue
+                    ready = prev[p] if k == 1 else prev[p] + change[p]
+                    deps = route.dep[pos]
+                    if trip is None:
+                        t = bisect_left(deps, ready)
+                        if t < len(deps):
+                            trip, board = t, pos
+                    elif ready <= deps[trip]:
+                        t = bisect_left(deps, ready, 0, trip)
+                        if t < trip:
+                            trip, board = t, pos
+
+    def _journey(self, tau, parent, source, dest, k):
+        """Walk parent pointers back from ``dest`` at round ``k``."""
+        names = self.timetable.stations
+        legs, p = [], dest
+        while k > 0:
+            if tau[k - 1][p] <= tau[k][p]:
+                k -= 1                      # label carried over from an earlier round
+                continue
+            r, trip, board, alight = parent[k][p]
+            route = self._routes[r]
+            legs.append((route.trips[trip], names[route.stops[board]], names[p],
+                         route.dep[board][trip], route.arr[alight][trip]))
+            p = route.stops[board]
+            k -= 1
+        if p != source or not legs:
+            return None
+        legs.reverse()
+        return {'departure': legs[0][3], 'arrival': legs[-1][4],
+                'transfers': len(legs) - 1, 'legs': legs}
+
+    def _labels(self, max_transfers):
+        n = len(self.timetable.stations)
+        rounds = max_transfers + 2          # round 0 + one per train
+        return [[INF] * n for _ in range(rounds)], [{} for _ in range(rounds)]
+
+    def _station_pair(self, source, dest):
+        idx = self.timetable.station_idx
+        s, d = idx.get(source), idx.get(dest)
+        if s is None or d is None or s == d:
+            return None, None
+        return s, d
+
+    # ------------------------------------------------------------------
+    def earliest_arrival(self, source: str, dest: str, depart_min: int,
+                         max_transfers: int = 3):
+        """Journey reaching ``dest`` soonest when leaving ``source`` at ``depart_min``, or None."""
+        s, d = self._station_pair(source, dest)
+        if s is None:
+            return None
+        tau, parent = self._labels(max_transfers)
+        tau[0][s] = depart_min
+        self._rounds(tau, parent, s, d, {s})
+
+        best = tau[-1][d]
+        if best >= INF:
+            return None
+        # Fewest trains among the journeys with the earliest arrival
+        k = next(k for k in range(len(tau)) if tau[k][d] == best)
+        return self._journey(tau, parent, s, d, k)
+
+    def profile(self, source: str, dest: str, window_start: int, window_end: int,
+                max_transfers: int = 3):
+        """
+        Every Pareto-optimal journey (later departure, earlier arrival,
+        fewer transfers) leaving ``source`` within the window, by
+        departure time. One rRAPTOR pass: departures are processed latest
+        first and labels are kept between them, so each run only explores
+        what an earlier start actually improves.
+        """
+        s, d = self._station_pair(source, dest)
+        if s is None:
+            return []
+        departures = sorted({
+            dep
+            for r, pos in self._stop_routes[s]
+            for dep in self._routes[r].dep[pos]
+            if window_start <= dep <= window_end
+        }, reverse=True)
+
+        tau, parent = self._labels(max_transfers)
+        found = []
+        for dep in departures:
+            before = [tau[k][d] for k in range(len(tau))]
+            tau[0][s] = dep
+            self._rounds(tau, parent, s, d, {s})
+            for k in range(1, len(tau)):
+                if tau[k][d] < before[k] and tau[k - 1][d] > tau[k][d]:
+                    journey = self._journey(tau, parent, s, d, k)
+                    if journey:
+                        found.append(journey)
+
+        pareto = []
+        for j in sorted(found, key=lambda j: (-j['departure'], j['arrival'], j['transfers'])):
+            if not any(o['departure'] >= j['departure'] and o['arrival'] <= j['arrival']
+                       and o['transfers'] <= j['transfers'] for o in pareto):
+                pareto.append(j)
+        pareto.reverse()
+        return pareto
+
+    def latest_departure(self, source: str, dest: str, deadline_min: int,
+                         max_transfers: int = 3, horizon_mins: int = 180):
+        """
+        Journey leaving ``source`` as late as possible while reaching
+        ``dest`` by ``deadline_min`` (fewest transfers on ties), or None.
+        Only departures within ``horizon_mins`` of the deadline are tried.
+        """
+        options = [j for j in self.profile(source, dest, deadline_min - horizon_mins,
+                                           deadline_min, max_transfers)
+                   if j['arrival'] <= deadline_min]
+        if not options:
+            return None
+        return max(options, key=lambda j: (j['departure'], -j['transfers']))
+
+    def latest_departure_sweep(self, source: str, dest: str, deadlines,
+                               max_transfers: int = 3, horizon_mins: int = 180):
+        """
+        latest_departure for every deadline in ascending ``deadlines`` from
+        a single profile over the whole window, merged by arrival time.
+        """
+        if not deadlines:
+            return []
+        journeys = sorted(
+            self.profile(source, dest, deadlines[0] - horizon_mins, deadlines[-1],
+                         max_transfers),
+            key=lambda j: j['arrival'],
+        )
+        out, best, i = [], None, 0
+        for deadline in deadlines:
+            while i < len(journeys) and journeys[i]['arrival'] <= deadline:
+                j = journeys[i]
+                if best is None or (j['departure'], -j['transfers']) > \
+                        (best['departure'], -best['transfers']):
+                    best = j
+                i += 1
+            out.append(best if best and best['departure'] >= deadline - horizon_mins
+                       else None)
+        return out
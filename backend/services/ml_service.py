@@ -9,13 +9,19 @@ from sklearn.metrics import r2_score
 import numpy as np
 from datetime import datetime
 import os
+import time
 import logging
+import threading
 
 # FIX: Added joblib for model persistence.
 # WHY: Without this, every server restart loses all learned trip data.
 #      joblib serialises the trained model to disk so it survives restarts.
 import joblib
 
+from config import Config
+from services.online_estimator import EwmaEstimator
+from services.trip_store import TripStore
+
 logger = logging.getLogger(__name__)
 
 # FIX: Configurable path for persisted model file.
@@ -26,78 +32,227 @@ MODEL_PATH = os.getenv(
     os.path.join(os.path.dirname(__file__), 'commute_model.joblib')
 )
 
+# FIX: Every prediction the model can make, precompiled into one array.
+# WHY: The feature space is only day × hour × minute = 10,080 points, yet
+#      each /api/predict paid sklearn's input validation plus a walk down
+#      50 trees (~1 ms+). The table is rebuilt after every fit and saved
+#      next to the model, stamped with the version of the model file it
+#      was compiled from; a prediction is then one array index.
+TABLE_PATH = f"{MODEL_PATH}.table.npz"
+TABLE_SHAPE = (7, 24, 60)     # day_of_week, hour, minute
+
+# State of the online estimator (ML_ESTIMATOR=ewma)
+EWMA_STATE_PATH = f"{MODEL_PATH}.ewma.npz"
+
 # FIX: Hard limits on acceptable training data.
 # WHY: Without bounds, a single corrupt row (e.g. duration=-50 or 9999)
 #      can poison the entire model and produce garbage predictions.
 MIN_DURATION_MINS = 5
 MAX_DURATION_MINS = 180
 
+# Mock historical data: [Hour, Minute, DayOfWeek] -> Duration(mins).
+# Seeds an empty trip store so there is always something to train on.
+SEED_TRIPS = [
+    [8, 0, 0, 55], [8, 30, 0, 60], [9, 0, 0, 65],   # Mon morning
+    [18, 0, 0, 70], [18, 30, 0, 75],                  # Mon evening
+    [8, 0, 1, 50], [9, 0, 1, 62],                     # Tue morning
+    # ... more data would be loaded from Firebase Firestore in real app
+]
+
 
 class MLService:
     def __init__(self):
         # FIX: RandomForest with n_estimators=50, random_state for reproducibility.
         # WHY: 50 trees is plenty for <1000 rows and keeps prediction fast (~1 ms).
-        self.model = RandomForestRegressor(
-            n_estimators=50, random_state=42
-        )
+        self.model = self._new_model()
         self.trained = False
-        # Mock historical data: [Hour, Minute, DayOfWeek] -> Duration(mins)
-        self.mock_data = [
-            [8, 0, 0, 55], [8, 30, 0, 60], [9, 0, 0, 65],   # Mon morning
-            [18, 0, 0, 70], [18, 30, 0, 75],                  # Mon evening
-            [8, 0, 1, 50], [9, 0, 1, 62],                     # Tue morning
-            # ... more data would be loaded from Firebase Firestore in real app
-        ]
+        self.table = None             # float32 TABLE_SHAPE, see compile_table
+        self.retrains = 0
+        # FIX: Reported trips are queued and folded in by a background
+        #      retrain instead of refitting on the request thread.
+        # WHY: Every trip used to cost a full 50-tree refit plus a disk
+        #      write, and concurrent reports raced on MODEL_PATH. Now a
+        #      report is an append; one thread per process retrains every
+        #      ML_RETRAIN_BATCH trips or ML_RETRAIN_DEBOUNCE_SECS.
+        self._pending = 0
+        self._pending_since = None
+        self._cond = threading.Condition()
+        self._train_lock = threading.Lock()      # one retrain at a time
+        self._worker_pid = None
+        # FIX: Workers pick up the model other workers save.
+        # WHY: Each worker retrains only on its own reports, so one that
+        #      got none kept serving the model it booted with. The
+        #      retrain thread checks MODEL_PATH's version (mtime + inode)
+        #      every ML_RELOAD_CHECK_SECS while idle and reloads on change.
+        self._model_version = None
+        # FIX: Trips live in a durable columnar log instead of a list.
+        # WHY: mock_data was per process, lost on restart and grew without
+        #      bound, and each retrain rebuilt a DataFrame from Python rows.
+        #      The store is shared by all workers, survives restarts, keeps
+        #      TRIP_STORE_RETENTION_DAYS / TRIP_STORE_MAX_ROWS, and hands
+        #      training its columns as memory-mapped arrays.
+        self.trips = TripStore(
+            Config.TRIP_STORE_PATH,
+            retention_days=Config.TRIP_STORE_RETENTION_DAYS,
+            max_rows=Config.TRIP_STORE_MAX_ROWS,
+        )
 
+        # FIX: Optional online estimator instead of the forest.
+        # WHY: A forest refit gets slower with every trip stored. With
+        #      ML_ESTIMATOR=ewma each trip updates one decayed per-(day,
+        #      time bucket) mean in O(1) and predictions use the same
+        #      table; the background job only syncs with other workers'
+        #      trips and saves the few-KB state.
+        self.estimator = None
+        # FIX: The background sync folds in only rows appended since the
+        #      last one, and swaps the result in under a short lock.
+        # WHY: It used to refit on the whole store while holding the lock
+        #      every reported trip takes, so a report could wait O(N).
+        #      _ewma_base covers exactly rows [0, _synced_rows) of
+        #      _synced_gen; the live estimator is that plus this worker's
+        #      trips reported since (_unsynced). Only a compaction, which
+        #      renumbers the rows, costs a full refit — still off the lock.
+        self._update_lock = threading.Lock()     # live estimator + _unsynced
+        self._ewma_base = None
+        self._synced_gen = None
+        self._synced_rows = 0
+        self._unsynced = []     # (generation, row, hour, minute, day, duration)
+        if Config.ML_ESTIMATOR == 'ewma':
+            self._init_estimator()
         # FIX: Try loading a persisted model first; fall back to training from scratch.
         # WHY: This is the core of the joblib persistence fix — on restart, we
         #      reload the model that was trained on real user data instead of
         #      starting over with only 7 mock rows.
-        if not self._load_model():
+        elif not self._load_model():
             self._train_initial_model()
 
+    @staticmethod
+    def _new_model():
+        return RandomForestRegressor(n_estimators=50, random_state=42)
+
     # ------------------------------------------------------------------
     def _load_model(self) -> bool:
-        """Attempt to load a previously saved model from disk."""
+        """Attempt to load a previously saved model (and its table) from disk."""
         try:
-            if os.path.exists(MODEL_PATH):
+            # Version before loading: a save in between is picked up next check
+            version = self._file_version(MODEL_PATH)
+            if version is not None:
                 self.model = joblib.load(MODEL_PATH)
+                self._model_version = version
                 self.trained = True
                 logger.info("ML Model loaded from disk: %s", MODEL_PATH)
+                self.table = self._load_table(version)
+                if self.table is None:
+                    self.table = self.compile_table(self.model)
+                    self._save_table(self.table, version)
                 return True
         except Exception as e:
             logger.warning("Could not load saved model, will retrain: %s", e)
         return False
 
-    def _save_model(self):
-        """Persist the trained model to disk."""
+    @staticmethod
+    def _load_table(model_version):
+        """
+        The saved prediction table, or None if missing, malformed or
+        compiled from another model file than ``model_version`` (a crash
+        between the two saves, or another worker mid-save).
+        """
         try:
-            joblib.dump(self.model, MODEL_PATH)
-            logger.info("ML Model saved to disk: %s", MODEL_PATH)
+            with np.load(TABLE_PATH) as saved:
+                if (int(saved['model_mtime_ns']), int(saved['model_ino'])) != tuple(model_version):
+                    return None
+                table = saved['table']
+        except (OSError, ValueError, KeyError):
+            return None
+        if table.shape != TABLE_SHAPE or table.dtype != np.float32:
+            return None
+        return table
+
+    @staticmethod
+    def _file_version(path):
+        """(mtime, inode) of ``path`` — every atomic write makes a new one — or None."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_ino
+
+    @staticmethod
+    def _atomic_write(path, write):
+        """
+        FIX: Write to a per-process temp file, then rename over ``path``.
+        WHY: joblib.dump writes in place, so a worker starting up (or two
+             workers saving at once) could read a half-written model.
+             os.replace is atomic: readers see the old file or the new one.
+        Returns the written file's version (see _file_version), or None.
+        """
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, 'wb') as f:
+                write(f)
+                f.flush()
+                st = os.fstat(f.fileno())
+            os.replace(tmp, path)
+            return st.st_mtime_ns, st.st_ino
         except Exception as e:
-            logger.warning("Could not save model: %s", e)
+            logger.warning("Could not save %s: %s", path, e)
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return None
+
+    def _save_model(self):
+        """Persist the trained model, then its prediction table, to disk."""
+        # Model first: the table records the model file's version, which
+        # only exists once the model is written
+        version = self._atomic_write(MODEL_PATH, lambda f: joblib.dump(self.model, f))
+        if version:
+            self._model_version = version
+            logger.info("ML Model saved to disk: %s", MODEL_PATH)
+            self._save_table(self.table, version)
+
+    def _save_table(self, table, model_version):
+        if table is not None:
+            self._atomic_write(TABLE_PATH, lambda f: np.savez(
+                f, table=table, model_mtime_ns=model_version[0], model_ino=model_version[1]))
+
+    @staticmethod
+    def compile_table(model) -> np.ndarray:
+        """Every (day_of_week, hour, minute) prediction of ``model``, as float32 TABLE_SHAPE."""
+        day, hour, minute = np.indices(TABLE_SHAPE).reshape(3, -1)
+        X = pd.DataFrame({'hour': hour, 'minute': minute, 'day_of_week': day})
+        return model.predict(X).astype(np.float32).reshape(TABLE_SHAPE)
 
     # ------------------------------------------------------------------
+    def _training_columns(self) -> dict:
+        """The trip store's columns, seeding it with SEED_TRIPS if it is empty."""
+        if len(self.trips) == 0:
+            self.trips.seed(*zip(*SEED_TRIPS))
+        return self.trips.arrays()
+
     def _train_initial_model(self):
-        """Trains a RandomForest model on mock historical data."""
+        """Trains a RandomForest model on every trip in the store."""
         try:
-            df = pd.DataFrame(
-                self.mock_data,
-                columns=['hour', 'minute', 'day_of_week', 'duration']
-            )
-            X = df[['hour', 'minute', 'day_of_week']]
-            y = df['duration']
+            cols = self._training_columns()
+            X = pd.DataFrame({name: cols[name] for name in ('hour', 'minute', 'day_of_week')})
+            y = cols['duration']
 
-            self.model.fit(X, y)
+            # Fit a fresh forest and swap it in, so predictions running
+            # meanwhile keep using the old one instead of a half-fitted one
+            model = self._new_model()
+            model.fit(X, y)
+            table = self.compile_table(model)
+            self.model, self.table = model, table
             self.trained = True
 
             # FIX: Log R² score so you can track model quality over time.
             # WHY: Without a metric you're flying blind — R² tells you how much
             #      variance the model explains (1.0 = perfect, 0.0 = guessing).
-            score = self.model.score(X, y)
+            score = model.score(X, y)
             logger.info(
                 "ML Model trained on %d rows (R²=%.3f on training set).",
-                len(df), score
+                len(y), score
             )
 
             # FIX: Save immediately after training.
@@ -105,12 +260,62 @@ class MLService:
         except Exception as e:
             logger.error("Error training ML model: %s", e)
 
+    # ------------------------------------------------------------------
+    def _init_estimator(self):
+        """Restore the online estimator's state, catching up on trips logged since."""
+        self._training_columns()     # seed an empty store
+        base = EwmaEstimator(Config.ML_EWMA_BUCKET_MINS, Config.ML_EWMA_HALF_LIFE)
+        saved = base.load(EWMA_STATE_PATH)
+        if saved and 'generation' in saved and 'rows' in saved:
+            self._ewma_base = base
+            self._synced_gen, self._synced_rows = saved['generation'], saved['rows']
+        self._sync_estimator()
+        logger.info("Online estimator ready on %d trips", self._synced_rows)
+
+    def _sync_estimator(self):
+        """
+        Bring the estimator up to date with the store: fold in the rows
+        appended since the last sync (any worker's), or refit if the store
+        was compacted, then swap it in and save its state.
+        """
+        generation, cols = self.trips.snapshot()
+        rows = len(cols['duration'])
+        if (self._ewma_base is not None and generation == self._synced_gen
+                and self._synced_rows <= rows):
+            base = self._ewma_base.copy()
+            new = slice(self._synced_rows, rows)
+            if new.start < new.stop:
+                base.update_many(cols['hour'][new], cols['minute'][new],
+                                 cols['day_of_week'][new], cols['duration'][new])
+        else:
+            base = EwmaEstimator(Config.ML_EWMA_BUCKET_MINS, Config.ML_EWMA_HALF_LIFE)
+            base.fit(cols['hour'], cols['minute'], cols['day_of_week'], cols['duration'])
+            logger.info("Online estimator refitted on %d trips (%s)", rows, generation)
+
+        with self._update_lock:
+            # Our own trips logged after the snapshot are not in base yet
+            self._unsynced = [t for t in self._unsynced
+                              if t[0] == generation and t[1] >= rows]
+            live = base.copy()
+            if self._unsynced:
+                live.update_many(*zip(*(t[2:] for t in self._unsynced)))
+            self._ewma_base, self._synced_gen, self._synced_rows = base, generation, rows
+            self.estimator, self.table = live, live.table
+            self.trained = True
+        self._atomic_write(EWMA_STATE_PATH, lambda f: base.save(
+            f, generation=generation, rows=rows))
+
     # ------------------------------------------------------------------
     def predict_commute_time(self, hour, minute, day_of_week):
         """Predicts commute time based on time and day."""
+        self._ensure_worker()
         if not self.trained:
             return None
 
+        table = self.table
+        if table is not None and 0 <= day_of_week < 7 and 0 <= hour < 24 and 0 <= minute < 60:
+            return round(float(table[day_of_week, hour, minute]), 2)
+
         try:
             prediction = self.model.predict([[hour, minute, day_of_week]])
             return round(float(prediction[0]), 2)
@@ -118,9 +323,34 @@ class MLService:
             logger.error("Prediction error: %s", e)
             return None
 
+    def predict_batch(self, days, minutes_of_day):
+        """
+        Predictions for every day in ``days`` × minute of day in
+        ``minutes_of_day`` (int arrays, already range-checked) as a float
+        array of shape (len(days), len(minutes_of_day)), or None if no
+        model is trained. One table gather, else one model call.
+        """
+        self._ensure_worker()
+        if not self.trained:
+            return None
+        days = np.asarray(days, dtype=np.intp)
+        minutes_of_day = np.asarray(minutes_of_day, dtype=np.intp)
+
+        table = self.table
+        if table is not None:
+            return table.reshape(7, 1440)[np.ix_(days, minutes_of_day)]
+
+        day, mod = np.meshgrid(days, minutes_of_day, indexing='ij')
+        X = pd.DataFrame({'hour': mod.ravel() // 60, 'minute': mod.ravel() % 60,
+                          'day_of_week': day.ravel()})
+        return self.model.predict(X).reshape(day.shape)
+
     # ------------------------------------------------------------------
-    def learn_from_trip(self, departure_time, day_of_week, actual_duration):
-        """Updates the model with new trip data (incremental retraining)."""
+    def learn_from_trip(self, departure_time, day_of_week, actual_duration) -> bool:
+        """
+        Queue a reported trip for the next background retrain. Returns
+        True if the trip was accepted; the model changes later.
+        """
         # FIX: Validate departure_time format before parsing.
         # WHY: A malformed string (e.g. "8am" instead of "08:00") crashes
         #      strptime and takes down the entire /api/learn endpoint.
@@ -128,14 +358,14 @@ class MLService:
             dt = datetime.strptime(departure_time, '%H:%M')
         except (ValueError, TypeError) as e:
             logger.warning("Invalid departure_time '%s': %s", departure_time, e)
-            return
+            return False
 
         # FIX: Clamp actual_duration to [MIN, MAX] range.
         # WHY: A single corrupt value (e.g. -30 or 9999) can permanently
         #      skew predictions. Clamping keeps the training set sane.
         if not isinstance(actual_duration, (int, float)):
             logger.warning("Invalid actual_duration type: %s", type(actual_duration))
-            return
+            return False
         actual_duration = max(MIN_DURATION_MINS, min(MAX_DURATION_MINS, actual_duration))
 
         # FIX: Validate day_of_week range.
@@ -143,8 +373,96 @@ class MLService:
         #      has never seen, leading to unpredictable extrapolation.
         if not (0 <= int(day_of_week) <= 6):
             logger.warning("Invalid day_of_week: %s", day_of_week)
+            return False
+
+        if self.estimator is not None:
+            # Under the lock so a sync's snapshot of the store either
+            # includes this trip or it is replayed on top — never both
+            with self._update_lock:
+                trip = (dt.hour, dt.minute, int(day_of_week), actual_duration)
+                self._unsynced.append(self.trips.append(*trip) + trip)
+                self.estimator.update(*trip)
+                self.table = self.estimator.table
+        else:
+            self.trips.append(dt.hour, dt.minute, int(day_of_week), actual_duration)
+        self._ensure_worker()
+        with self._cond:
+            if not self._pending:
+                self._pending_since = time.monotonic()
+            self._pending += 1
+            self._cond.notify()
+        return True
+
+    def flush(self):
+        """Retrain now on every queued trip (tests, shutdown hooks)."""
+        with self._cond:
+            batch, self._pending = self._pending, 0
+        if batch:
+            self._retrain(batch)
+
+    def stats(self) -> dict:
+        return {'estimator': 'ewma' if self.estimator is not None else 'forest',
+                'rows': len(self.trips), 'pending': self._pending,
+                'retrains': self.retrains}
+
+    # ------------------------------------------------------------------
+    def _ensure_worker(self):
+        # Started per process on first use — a thread started in the
+        # preloaded gunicorn master would not exist in the workers
+        if self._worker_pid == os.getpid():
+            return
+        with self._cond:
+            if self._worker_pid == os.getpid():
+                return
+            self._worker_pid = os.getpid()
+            threading.Thread(target=self._retrain_loop, name='ml-retrain',
+                             daemon=True).start()
+
+    def _retrain_loop(self):
+        while True:
+            with self._cond:
+                if not self._pending:
+                    self._cond.wait(Config.ML_RELOAD_CHECK_SECS)
+                # Debounce: let a batch build up, but never hold a trip
+                # longer than ML_RETRAIN_DEBOUNCE_SECS
+                while 0 < self._pending < Config.ML_RETRAIN_BATCH:
+                    remaining = (self._pending_since + Config.ML_RETRAIN_DEBOUNCE_SECS
+                                 - time.monotonic())
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._pending = self._pending, 0
+            try:
+                if batch:
+                    self._retrain(batch)
+                else:
+                    self._catch_up()
+            except Exception as e:
+                logger.error("ML background job failed: %s", e)
+
+    def _catch_up(self):
+        """Take in what other workers did: their saved model, or (ewma) their trips."""
+        if self.estimator is not None:
+            generation, rows = self.trips.generation, len(self.trips)
+            if (generation, rows) != (self._synced_gen, self._synced_rows):
+                with self._train_lock:
+                    self._sync_estimator()
             return
+        version = self._file_version(MODEL_PATH)
+        if version is not None and version != self._model_version:
+            with self._train_lock:
+                if self._load_model():
+                    logger.info("ML Model reloaded: saved by another worker")
 
-        new_row = [dt.hour, dt.minute, int(day_of_week), actual_duration]
-        self.mock_data.append(new_row)
-        self._train_initial_model()   # retrain + save
+    def _retrain(self, batch: int):
+        with self._train_lock:
+            t0 = time.perf_counter()
+            if self.trips.needs_compaction():
+                self.trips.compact()
+            if self.estimator is not None:
+                self._sync_estimator()     # every worker's trips since the last sync
+            else:
+                self._train_initial_model()   # fit, swap in, save atomically
+            self.retrains += 1
+        logger.info("ML retrain #%d: %d new trips in %.0f ms", self.retrains,
+                    batch, (time.perf_counter() - t0) * 1000)
@@ -0,0 +1,174 @@
+import os
+import json
+import math
+import struct
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Offline road-time engine.
+#
+# A precomputed zone → target travel-time matrix, built once by
+# build_offline_matrix.py and memory-mapped at startup. Zones are a regular
+# lon/lat grid over the Mumbai viewbox; targets are every station plus
+# KJSCE. Any trip with one end at a target and the other inside the grid is
+# answered in-process with no network.
+#
+# File layout (little-endian):
+#   magic     8s     b'NKLORM01'
+#   header    <ddddIII  lon0, lat0, cell_lon, cell_lat, nx, ny, n_targets
+#   meta_len  <I     length of the JSON blob that follows
+#   meta      JSON   {"targets": [[name, lng, lat], ...]}
+#   padding   to an 8-byte boundary
+#   durations uint16[nx * ny, n_targets]   seconds, MISSING if unroutable
+#   distances uint16[nx * ny, n_targets]   tens of metres, MISSING if unroutable
+# ---------------------------------------------------------------------------
+
+MAGIC = b'NKLORM01'
+_HEADER = struct.Struct('<ddddIII')
+MISSING = 0xFFFF
+
+# A point this close to a target's coordinates counts as that target
+TARGET_MATCH_KM = 0.2
+
+# Access leg inside a zone: same 1.4× winding / 25 km/h as _haversine_fallback
+_WINDING = 1.4
+_CITY_KMH = 25
+
+
+def _km(lon1, lat1, lon2, lat2):
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = (math.sin(dlat / 2) ** 2
+         + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2))
+         * math.sin(dlon / 2) ** 2)
+    return 6371 * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def zone_grid(viewbox, cell_deg):
+    """(lon0, lat0, nx, ny) for a grid of cell_deg squares covering viewbox."""
+    lon_min, lat_min, lon_max, lat_max = viewbox
+    nx = math.ceil((lon_max - lon_min) / cell_deg)
+    ny = math.ceil((lat_max - lat_min) / cell_deg)
+    return lon_min, lat_min, nx, ny
+
+
+def zone_centroids(lon0, lat0, cell_deg, nx, ny):
+    """(nx * ny, 2) array of zone centre (lng, lat), row-major by latitude."""
+    xs = lon0 + (np.arange(nx) + 0.5) * cell_deg
+    ys = lat0 + (np.arange(ny) + 0.5) * cell_deg
+    lon, lat = np.meshgrid(xs, ys)
+    return np.column_stack([lon.ravel(), lat.ravel()])
+
+
+def write_matrix(path, lon0, lat0, cell_deg, nx, ny, targets,
+                 durations_s, distances_m):
+    """
+    Serialise a zone × target matrix. ``targets`` is a list of
+    (name, lng, lat); NaN cells are stored as MISSING. Written to a temp
+    file and renamed so running workers never map a half-written file.
+    """
+    meta = json.dumps({'targets': [list(t) for t in targets]}).encode()
+    head = MAGIC + _HEADER.pack(lon0, lat0, cell_deg, cell_deg, nx, ny, len(targets)) \
+        + struct.pack('<I', len(meta)) + meta
+    head += b'\0' * (-len(head) % 8)
+
+    def _pack(values, scale):
+        out = np.full(values.shape, MISSING, dtype='<u2')
+        ok = ~np.isnan(values)
+        out[ok] = np.clip(np.round(values[ok] / scale), 0, MISSING - 1)
+        return out
+
+    tmp = f"{path}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(head)
+        f.write(_pack(durations_s, 1).tobytes())
+        f.write(_pack(distances_m, 10).tobytes())
+    os.replace(tmp, path)
+
+
+class OfflineRouter:
+    """Read-only, memory-mapped view of a matrix written by write_matrix."""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not an offline route matrix")
+            (self.lon0, self.lat0, self.cell_lon, self.cell_lat,
+             self.nx, self.ny, n_targets) = _HEADER.unpack(f.read(_HEADER.size))
+            meta_len, = struct.unpack('<I', f.read(4))
+            meta = json.loads(f.read(meta_len))
+            offset = f.tell() + (-f.tell() % 8)
+
+        self.path = path
+        self.target_names = [t[0] for t in meta['targets']]
+        self._target_xy = np.array([t[1:] for t in meta['targets']], dtype=float)
+
+        # Pages are shared by every worker that maps the same file
+        shape = (self.nx * self.ny, n_targets)
+        self._durations = np.memmap(path, dtype='<u2', mode='r',
+                                    offset=offset, shape=shape)
+        self._distances = np.memmap(path, dtype='<u2', mode='r',
+                                    offset=offset + self._durations.nbytes, shape=shape)
+
+    @classmethod
+    def load(cls, path: str):
+        """Return an OfflineRouter, or None if the file is missing or invalid."""
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            router = cls(path)
+        except Exception as e:
+            logger.warning("Could not load offline route matrix %s: %s", path, e)
+            return None
+        logger.info("Offline route matrix loaded: %s (%d zones × %d targets)",
+                    path, router.nx * router.ny, len(router.target_names))
+        return router
+
+    # ------------------------------------------------------------------
+    def _target(self, coords):
+        d = np.hypot(
+            (self._target_xy[:, 0] - coords[0]) * math.cos(math.radians(coords[1])),
+            self._target_xy[:, 1] - coords[1],
+        ) * 111.32
+        i = int(np.argmin(d))
+        return i if d[i] <= TARGET_MATCH_KM else None
+
+    def _zone(self, coords):
+        ix = int((coords[0] - self.lon0) // self.cell_lon)
+        iy = int((coords[1] - self.lat0) // self.cell_lat)
+        if not (0 <= ix < self.nx and 0 <= iy < self.ny):
+            return None, None
+        centre = (self.lon0 + (ix + 0.5) * self.cell_lon,
+                  self.lat0 + (iy + 0.5) * self.cell_lat)
+        return iy * self.nx + ix, centre
+
+    def lookup(self, o_coords, d_coords):
+        """
+        (duration_seconds, distance_m) for a trip with one end at a target,
+        or None if the matrix cannot answer it. Road times are treated as
+        symmetric, so target → zone uses the zone → target cell.
+        """
+        t = self._target(d_coords)
+        point = o_coords
+        if t is None:
+            t = self._target(o_coords)
+            point = d_coords
+        if t is None:
+            return None
+
+        zone, centre = self._zone(point)
+        if zone is None:
+            return None
+        secs = int(self._durations[zone, t])
+        tens_m = int(self._distances[zone, t])
+        if secs == MISSING:
+            return None
+
+        # Zone centre → actual point, at the Haversine fallback's speed
+        access_km = _km(point[0], point[1], centre[0], centre[1]) * _WINDING
+        access_secs = access_km / _CITY_KMH * 3600
+        return secs + access_secs, tens_m * 10 + access_km * 1000
@@ -0,0 +1,151 @@
+import numpy as np
+
+TABLE_SHAPE = (7, 24, 60)     # day_of_week, hour, minute — as MLService's table
+
+
+class EwmaEstimator:
+    """
+    Streaming commute-time estimate per (day_of_week, time bucket).
+
+    Each cell keeps an exponentially decayed mean of the trips that fell
+    into it: a new trip costs one multiply-add, whatever the history size,
+    and an older trip counts half as much after ``half_life`` newer ones
+    in the same cell — so the estimate follows a changing commute instead
+    of averaging it away.
+
+    State is two float32 (7, 1440 / bucket_mins) arrays, a few KB. Cells
+    with no trips borrow the nearest filled bucket of the same day, then
+    the overall mean.
+    """
+
+    def __init__(self, bucket_mins: int = 15, half_life: float = 20):
+        if 1440 % bucket_mins:
+            raise ValueError('bucket_mins must divide a day (1440 minutes)')
+        self.bucket_mins = bucket_mins
+        self.half_life = half_life
+        self.decay = 0.5 ** (1 / half_life)
+        n_buckets = 1440 // bucket_mins
+        self.mean = np.zeros((7, n_buckets), dtype=np.float32)
+        self.weight = np.zeros((7, n_buckets), dtype=np.float32)
+        self.table = self.compile_table()
+
+    # ------------------------------------------------------------------
+    def _buckets(self, hours, minutes):
+        return (np.asarray(hours, dtype=np.intp) * 60
+                + np.asarray(minutes, dtype=np.intp)) // self.bucket_mins
+
+    def update(self, hour: int, minute: int, day_of_week: int, duration: float):
+        """
+        Fold in one trip — O(buckets per day); the table is patched in
+        place. The trip's whole day is recompiled, since its empty buckets
+        may borrow this one, and so are days with no trips at all, which
+        borrow the overall mean.
+        """
+        b = (hour * 60 + minute) // self.bucket_mins
+        w = self.weight[day_of_week, b] * self.decay + 1
+        self.mean[day_of_week, b] += (duration - self.mean[day_of_week, b]) / w
+        self.weight[day_of_week, b] = w
+
+        overall = self._overall_mean()
+        filled = self.weight > 0
+        for day in range(7):
+            if day == day_of_week or not filled[day].any():
+                self.table[day] = np.repeat(self._day_means(day, filled[day], overall),
+                                            self.bucket_mins).reshape(TABLE_SHAPE[1:])
+
+    def update_many(self, hours, minutes, days, durations):
+        """
+        Fold in trips in the order they happened. Same result as calling
+        update() on each, but vectorised and with one table rebuild: the
+        decayed sum mean × weight follows s' = s · decay + duration, so
+        a trip's weight is decay ** (number of later trips in its cell)
+        and the old state decays once per new trip in its cell.
+        """
+        cells = (np.asarray(days, dtype=np.intp) * self.mean.shape[1]
+                 + self._buckets(hours, minutes))
+        durations = np.asarray(durations, dtype=np.float64)
+        n_cells = self.mean.size
+
+        order = np.argsort(cells, kind='stable')          # time order kept within a cell
+        sorted_cells = cells[order]
+        counts = np.bincount(cells, minlength=n_cells)
+        later = np.cumsum(counts)[sorted_cells] - 1 - np.arange(len(cells))
+        w = self.decay ** later
+
+        old_weight = self.weight.ravel().astype(np.float64) * self.decay ** counts
+        old_total = self.mean.ravel().astype(np.float64) * old_weight
+        weight = old_weight + np.bincount(sorted_cells, weights=w, minlength=n_cells)
+        total = old_total + np.bincount(sorted_cells, weights=w * durations[order],
+                                         minlength=n_cells)
+        mean = np.divide(total, weight, out=np.zeros(n_cells), where=weight > 0)
+
+        self.mean = mean.astype(np.float32).reshape(self.mean.shape)
+        self.weight = weight.astype(np.float32).reshape(self.weight.shape)
+        self.table = self.compile_table()
+
+    def fit(self, hours, minutes, days, durations):
+        """Rebuild from scratch from trips in the order they happened."""
+        self.mean = np.zeros_like(self.mean)
+        self.weight = np.zeros_like(self.weight)
+        self.update_many(hours, minutes, days, durations)
+
+    def copy(self) -> 'EwmaEstimator':
+        """An independent estimator with the same settings and state."""
+        other = EwmaEstimator.__new__(EwmaEstimator)
+        other.__dict__.update(self.__dict__)
+        other.mean, other.weight, other.table = self.mean.copy(), self.weight.copy(), self.table.copy()
+        return other
+
+    # ------------------------------------------------------------------
+    def compile_table(self) -> np.ndarray:
+        """Prediction for every (day_of_week, hour, minute), as float32 TABLE_SHAPE."""
+        overall = self._overall_mean()
+        filled = self.weight > 0
+        means = np.stack([self._day_means(day, filled[day], overall) for day in range(7)])
+        return np.repeat(means, self.bucket_mins, axis=1).reshape(TABLE_SHAPE)
+
+    def _overall_mean(self) -> float:
+        total = float(self.weight.sum())
+        return float((self.mean * self.weight).sum()) / total if total > 0 else 0.0
+
+    def _day_means(self, day: int, filled: np.ndarray, overall: float) -> np.ndarray:
+        """One day's bucket means, empty buckets filled in."""
+        means = self.mean[day].copy()
+        have = np.flatnonzero(filled)
+        missing = np.flatnonzero(~filled)
+        if not len(missing):
+            return means
+        if not len(have):
+            means[:] = overall
+            return means
+        # Nearest filled bucket, wrapping around midnight
+        n_buckets = len(means)
+        gap = np.abs(missing[:, None] - have[None, :])
+        gap = np.minimum(gap, n_buckets - gap)
+        means[missing] = means[have[np.argmin(gap, axis=1)]]
+        return means
+
+    # ------------------------------------------------------------------
+    def save(self, f, **extra):
+        """Write the state (plus small ``extra`` scalars) as .npz to file object ``f``."""
+        np.savez(f, mean=self.mean, weight=self.weight,
+                 bucket_mins=self.bucket_mins, half_life=self.half_life, **extra)
+
+    def load(self, path: str):
+        """
+        Restore state saved with matching settings. Returns the ``extra``
+        scalars as a dict, or None if the file is missing or does not fit.
+        """
+        try:
+            with np.load(path) as state:
+                if int(state['bucket_mins']) != self.bucket_mins \
+                        or float(state['half_life']) != self.half_life:
+                    return None
+                self.mean = state['mean'].astype(np.float32)
+                self.weight = state['weight'].astype(np.float32)
+                extra = {k: state[k].item() for k in state.files
+                         if k not in ('mean', 'weight', 'bucket_mins', 'half_life')}
+        except (OSError, ValueError, KeyError):
+            return None
+        self.table = self.compile_table()
+        return extra
@@ -0,0 +1,95 @@
+import time
+import logging
+from array import array
+
+logger = logging.getLogger(__name__)
+
+_NONE = 0xFFFF          # slot with no train that makes it
+
+
+class StationPlanTable:
+    """
+    Materialised station → destination-station train options.
+
+    For every boarding station and every ``slot_mins`` arrival slot of the
+    day, the train (or journey with changes) a hybrid plan would pick:
+    the one leaving the station latest while still reaching the gate by
+    the slot, walk included. None of that depends on the user, so plans
+    only add their own home → station leg on top of one lookup.
+
+    Slots are keyed by gate arrival minus the delay buffer, which is all
+    the train choice depends on. Each station holds an ``array('H')`` of
+    indexes into its distinct train rows — consecutive slots usually share
+    a train, so ~80 stations × 288 slots stays a few hundred KB.
+
+    Built once on construction — in the gunicorn master when preloaded,
+    so workers share it copy-on-write. The timetable it derives from does
+    not change while the process runs, so nothing rebuilds it on a timer
+    (each rebuild cost ~0.75 s of GIL per worker and un-shared the pages);
+    call refresh() after swapping in a new timetable. A rebuild swaps the
+    whole table in, so readers never see a partial one.
+    """
+
+    def __init__(self, trains, stations, dest_station: str, walk_mins: int,
+                 slot_mins: int = 5):
+        self.trains = trains
+        self.stations = [s for s in stations if s != dest_station]
+        self.dest_station = dest_station
+        self.walk_mins = walk_mins
+        self.slot_mins = slot_mins
+        self.built_at = None
+        self.build_ms = None
+        self._table = {}
+        self.refresh()
+
+    # ------------------------------------------------------------------
+    def refresh(self):
+        """Recompute every station's slots and swap the new table in."""
+        t0 = time.perf_counter()
+        slots = range(0, 1440, self.slot_mins)
+        deadlines = [arrival - self.walk_mins for arrival in slots]
+
+        table = {}
+        for station in self.stations:
+            rows, index, slot_row = [], {}, array('H')
+            for row in self.trains.latest_departures_by(station, self.dest_station, deadlines):
+                if row is None:
+                    slot_row.append(_NONE)
+                    continue
+                key = (row.get('train_id'),
+                       tuple(leg['train_id'] for leg in row.get('legs', ())))
+                if key not in index:
+                    index[key] = len(rows)
+                    rows.append(row)
+                slot_row.append(index[key])
+            table[station] = (rows, slot_row)
+
+        self._table = table
+        self.built_at = time.time()
+        self.build_ms = (time.perf_counter() - t0) * 1000
+        logger.info("Station plan table: %d stations × %d slots in %.0f ms",
+                    len(table), len(deadlines), self.build_ms)
+
+    def lookup(self, station: str, arrival_min: int):
+        """
+        (found, train_row) for a gate arrival at ``arrival_min`` minus the
+        delay buffer. found is False when the minute is not on a slot or
+        the station is not materialised — the caller computes it live.
+        The row is shared: treat it as read-only.
+        """
+        entry = self._table.get(station)
+        if entry is None or arrival_min < 0 or arrival_min % self.slot_mins:
+            return False, None
+        rows, slot_row = entry
+        i = arrival_min // self.slot_mins
+        if i >= len(slot_row):
+            return False, None
+        return True, (None if slot_row[i] == _NONE else rows[slot_row[i]])
+
+    def stats(self) -> dict:
+        return {
+            'stations':  len(self._table),
+            'slot_mins': self.slot_mins,
+            'built_at':  self.built_at,
+            'build_ms':  round(self.build_ms, 1) if self.build_ms is not None else None,
+        }
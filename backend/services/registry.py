@@ -0,0 +1,80 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Process-wide service instances.
+#
+# Every service is built on first use and then shared by all threads of the
+# worker. Under gunicorn with preload (gunicorn.conf.py) the master builds
+# the heavy, read-only ones — timetable, journey planner, station index,
+# offline matrix, ML model — once before forking, and workers inherit those
+# pages copy-on-write instead of each rebuilding its own copy.
+#
+# Shared instances are treated as immutable after construction. Their
+# mutable parts (HTTP sessions, SQLite connections, thread pools, caches)
+# are per-process or lock-protected already, so they stay correct across
+# the fork.
+# ---------------------------------------------------------------------------
+
+_instances = {}
+_lock = threading.RLock()     # builders call get() for their dependencies
+
+
+# Builders import lazily so `import app` does not pull in pandas/sklearn
+# or firebase_admin until a service actually needs them.
+def _build_traffic():
+    from services.traffic_service import TrafficService
+    return TrafficService()
+
+
+def _build_trains():
+    from services.train_service import TrainService
+    return TrainService()
+
+
+def _build_commute():
+    from services.commute_service import CommuteService
+    return CommuteService(traffic=get('traffic'), trains=get('trains'))
+
+
+def _build_notification():
+    from services.notification_service import NotificationService
+    return NotificationService()
+
+
+def _build_ml():
+    from services.ml_service import MLService
+    return MLService()
+
+
+_BUILDERS = {
+    'traffic':      _build_traffic,
+    'trains':       _build_trains,
+    'commute':      _build_commute,
+    'notification': _build_notification,
+    'ml':           _build_ml,
+}
+
+
+def get(name: str):
+    """The shared instance of service ``name``, built on first call."""
+    instance = _instances.get(name)
+    if instance is None:
+        with _lock:
+            instance = _instances.get(name)
+            if instance is None:
+                t0 = time.perf_counter()
+                instance = _BUILDERS[name]()
+                _instances[name] = instance
+                logger.info("Service '%s' ready in %.0f ms",
+                            name, (time.perf_counter() - t0) * 1000)
+    return instance
+
+
+def preload(names):
+    """Build ``names`` now, e.g. in the gunicorn master before forking."""
+    for name in names:
+        get(name)
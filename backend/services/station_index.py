@@ -0,0 +1,41 @@
+import numpy as np
+
+EARTH_RADIUS_KM = 6371
+
+
+class StationIndex:
+    """
+    k-nearest-station lookup over a packed coordinate array.
+
+    FIX: Replaces keyword matching on the address text.
+    WHY: Substring matching only knew ~60 hand-picked keywords and sent
+         every unmatched address to Thane. With ~80 stations a vectorised
+         Haversine over one NumPy array answers in microseconds — a KD-tree
+         would only pay off with thousands of points.
+    """
+
+    def __init__(self, coords: dict):
+        """:param coords: station name → [lng, lat]"""
+        self.names = list(coords)
+        packed = np.radians(np.array([coords[n] for n in self.names], dtype=float))
+        self._lon = packed[:, 0]
+        self._lat = packed[:, 1]
+        self._cos_lat = np.cos(self._lat)
+
+    def __len__(self):
+        return len(self.names)
+
+    def distances_km(self, lng: float, lat: float) -> np.ndarray:
+        """Great-circle distance from (lng, lat) to every station."""
+        lon0, lat0 = np.radians(lng), np.radians(lat)
+        a = (np.sin((self._lat - lat0) / 2) ** 2
+             + np.cos(lat0) * self._cos_lat * np.sin((self._lon - lon0) / 2) ** 2)
+        return EARTH_RADIUS_KM * 2 * np.arcsin(np.sqrt(a))
+
+    def nearest(self, lng: float, lat: float, k: int = 1):
+        """Return up to k (station, km) pairs, closest first."""
+        dist = self.distances_km(lng, lat)
+        k = min(k, len(dist))
+        idx = np.argpartition(dist, k - 1)[:k] if k < len(dist) else np.arange(k)
+        idx = idx[np.argsort(dist[idx])]
+        return [(self.names[i], round(float(dist[i]), 2)) for i in idx]
@@ -0,0 +1,77 @@
+import time
+import asyncio
+import threading
+
+
+class RateLimitExceeded(RuntimeError):
+    """Raised when a caller would have to queue longer than the limiter allows."""
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket with FIFO queueing and a bounded wait.
+
+    When the bucket is empty a caller reserves the next token by driving
+    the balance negative and waits until it is due. Later callers see a
+    more negative balance and therefore queue behind — first come, first
+    served — and anyone whose wait would exceed ``max_wait`` is turned
+    away immediately instead of piling up behind the limit.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1, max_wait: float = 5.0):
+        self.rate = rate            # tokens per second
+        self.capacity = capacity    # burst size
+        self.max_wait = max_wait
+        self.rejected = 0
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take the next token; return how long to wait for it, or raise RateLimitExceeded."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity,
+                               self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+            if wait > self.max_wait:
+                self.rejected += 1
+                raise RateLimitExceeded(
+                    f"rate limit queue is full (wait {wait:.1f}s > {self.max_wait}s)"
+                )
+            self._tokens -= 1
+        return wait
+
+    async def acquire_async(self):
+        """Wait for a token without blocking the event loop; raise RateLimitExceeded if that is too long."""
+        wait = self.reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+
+class AsyncSingleFlight:
+    """
+    Collapse concurrent calls for the same key into one execution, for
+    coroutines on one event loop.
+
+    The first caller for a key starts ``coro_fn()``; anyone arriving while
+    it is in flight awaits the same task and gets the same result (or the
+    same exception). The task is shielded, so a cancelled caller (e.g. a
+    client that went away) does not cancel the shared call for everyone
+    else.
+    """
+
+    def __init__(self):
+        self.shared = 0
+        self._tasks = {}
+
+    async def do(self, key, coro_fn):
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(coro_fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _t: self._tasks.pop(key, None))
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
@@ -0,0 +1,207 @@
+from array import array
+from bisect import bisect_left, bisect_right
+
+
+def to_minutes(hhmm: str) -> int:
+    """'HH:MM' → minutes since midnight."""
+    h, m = hhmm.split(':')
+    return int(h) * 60 + int(m)
+
+
+def format_minutes(minutes: int) -> str:
+    """Minutes since midnight → 'HH:MM' (wraps past midnight)."""
+    h, m = divmod(minutes % 1440, 60)
+    return f"{h:02d}:{m:02d}"
+
+
+class Timetable:
+    """
+    Compact, read-only timetable.
+
+    Stop times are held CSR-style in flat integer arrays: the stops of trip
+    ``t`` are rows ``trip_ptr[t]:trip_ptr[t + 1]``, in travel order. Times
+    are minutes since midnight and may exceed 1440 for stops after midnight.
+
+    A second CSR index lists, per station, every departure sorted by time,
+    so "first departure at or after T" is one bisect.
+    Direction is implicit: a trip serves source → dest only if dest comes
+    after source in its stop sequence.
+    """
+
+    def __init__(self, stations, trip_ids, trip_types, trip_ptr,
+                 st_station, st_arr, st_dep, indexes=None):
+        """
+        ``trip_ids`` / ``trip_types`` only need ``__getitem__``/``__len__``
+        and the arrays only need indexing, so memory-mapped views work as
+        well as ``array`` objects. ``indexes`` is an optional prebuilt
+        (st_trip, dep_ptr, dep_min, dep_row) tuple — see gtfs_store.
+        """
+        self.stations = list(stations)
+        self.station_idx = {name: i for i, name in enumerate(self.stations)}
+        self.trip_ids = trip_ids
+        self.trip_types = trip_types
+        self.trip_ptr = trip_ptr
+        self.st_station = st_station
+        self.st_arr = st_arr
+        self.st_dep = st_dep
+
+        if indexes is None:
+            indexes = self.build_indexes(len(self.stations), trip_ptr, st_station, st_dep)
+        self.st_trip, self.dep_ptr, self.dep_min, self.dep_row = indexes
+
+        # (source, dest) → arrival index, built on first query for the pair
+        self._pair_indexes = {}
+
+    @staticmethod
+    def build_indexes(n_stations, trip_ptr, st_station, st_dep):
+        """
+        Derive (st_trip, dep_ptr, dep_min, dep_row):
+            st_trip — row → trip, so a departure row can find the rest of its trip
+            dep_*   — per-station CSR index of departures sorted by minute
+        """
+        n_trips = len(trip_ptr) - 1
+        st_trip = array('I', bytes(4 * len(st_station)))
+        per_station = [[] for _ in range(n_stations)]
+        for t in range(n_trips):
+            last = trip_ptr[t + 1] - 1           # nobody boards at the terminus
+            for r in range(trip_ptr[t], trip_ptr[t + 1]):
+                st_trip[r] = t
+                if r < last:
+                    per_station[st_station[r]].append((st_dep[r], r))
+
+        dep_ptr = array('I', [0])
+        dep_min = array('H')
+        dep_row = array('I')
+        for deps in per_station:
+            deps.sort()
+            dep_min.extend(m for m, _ in deps)
+            dep_row.extend(r for _, r in deps)
+            dep_ptr.append(len(dep_min))
+        return st_trip, dep_ptr, dep_min, dep_row
+
+    @classmethod
+    def from_trips(cls, trips):
+        """
+        Build from an iterable of ``(trip_id, type, stops)`` where ``stops``
+        is a list of ``(station, arr_min, dep_min)`` in travel order.
+        """
+        stations, station_idx = [], {}
+        trip_ids, trip_types = [], []
+        trip_ptr = array('I', [0])
+        st_station, st_arr, st_dep = array('H'), array('H'), array('H')
+
+        for trip_id, ttype, stops in trips:
+            trip_ids.append(trip_id)
+            trip_types.append(ttype)
+            for station, arr, dep in stops:
+                if station not in station_idx:
+                    station_idx[station] = len(stations)
+                    stations.append(station)
+                st_station.append(station_idx[station])
+                st_arr.append(arr)
+                st_dep.append(dep)
+            trip_ptr.append(len(st_station))
+
+        return cls(stations, trip_ids, trip_types, trip_ptr,
+                   st_station, st_arr, st_dep)
+
+    # ------------------------------------------------------------------
+    def _arrival_row(self, row: int, dest: int):
+        """Row where the trip that owns ``row`` reaches ``dest`` later on, or None."""
+        end = self.trip_ptr[self.st_trip[row] + 1]
+        st_station = self.st_station
+        for r in range(row + 1, end):
+            if st_station[r] == dest:
+                return r
+        return None
+
+    def departures(self, source: str, dest: str, after_min: int, limit: int):
+        """
+        Yield up to ``limit`` (trip, dep_min, arr_min) for trips running
+        source → dest, departing at or after ``after_min``, earliest first.
+        """
+        s = self.station_idx.get(source)
+        d = self.station_idx.get(dest)
+        if s is None or d is None or limit <= 0:
+            return
+        lo, hi = self.dep_ptr[s], self.dep_ptr[s + 1]
+        found = 0
+        for k in range(bisect_left(self.dep_min, after_min, lo, hi), hi):
+            row = self.dep_row[k]
+            arr_row = self._arrival_row(row, d)
+            if arr_row is None:
+                continue
+            yield self.st_trip[row], self.dep_min[k], self.st_arr[arr_row]
+            found += 1
+            if found >= limit:
+                return
+
+    # ------------------------------------------------------------------
+    def _pair_index(self, s: int, d: int):
+        """
+        Every s → d ride sorted by arrival, plus a running "latest departure
+        so far" column. Because fast trains overtake slow ones, the train
+        that arrives last before a deadline is not always the one that
+        leaves last — the prefix maximum answers that in one lookup.
+        """
+        key = (s, d)
+        index = self._pair_indexes.get(key)
+        if index is not None:
+            return index
+
+        rides = []
+        for k in range(self.dep_ptr[s], self.dep_ptr[s + 1]):
+            row = self.dep_row[k]
+            arr_row = self._arrival_row(row, d)
+            if arr_row is not None:
+                rides.append((self.st_arr[arr_row], self.dep_min[k], self.st_trip[row]))
+        rides.sort()
+
+        arr = array('H')
+        best_dep, best_arr, best_trip = array('H'), array('H'), array('I')
+        for a, dep, trip in rides:
+            arr.append(a)
+            if best_dep and best_dep[-1] >= dep:
+                best_dep.append(best_dep[-1])
+                best_arr.append(best_arr[-1])
+                best_trip.append(best_trip[-1])
+            else:
+                best_dep.append(dep)
+                best_arr.append(a)
+                best_trip.append(trip)
+
+        index = (arr, best_dep, best_arr, best_trip)
+        self._pair_indexes[key] = index   # benign race: both threads build the same
+        return index
+
+    def latest_arriving_by(self, source: str, dest: str, deadline_min: int):
+        """
+        (trip, dep_min, arr_min) of the source → dest ride that departs
+        latest while arriving no later than ``deadline_min``, or None.
+        """
+        s = self.station_idx.get(source)
+        d = self.station_idx.get(dest)
+        if s is None or d is None:
+            return None
+        arr, best_dep, best_arr, best_trip = self._pair_index(s, d)
+        i = bisect_right(arr, deadline_min) - 1
+        if i < 0:
+            return None
+        return best_trip[i], best_dep[i], best_arr[i]
+
+    def latest_arriving_by_sweep(self, source: str, dest: str, deadlines):
+        """
+        latest_arriving_by for every deadline in ascending ``deadlines``,
+        as one merge over the pair's arrival index instead of a bisect each.
+        """
+        s = self.station_idx.get(source)
+        d = self.station_idx.get(dest)
+        if s is None or d is None:
+            return [None] * len(deadlines)
+        arr, best_dep, best_arr, best_trip = self._pair_index(s, d)
+        out, i = [], -1
+        for deadline in deadlines:
+            while i + 1 < len(arr) and arr[i + 1] <= deadline:
+                i += 1
+            out.append((best_trip[i], best_dep[i], best_arr[i]) if i >= 0 else None)
+        return out
@@ -1,9 +1,20 @@
 import math
+import asyncio
 import logging
-from functools import lru_cache
+import threading
+from datetime import datetime
 
+import numpy as np
 import requests
 from config import Config
+from services import aio
+from services.async_http import AsyncHttpClient
+from services.cache import LRUCache
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError, OPEN
+from services.geocode_store import GeocodeStore, normalise_address
+from services.offline_router import OfflineRouter
+from services.throttle import AsyncSingleFlight, TokenBucket
+from services.workers import get_executor
 
 logger = logging.getLogger(__name__)
 
@@ -13,15 +24,107 @@ logger = logging.getLogger(__name__)
 #   Routing   : OSRM demo server         — router.project-osrm.org
 # ---------------------------------------------------------------------------
 
-NOMINATIM_BASE = 'https://nominatim.openstreetmap.org'
-OSRM_BASE      = 'https://router.project-osrm.org'
+NOMINATIM_BASE = Config.NOMINATIM_BASE_URL
+OSRM_BASE      = Config.OSRM_BASE_URL
+
+# lon_min, lat_min, lon_max, lat_max — Mumbai / Thane / Navi Mumbai
+MUMBAI_VIEWBOX = (72.75, 18.85, 73.25, 19.40)
 
 # Required by Nominatim TOS: identify your app in User-Agent
 HEADERS = {'User-Agent': 'ClgBuddy-App/1.0 (student commute assistant)'}
 
+# Keep-alive pools, one per upstream host, shared by every TrafficService
+# in the process. Nominatim gets a small pool — its policy is 1 req/sec,
+# so more parallel sockets would only get us throttled.
+#
+# FIX: Upstream calls run as coroutines on one shared event loop.
+# WHY: With the blocking client every in-flight OSRM/Nominatim call held
+#      a worker thread, so a worker could only wait on as many upstream
+#      calls as it had threads. On the loop a waiting call costs a few KB;
+#      the sync methods below are thin wrappers that hand the coroutine to
+#      the loop and block only the calling thread.
+# FIX: Process-wide token bucket in front of Nominatim.
+# WHY: Nominatim's usage policy is 1 req/sec. Callers queue in arrival
+#      order; anyone who would wait longer than NOMINATIM_MAX_WAIT_SECS
+#      gets RateLimitExceeded and the planner degrades to its estimates.
+#      Every attempt takes a token — the client's retries included.
+_nominatim_bucket = TokenBucket(
+    rate=Config.NOMINATIM_RATE_PER_SEC,
+    capacity=Config.NOMINATIM_BURST,
+    max_wait=Config.NOMINATIM_MAX_WAIT_SECS,
+)
+_nominatim = AsyncHttpClient(
+    NOMINATIM_BASE, headers=HEADERS,
+    pool_size=Config.NOMINATIM_POOL_SIZE,
+    connect_timeout=Config.HTTP_CONNECT_TIMEOUT_SECS,
+    read_timeout=Config.HTTP_READ_TIMEOUT_SECS,
+    max_retries=Config.HTTP_MAX_RETRIES,
+    max_retry_after=Config.HTTP_MAX_RETRY_AFTER_SECS,
+    before_attempt=_nominatim_bucket.acquire_async,
+)
+_osrm = AsyncHttpClient(
+    OSRM_BASE, headers=HEADERS,
+    pool_size=Config.OSRM_POOL_SIZE,
+    connect_timeout=Config.HTTP_CONNECT_TIMEOUT_SECS,
+    read_timeout=Config.HTTP_READ_TIMEOUT_SECS,
+    max_retries=Config.HTTP_MAX_RETRIES,
+    max_retry_after=Config.HTTP_MAX_RETRY_AFTER_SECS,
+)
+
+_geocode_flight = AsyncSingleFlight()
+
+# FIX: Circuit breaker around the OSRM demo server.
+# WHY: When OSRM was down every call waited out its full timeout before
+#      falling back to Haversine — 20 s for a two-leg plan. While the
+#      breaker is open, callers skip OSRM and get the estimate instantly;
+#      one probe per OSRM_BREAKER_PROBE_SECS checks for recovery.
+_osrm_breaker = CircuitBreaker(
+    'osrm',
+    window=Config.OSRM_BREAKER_WINDOW,
+    min_calls=Config.OSRM_BREAKER_MIN_CALLS,
+    failure_rate=Config.OSRM_BREAKER_FAILURE_RATE,
+    probe_interval=Config.OSRM_BREAKER_PROBE_SECS,
+)
+
+
+async def _osrm_call(path: str, params: dict) -> dict:
+    """
+    GET an OSRM endpoint through the breaker and return the JSON body.
+    Network errors, 5xx, 429 and a body that is not JSON count as failures;
+    any other answer — including 4xx for a bad request — proves the server
+    is up.
+    """
+    if not _osrm_breaker.allow():
+        raise CircuitOpenError('OSRM circuit breaker is open')
+    # FIX: every allowed call reports back, whatever ends it. A half-open
+    #      breaker lets one probe through and waits for its outcome; a
+    #      probe that escaped unrecorded (a JSON decode error, a cancelled
+    #      request) left the breaker half-open and refusing calls for good.
+    healthy = None              # stays None only if the call never finished
+    try:
+        resp = await _osrm.get(path, params=params)
+        healthy = resp.status_code < 500 and resp.status_code != 429
+        resp.raise_for_status()
+        return resp.json()
+    except ValueError:          # JSONDecodeError — a 2xx that is not OSRM's
+        healthy = False
+        raise
+    except Exception:
+        if healthy is None:
+            healthy = False
+        raise
+    finally:
+        if healthy is None:
+            _osrm_breaker.release()
+        elif healthy:
+            _osrm_breaker.record_success()
+        else:
+            _osrm_breaker.record_failure()
+
 # ---------------------------------------------------------------------------
 STATION_COORDS = {
     # Central Line
+    'CSMT':           [72.8355, 18.9398],
     'Masjid':         [72.8375, 18.9466],
     'Sandhurst Road': [72.8396, 18.9528],
     'Byculla':        [72.8394, 18.9757],
@@ -108,13 +211,28 @@ STATION_COORDS = {
     'KJSCE, Vidyavihar West, Mumbai, Maharashtra': [72.9041, 19.0712],
 }
 
+_STATION_LOOKUP = {name.lower(): coords for name, coords in STATION_COORDS.items()}
+
 # Fixed walk time: Vidyavihar station exit → KJSCE main gate (measured once)
 VIDYAVIHAR_TO_KJSCE_WALK_MINS = 7
 
 
 class TrafficService:
     def __init__(self):
-        pass  # no keys to initialise
+        self.geocode_store = GeocodeStore(
+            Config.GEOCODE_DB_PATH,
+            ttl_secs=Config.GEOCODE_TTL_SECS,
+            negative_ttl_secs=Config.GEOCODE_NEGATIVE_TTL_SECS,
+            max_entries=Config.GEOCODE_MAX_ENTRIES,
+        )
+        self.route_cache = LRUCache(
+            max_entries=Config.ROUTE_CACHE_MAX_ENTRIES,
+            ttl_secs=Config.ROUTE_CACHE_TTL_SECS,
+        )
+        # None unless build_offline_matrix.py has produced a matrix file
+        self.offline_router = OfflineRouter.load(Config.OFFLINE_MATRIX_PATH)
+        self._refining = set()
+        self._refine_lock = threading.Lock()
 
     # ------------------------------------------------------------------
     @staticmethod
@@ -135,47 +253,125 @@ class TrafficService:
         return R * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
 
     # ------------------------------------------------------------------
-    # FIX: Wrapped _resolve_coords in an LRU cache (maxsize=128).
-    # WHY: Without this, every tap of "Calculate" re-geocodes the same home
-    #      address via Nominatim HTTP call. The cache avoids ~200 ms latency
-    #      on repeated lookups and respects Nominatim's 1 req/sec rate limit.
-    @staticmethod
-    @lru_cache(maxsize=128)
-    def _resolve_coords_cached(address: str):
-        return TrafficService._resolve_coords_impl(address)
+    # FIX: Replaced the per-process lru_cache with a shared GeocodeStore.
+    # WHY: lru_cache lived in each gunicorn worker, was wiped on every
+    #      deploy and evicted after 128 addresses — the same home address
+    #      was geocoded once per worker per restart, eating into
+    #      Nominatim's 1 req/sec limit. The SQLite store is shared by all
+    #      workers on the host, survives restarts and remembers failures.
+    def resolve_coords(self, address: str):
+        """
+        Public geocode entry point for callers that route several legs from
+        the same address. Raises ValueError / RequestException on failure.
+        """
+        return self._resolve_coords(address)
 
-    def _resolve_coords(self, address: str):
-        return self._resolve_coords_cached(address)
+    async def resolve_coords_async(self, address: str):
+        """resolve_coords for coroutines on the shared event loop."""
+        return await self._resolve_coords_async(address)
 
-    @staticmethod
-    def _resolve_coords_impl(address: str):
+    def cached_coords(self, address: str):
+        """(lng, lat) if known without any HTTP — a station or a cached geocode — else None."""
+        coords = self._station_coords(address)
+        if coords:
+            return coords
+        _found, coords = self.geocode_store.get(address)
+        return coords
+
+    def _known_coords(self, address: str):
+        """
+        (lng, lat) from the hardcoded station dict (instant, no HTTP) or
+        the shared geocode store; None if Nominatim has to be asked.
+        Raises ValueError for an address already known not to geocode.
+        """
+        coords = self._station_coords(address)
+        if coords:
+            return coords
+
+        found, coords = self.geocode_store.get(address)
+        if found and coords is None:
+            raise ValueError(f"Could not geocode address: {address}")
+        return coords
+
+    def _resolve_coords(self, address: str):
         """
         Return (lng, lat) tuple for an address.
-        Checks hardcoded station dict first (instant, no HTTP).
-        Falls back to Nominatim geocoding (free, no key).
+        Checks hardcoded station dict first (instant, no HTTP), then the
+        shared geocode store, and only then Nominatim.
         """
+        coords = self._known_coords(address)
+        if coords is not None:
+            return coords
+        return aio.run(self._resolve_coords_async(address))
+
+    async def _resolve_coords_async(self, address: str):
+        coords = self._station_coords(address)
+        if coords:
+            return coords
+        coords = await self._in_store_thread(self._known_coords, address)
+        if coords is not None:
+            return coords
+
+        # FIX: Coalesce concurrent lookups for the same address.
+        # WHY: A burst of identical addresses (a whole class at 8 AM) used
+        #      to fire one Nominatim call per request. Now one call is made
+        #      and everyone else awaits its answer.
+        return await _geocode_flight.do(
+            normalise_address(address), lambda: self._geocode_and_store(address)
+        )
+
+    async def _geocode_and_store(self, address: str):
+        try:
+            coords = await self._resolve_coords_impl(address)
+        except ValueError as e:
+            # Negative-cache only "no such address" — network errors and
+            # garbled responses are transient and must be retried next time.
+            # RateLimitExceeded is not a ValueError, so it is never cached.
+            if not isinstance(e, requests.exceptions.RequestException):
+                await self._in_store_thread(self.geocode_store.put_negative, address)
+            raise
+        await self._in_store_thread(self.geocode_store.put, address, coords)
+        return coords
+
+    # FIX: Geocode-store reads and writes leave the event loop.
+    # WHY: They are blocking SQLite calls — an eviction DELETE or a wait
+    #      on the 5 s busy_timeout under write contention stalled every
+    #      upstream call in flight on the worker's shared loop.
+    @staticmethod
+    async def _in_store_thread(fn, *args):
+        executor = get_executor('geocode-store', Config.GEOCODE_STORE_WORKERS)
+        return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+    @staticmethod
+    def _station_coords(address: str):
         addr_clean = (
             address.lower()
                    .replace(' railway station', '')
                    .replace(' station', '')
                    .strip()
         )
-        for station, coords in STATION_COORDS.items():
-            if station.lower() == addr_clean:
-                return tuple(coords)   # tuple for lru_cache hashability
+        coords = _STATION_LOOKUP.get(addr_clean)
+        return tuple(coords) if coords else None
 
+    @staticmethod
+    async def _resolve_coords_impl(address: str):
+        """
+        Geocode an address via Nominatim (free, no key).
+        Every HTTP attempt first takes a token from the process-wide
+        limiter (see _nominatim); raises RateLimitExceeded if the queue is
+        too long.
+        """
         # Nominatim geocoding — biased to India (countrycodes=in)
-        url = f"{NOMINATIM_BASE}/search"
         params = {
             'q':            address,
             'format':       'json',
             'limit':        1,
             'countrycodes': 'in',
             # Bias to Mumbai / Thane area via viewbox
-            'viewbox':      '72.75,18.85,73.25,19.40',
+            'viewbox':      ','.join(str(v) for v in MUMBAI_VIEWBOX),
             'bounded':      1,
         }
-        resp = requests.get(url, params=params, headers=HEADERS, timeout=10)
+        resp = await _nominatim.get('/search', params=params)
         resp.raise_for_status()
         results = resp.json()
         if not results:
@@ -184,15 +380,33 @@ class TrafficService:
             params.pop('bounded')
             # FIX: Added timeout=10 to the retry path too.
             # WHY: The original retry had no timeout — if Nominatim hung,
-            #      the entire request would block forever.
-            resp = requests.get(url, params=params, headers=HEADERS, timeout=10)
+            #      the entire request would block forever. The pooled
+            #      client always applies connect/read timeouts.
+            resp = await _nominatim.get('/search', params=params)
             resp.raise_for_status()
             results = resp.json()
         if not results:
             raise ValueError(f"Could not geocode address: {address}")
         lon = float(results[0]['lon'])
         lat = float(results[0]['lat'])
-        return (lon, lat)   # tuple for lru_cache hashability
+        return (lon, lat)
+
+    # ------------------------------------------------------------------
+    def stats(self) -> dict:
+        return {
+            'geocode_cache': dict(
+                self.geocode_store.stats(),
+                coalesced=_geocode_flight.shared,
+                rate_limited=_nominatim_bucket.rejected,
+            ),
+            'route_cache':   self.route_cache.stats(),
+            'osrm_breaker':  _osrm_breaker.status(),
+            'offline_matrix': self.offline_router.path if self.offline_router else None,
+        }
+
+    def degraded(self) -> bool:
+        """True while OSRM is being bypassed in favour of Haversine estimates."""
+        return _osrm_breaker.state == OPEN
 
     # ------------------------------------------------------------------
     def get_travel_time(self, origin: str, destination: str):
@@ -200,61 +414,307 @@ class TrafficService:
         Returns road travel time via OSRM demo server (no API key needed).
         Falls back to Haversine estimate if OSRM is unreachable.
         """
+        return aio.run(self.get_travel_time_async(origin, destination))
+
+    async def get_travel_time_async(self, origin: str, destination: str):
+        """get_travel_time as a coroutine; both ends are geocoded concurrently."""
         try:
-            o_coords = self._resolve_coords(origin)
-            d_coords = self._resolve_coords(destination)
+            o_coords, d_coords = await asyncio.gather(
+                self._resolve_coords_async(origin),
+                self._resolve_coords_async(destination),
+            )
+        except ValueError as e:
+            return {'error': str(e)}
+        except requests.exceptions.RequestException as e:
+            return {'error': f"Routing error: {str(e)}"}
+        except Exception as e:
+            return {'error': str(e)}
+        return await self.get_travel_time_coords_async(o_coords, d_coords)
 
-            # OSRM route endpoint: /route/v1/driving/{lng1,lat1};{lng2,lat2}
-            coords_str = f"{o_coords[0]},{o_coords[1]};{d_coords[0]},{d_coords[1]}"
-            url = f"{OSRM_BASE}/route/v1/driving/{coords_str}"
-            params = {'overview': 'false', 'steps': 'false'}
+    def get_travel_time_coords(self, o_coords, d_coords):
+        """
+        Same as get_travel_time, but for already-resolved (lng, lat) pairs.
+        Cache and offline-matrix hits are answered on the calling thread;
+        only a live OSRM call goes through the event loop.
 
-            resp = requests.get(url, params=params, headers=HEADERS, timeout=10)
-            resp.raise_for_status()
-            data = resp.json()
-
-            if data.get('code') != 'Ok' or not data.get('routes'):
-                # FIX: Fall back to Haversine instead of hard-failing.
-                # WHY: OSRM demo server has no SLA — if it returns no route
-                #      the user gets a blank screen. Haversine gives a rough
-                #      but usable estimate.
-                logger.warning("OSRM returned no route for %s → %s, using Haversine fallback", origin, destination)
-                return self._haversine_fallback(o_coords, d_coords)
-
-            route           = data['routes'][0]
-            duration_secs   = route['duration']   # seconds
-            distance_m      = route['distance']   # metres
-            duration_mins   = int(duration_secs / 60)
-            distance_km     = round(distance_m / 1000, 1)
-
-            duration_text = (
-                f"{duration_mins} mins" if duration_mins < 60
-                else f"{duration_mins // 60}h {duration_mins % 60}m"
-            )
+        FIX: Results are cached on grid-snapped coordinates + time bucket.
+        WHY: Every /api/commute call made fresh OSRM requests, even when the
+             same user hit Calculate ten times in a minute. Haversine
+             fallbacks are cached too (still flagged) but only briefly, so
+             a recovered OSRM is picked up quickly.
+        """
+        key = self._route_key(o_coords, d_coords)
+        result = self._local_route(key, o_coords, d_coords)
+        if result is not None:
+            return result
+        return aio.run(self._live_route(key, o_coords, d_coords))
 
-            return {
-                'duration_seconds': int(duration_secs),
-                'duration_text':    duration_text,
-                'distance_text':    f"{distance_km} km",
-            }
+    async def get_travel_time_coords_async(self, o_coords, d_coords):
+        key = self._route_key(o_coords, d_coords)
+        result = self._local_route(key, o_coords, d_coords)
+        if result is not None:
+            return result
+        return await self._live_route(key, o_coords, d_coords)
 
-        except ValueError as e:
+    def _local_route(self, key, o_coords, d_coords):
+        """Route from the cache or the offline matrix, or None — never any HTTP."""
+        cached = self.route_cache.get(key)
+        if cached is not None:
+            return dict(cached)
+
+        # FIX: Answer from the precomputed offline matrix when possible.
+        # WHY: Keeps OSRM off the critical path. The live route, if
+        #      OFFLINE_REFINE is on, is fetched in the background and lands
+        #      in the route cache, so later calls get the refined answer.
+        if self.offline_router is not None:
+            hit = self.offline_router.lookup(o_coords, d_coords)
+            if hit is not None:
+                if Config.OFFLINE_REFINE and _osrm_breaker.state != OPEN:
+                    self._refine_in_background(key, o_coords, d_coords)
+                return dict(self._format_route(*hit), offline=True)
+        return None
+
+    async def _live_route(self, key, o_coords, d_coords):
+        try:
+            result = await self._osrm_route_async(o_coords, d_coords)
+        except Exception as e:
             return {'error': str(e)}
+
+        ttl = Config.ROUTE_CACHE_FALLBACK_TTL_SECS if result.get('fallback') else None
+        self.route_cache.set(key, result, ttl)
+        return dict(result)
+
+    def _refine_in_background(self, key, o_coords, d_coords):
+        with self._refine_lock:
+            if key in self._refining:
+                return
+            self._refining.add(key)
+
+        def _refine():
+            try:
+                result = self._osrm_route(o_coords, d_coords)
+                if not result.get('fallback'):
+                    self.route_cache.set(key, result)
+            except Exception as e:
+                logger.warning("Background OSRM refinement failed: %s", e)
+            finally:
+                with self._refine_lock:
+                    self._refining.discard(key)
+
+        # Stays on a small thread pool: OFFLINE_REFINE_WORKERS bounds how
+        # hard a burst of offline hits can hit OSRM.
+        get_executor('route-refine', Config.OFFLINE_REFINE_WORKERS).submit(_refine)
+
+    @staticmethod
+    def _snap(coords):
+        """Snap (lng, lat) onto a ~ROUTE_CACHE_GRID_M metre grid."""
+        lat_step = Config.ROUTE_CACHE_GRID_M / 111_320        # metres per degree lat
+        lat_cell = round(coords[1] / lat_step)
+        lon_step = lat_step / math.cos(math.radians(lat_cell * lat_step))
+        return (round(coords[0] / lon_step), lat_cell)
+
+    def _route_key(self, o_coords, d_coords):
+        now = datetime.now()
+        bucket = (now.hour * 60 + now.minute) // Config.ROUTE_CACHE_BUCKET_MINS
+        return (self._snap(o_coords), self._snap(d_coords), bucket)
+
+    def _osrm_route(self, o_coords, d_coords):
+        return aio.run(self._osrm_route_async(o_coords, d_coords))
+
+    async def _osrm_route_async(self, o_coords, d_coords):
+        try:
+            # OSRM route endpoint: /route/v1/driving/{lng1,lat1};{lng2,lat2}
+            coords_str = f"{o_coords[0]},{o_coords[1]};{d_coords[0]},{d_coords[1]}"
+            params = {'overview': 'false', 'steps': 'false'}
+
+            data = await _osrm_call(f"/route/v1/driving/{coords_str}", params)
+        except CircuitOpenError:
+            # Breaker is open — answer instantly instead of waiting for a
+            # timeout we already know is coming.
+            return self._haversine_fallback(o_coords, d_coords)
         except requests.exceptions.RequestException as e:
             # FIX: Haversine fallback on network failure.
             # WHY: OSRM demo server goes down regularly. Without a fallback
             #      the entire app becomes unusable — single point of failure.
             logger.warning("OSRM request failed (%s), using Haversine fallback", e)
+            return self._haversine_fallback(o_coords, d_coords)
+
+        if data.get('code') != 'Ok' or not data.get('routes'):
+            # FIX: Fall back to Haversine instead of hard-failing.
+            # WHY: OSRM demo server has no SLA — if it returns no route
+            #      the user gets a blank screen. Haversine gives a rough
+            #      but usable estimate.
+            logger.warning("OSRM returned no route for %s → %s, using Haversine fallback", o_coords, d_coords)
+            return self._haversine_fallback(o_coords, d_coords)
+
+        route = data['routes'][0]
+        return self._format_route(route['duration'], route['distance'])
+
+    @staticmethod
+    def _format_route(duration_secs, distance_m):
+        duration_mins   = int(duration_secs / 60)
+        distance_km     = round(distance_m / 1000, 1)
+
+        duration_text = (
+            f"{duration_mins} mins" if duration_mins < 60
+            else f"{duration_mins // 60}h {duration_mins % 60}m"
+        )
+
+        return {
+            'duration_seconds': int(duration_secs),
+            'duration_text':    duration_text,
+            'distance_text':    f"{distance_km} km",
+        }
+
+    # ------------------------------------------------------------------
+    def get_travel_time_matrix(self, origins, destinations):
+        """
+        Many-to-many road travel times in as few HTTP round trips as
+        possible, via OSRM's /table service.
+
+        ``origins`` / ``destinations`` are lists of addresses or (lng, lat)
+        pairs. Cells OSRM cannot fill get the Haversine estimate and are
+        flagged in ``fallback``; cells whose endpoint failed to geocode
+        are None.
+        """
+        return aio.run(self.get_travel_time_matrix_async(origins, destinations))
+
+    async def get_travel_time_matrix_async(self, origins, destinations):
+        points = await asyncio.gather(*(self._matrix_point(p)
+                                        for p in list(origins) + list(destinations)))
+        o_points, d_points = points[:len(origins)], points[len(origins):]
+        o_ok = [i for i, p in enumerate(o_points) if 'coords' in p]
+        d_ok = [j for j, p in enumerate(d_points) if 'coords' in p]
+
+        n_o, n_d = len(o_points), len(d_points)
+        durations = np.full((n_o, n_d), np.nan)
+        distances = np.full((n_o, n_d), np.nan)
+        fallback = np.zeros((n_o, n_d), dtype=bool)
+
+        if o_ok and d_ok:
+            o_xy = np.array([o_points[i]['coords'] for i in o_ok], dtype=float)
+            d_xy = np.array([d_points[j]['coords'] for j in d_ok], dtype=float)
+            sub_dur, sub_dist = await self._osrm_table(o_xy, d_xy)
+
+            # Vectorised Haversine for every cell OSRM left empty. Durations
+            # and distances go missing independently (a null duration can
+            # come with a distance; some builds omit distances), so each is
+            # filled from its own mask.
+            missing = np.isnan(sub_dur)
+            no_dist = np.isnan(sub_dist)
+            if missing.any() or no_dist.any():
+                est_dur, est_dist = self._haversine_matrix(o_xy, d_xy)
+                sub_dur[missing] = est_dur[missing]
+                sub_dist[no_dist] = est_dist[no_dist]
+
+            grid = np.ix_(o_ok, d_ok)
+            durations[grid] = sub_dur
+            distances[grid] = sub_dist
+            fallback[grid] = missing
+
+        def _cells(arr, cast):
+            return [[None if np.isnan(v) else cast(v) for v in row] for row in arr]
+
+        return {
+            'origins':          o_points,
+            'destinations':     d_points,
+            'durations_seconds': _cells(durations, int),
+            'distances_km':     _cells(distances / 1000, lambda v: round(float(v), 1)),
+            'fallback':         fallback.tolist(),
+        }
+
+    async def _matrix_point(self, point):
+        if isinstance(point, (list, tuple)):
+            # A malformed pair is that point's error, not the whole request's 500
             try:
-                o_coords = self._resolve_coords(origin)
-                d_coords = self._resolve_coords(destination)
-                return self._haversine_fallback(o_coords, d_coords)
-            except Exception:
-                return {'error': f"Routing error: {str(e)}"}
+                lon, lat = (float(x) for x in point)
+            except (TypeError, ValueError):
+                return {'query': list(point), 'error': 'expected a [lon, lat] pair of numbers'}
+            if not (-180 <= lon <= 180 and -90 <= lat <= 90):
+                return {'query': list(point), 'error': 'coordinates out of range'}
+            return {'query': list(point), 'coords': [lon, lat]}
+        try:
+            return {'query': point,
+                    'coords': list(await self._resolve_coords_async(str(point)))}
         except Exception as e:
-            return {'error': str(e)}
+            return {'query': point, 'error': str(e)}
+
+    @staticmethod
+    def _table_chunks(n_o, n_d):
+        """
+        Split an n_o × n_d table so no request carries more than
+        OSRM_TABLE_MAX_LOCATIONS coordinates (the demo server's limit).
+        """
+        limit = Config.OSRM_TABLE_MAX_LOCATIONS
+        d_size = min(n_d, max(1, limit // 2) if n_o + n_d > limit else n_d)
+        o_size = max(1, min(n_o, limit - d_size))
+        for o0 in range(0, n_o, o_size):
+            for d0 in range(0, n_d, d_size):
+                yield slice(o0, o0 + o_size), slice(d0, d0 + d_size)
+
+    async def _osrm_table(self, o_xy, d_xy):
+        """
+        Durations (s) / distances (m) from OSRM /table; NaN where it failed.
+        Chunks are requested concurrently — the OSRM pool size still caps
+        how many are on the wire at once.
+        """
+        durations = np.full((len(o_xy), len(d_xy)), np.nan)
+        distances = np.full((len(o_xy), len(d_xy)), np.nan)
+
+        chunks = list(self._table_chunks(len(o_xy), len(d_xy)))
+        answers = await asyncio.gather(*(self._osrm_table_chunk(o_xy[o_sl], d_xy[d_sl])
+                                         for o_sl, d_sl in chunks))
+        for (o_sl, d_sl), data in zip(chunks, answers):
+            if data is None:
+                continue
+            # null cells (unroutable pairs) become NaN and get the estimate
+            durations[o_sl, d_sl] = np.array(data['durations'], dtype=float)
+            if data.get('distances') is not None:
+                distances[o_sl, d_sl] = np.array(data['distances'], dtype=float)
+        return durations, distances
+
+    @staticmethod
+    async def _osrm_table_chunk(chunk_o, chunk_d):
+        """One /table request; the JSON body, or None to fall back for the chunk."""
+        coords_str = ';'.join(f"{x},{y}" for x, y in np.vstack([chunk_o, chunk_d]))
+        n = len(chunk_o)
+        params = {
+            'sources':      ';'.join(str(i) for i in range(n)),
+            'destinations': ';'.join(str(n + j) for j in range(len(chunk_d))),
+            'annotations':  'duration,distance',
+        }
+        try:
+            data = await _osrm_call(f"/table/v1/driving/{coords_str}", params)
+        except CircuitOpenError:
+            return None
+        except requests.exceptions.RequestException as e:
+            logger.warning("OSRM table request failed (%s), using Haversine fallback", e)
+            return None
+        if data.get('code') != 'Ok':
+            logger.warning("OSRM table returned %s, using Haversine fallback", data.get('code'))
+            return None
+        return data
+
+    @staticmethod
+    def _haversine_matrix(o_xy, d_xy):
+        """
+        Vectorised version of _haversine_fallback for a whole table.
+        Returns (durations in s, road distances in m).
+        """
+        lon1, lat1 = np.radians(o_xy[:, 0])[:, None], np.radians(o_xy[:, 1])[:, None]
+        lon2, lat2 = np.radians(d_xy[:, 0])[None, :], np.radians(d_xy[:, 1])[None, :]
+        a = (np.sin((lat2 - lat1) / 2) ** 2
+             + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+        straight_km = 6371 * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+        road_km = np.round(straight_km * 1.4, 1)                     # winding factor
+        duration_mins = np.maximum(1, (road_km / 25 * 60).astype(int))  # 25 km/h avg
+        return duration_mins * 60.0, road_km * 1000
 
     # ------------------------------------------------------------------
+    def estimate_travel_time(self, o_coords, d_coords):
+        """Instant Haversine estimate (no HTTP), flagged as a fallback."""
+        return self._haversine_fallback(o_coords, d_coords)
+
     def _haversine_fallback(self, o_coords, d_coords):
         """
         FIX: Fallback route estimate using Haversine distance.
@@ -1,6 +1,11 @@
-from datetime import datetime, timedelta
+from datetime import datetime
 import logging
 
+from config import Config
+from services import gtfs_store
+from services.journey_planner import JourneyPlanner
+from services.timetable import Timetable, format_minutes, to_minutes
+
 logger = logging.getLogger(__name__)
 
 
@@ -34,74 +39,131 @@ DN_OFFSETS = {
 STATION_ORDER = ['CSMT', 'Dadar', 'Kurla', 'Ghatkopar', 'Vidyavihar',
                  'Thane', 'Dombivli', 'Kalyan']
 
+# ---------------------------------------------------------------------------
+# Other lines — same shape as UP_OFFSETS (minutes from the first station,
+# "up" direction); the down direction is mirrored from the last station.
+# Station names match STATION_COORDS.
+# ---------------------------------------------------------------------------
+
+WESTERN_OFFSETS = {      # Churchgate → Virar
+    'fast': {
+        'Churchgate': 0, 'Mumbai Central': 6, 'Dadar': 13, 'Bandra': 18,
+        'Andheri': 26, 'Borivali': 39, 'Bhayandar': 47, 'Vasai Road': 55,
+        'Virar': 63,
+    },
+    'slow': {
+        'Churchgate': 0, 'Mumbai Central': 9, 'Lower Parel': 14, 'Dadar': 19,
+        'Bandra': 26, 'Santacruz': 31, 'Andheri': 36, 'Goregaon': 43,
+        'Malad': 47, 'Kandivali': 51, 'Borivali': 55, 'Bhayandar': 66,
+        'Vasai Road': 76, 'Virar': 85,
+    },
+}
+
+HARBOUR_OFFSETS = {      # CSMT → Panvel
+    'slow': {
+        'CSMT': 0, 'Wadala Road': 12, 'Kurla': 21, 'Chembur': 27,
+        'Govandi': 31, 'Mankhurd': 35, 'Vashi': 44, 'Sanpada': 47,
+        'Juinagar': 50, 'Nerul': 53, 'Seawoods': 56, 'Belapur': 59,
+        'Kharghar': 64, 'Panvel': 77,
+    },
+}
+
+TRANS_HARBOUR_OFFSETS = {    # Thane → Vashi
+    'slow': {
+        'Thane': 0, 'Airoli': 9, 'Rabale': 13, 'Ghansoli': 17,
+        'Koparkhairane': 21, 'Turbhe': 26, 'Sanpada': 30, 'Vashi': 34,
+    },
+}
+
+# (trip id prefix, up offsets, minutes between departures)
+LINES = [
+    ('',  UP_OFFSETS,            5),     # Central — ids kept as before
+    ('W', WESTERN_OFFSETS,       5),
+    ('H', HARBOUR_OFFSETS,       10),
+    ('T', TRANS_HARBOUR_OFFSETS, 15),
+]
+
+# Walk between lines at each interchange (platform to platform, minutes)
+INTERCHANGE_WALK_MINS = {
+    'Dadar':  6,      # Central ↔ Western
+    'Kurla':  5,      # Central ↔ Harbour
+    'CSMT':   4,      # Central ↔ Harbour
+    'Thane':  4,      # Central ↔ Trans-Harbour
+    'Vashi':  3,      # Harbour ↔ Trans-Harbour
+    'Sanpada': 3,
+}
+
 
 class TrainService:
-    def __init__(self):
-        self.stations = STATION_ORDER
-        # Generate once; keyed by direction: 'up' or 'dn'
-        self.schedules = {
-            'up': self._generate_schedule('up'),
-            'dn': self._generate_schedule('dn'),
-        }
+    def __init__(self, timetable_path: str = None):
+        # FIX: Timetable held as integer arrays instead of dicts of 'HH:MM'.
+        # WHY: get_next_trains used to strptime every train's times on every
+        #      request and scan the whole ~240-train list. Minutes-since-
+        #      midnight arrays with a per-station sorted departure index
+        #      make the first lookup a bisect; strings are only built for
+        #      the rows actually returned.
+        # A compiled GTFS feed (compile_gtfs.py) is memory-mapped rather
+        # than parsed, so every worker shares its pages; without one we
+        # fall back to the synthetic Central Line schedule.
+        self.timetable = gtfs_store.load(timetable_path or Config.GTFS_TIMETABLE_PATH)
+        if self.timetable is None:
+            self.timetable = Timetable.from_trips(
+                trip
+                for prefix, offsets, headway in LINES
+                for direction in ('up', 'dn')
+                for trip in self._generate_schedule(direction, offsets, headway, prefix)
+            )
+        self.stations = self.timetable.stations
+
+        # FIX: Plan journeys with changes across lines (RAPTOR).
+        # WHY: The commute planner could only use a direct train to
+        #      Vidyavihar, so anyone near a Western or Harbour station got
+        #      road-only advice. See journey_planner.py.
+        self.planner = JourneyPlanner(self.timetable, INTERCHANGE_WALK_MINS)
 
     # ------------------------------------------------------------------
-    def _generate_schedule(self, direction: str):
-        """Generate trains from 04:00 to 24:00 every 10 minutes."""
-        offsets = UP_OFFSETS if direction == 'up' else DN_OFFSETS
-        origin = 'CSMT' if direction == 'up' else 'Kalyan'
+    def _generate_schedule(self, direction: str, up_offsets: dict = UP_OFFSETS,
+                           headway: int = 5, line: str = ''):
+        """
+        Generate trains from 04:00 to 24:00 every `headway` minutes as
+        (train_id, type, [(station, arr_min, dep_min), ...]) tuples.
+        Lines with both fast and slow services alternate between them.
+        """
+        offsets = up_offsets
+        if direction == 'dn':
+            offsets = {
+                ttype: {st: max(off.values()) - mins for st, mins in off.items()}
+                for ttype, off in up_offsets.items()
+            }
+        types = [t for t in ('fast', 'slow') if t in offsets]
+
+        # FIX: Use a fixed reference instead of datetime.now().
+        # WHY: Anchoring to "today" meant a server that stayed up past
+        #      midnight compared against stale dates. Minutes since
+        #      midnight carry no date at all.
+        start = 4 * 60
+        end   = start + 20 * 60
 
         schedule = []
-        # FIX: Use a fixed reference date instead of datetime.now().
-        # WHY: datetime.now() means if the server stays up past midnight,
-        #      the schedule silently re-anchors to the NEXT day's date when
-        #      TrainService is re-instantiated, but existing in-memory
-        #      schedule objects still have yesterday's dates → stale comparisons.
-        #      A fixed epoch date avoids this; only the HH:MM matters.
-        base = datetime(2000, 1, 1, 4, 0, 0)  # fixed reference, only time matters
-        end  = base + timedelta(hours=20)
-
-        current = base
-        train_type_toggle = True   # alternate fast/slow
-        while current < end:
-            ttype = 'fast' if train_type_toggle else 'slow'
-            train_type_toggle = not train_type_toggle
+        for n, current in enumerate(range(start, end, headway)):
+            ttype = types[n % len(types)]      # alternate fast/slow
             off = offsets[ttype]
 
-            stations_times = {
-                st: (current + timedelta(minutes=mins)).strftime('%H:%M')
-                for st, mins in off.items()
-            }
+            # Stops in travel order; locals dwell for under a minute
+            stops = sorted(
+                ((st, current + mins, current + mins) for st, mins in off.items()),
+                key=lambda stop: stop[1],
+            )
 
-            prefix = ('F' if ttype == 'fast' else 'S') + ('U' if direction == 'up' else 'D')
-            schedule.append({
-                'train_id': f"{prefix}{current.strftime('%H%M')}",
-                'type':     ttype.capitalize(),
-                'direction': direction,
-                'origin':   origin,
-                'stations': stations_times,
-            })
-            current += timedelta(minutes=5)
+            prefix = line + ('F' if ttype == 'fast' else 'S') + ('U' if direction == 'up' else 'D')
+            schedule.append((
+                f"{prefix}{format_minutes(current).replace(':', '')}",
+                ttype.capitalize(),
+                stops,
+            ))
 
         return schedule
 
-    # ------------------------------------------------------------------
-    def _direction(self, source: str, destination: str) -> str:
-        """Return 'up' or 'dn' based on station order."""
-        try:
-            si = STATION_ORDER.index(source)
-            di = STATION_ORDER.index(destination)
-        except ValueError:
-            # FIX: Log a warning when an unknown station falls through.
-            # WHY: Silent fallback to 'up' can give the user a train going
-            #      the WRONG direction — a silent data bug that's very hard
-            #      to debug without logs.
-            logger.warning(
-                "Unknown station in direction lookup: source='%s', dest='%s'. "
-                "Defaulting to 'up'.", source, destination
-            )
-            return 'up'  # fallback
-        return 'up' if di > si else 'dn'
-
     # ------------------------------------------------------------------
     def get_next_trains(self, source: str, destination: str,
                         after_time_str: str = None, limit: int = 5):
@@ -110,39 +172,136 @@ class TrainService:
         departing at or after `after_time_str` (HH:MM).
         """
         if after_time_str:
-            query_time = datetime.strptime(after_time_str, '%H:%M').time()
+            query_min = to_minutes(after_time_str)
         else:
-            query_time = datetime.now().time()
+            now = datetime.now()
+            query_min = now.hour * 60 + now.minute
 
-        direction = self._direction(source, destination)
-        trains = self.schedules[direction]
+        if source not in self.timetable.station_idx or \
+                destination not in self.timetable.station_idx:
+            # FIX: Log a warning when an unknown station is requested.
+            # WHY: A silent empty list looks exactly like "no trains" —
+            #      very hard to debug without logs.
+            logger.warning(
+                "Unknown station in train lookup: source='%s', dest='%s'.",
+                source, destination
+            )
+            return []
 
-        results = []
-        for train in trains:
-            if source not in train['stations'] or destination not in train['stations']:
-                continue
+        return [
+            self._train_row(trip, dep, arr)
+            for trip, dep, arr in self.timetable.departures(
+                source, destination, query_min, limit
+            )
+        ]
 
-            dept_str = train['stations'][source]
-            arr_str  = train['stations'][destination]
-            dept_t   = datetime.strptime(dept_str, '%H:%M').time()
+    # ------------------------------------------------------------------
+    def latest_departure_arriving_by(self, source: str, destination: str,
+                                     deadline, buffer_mins: int = 0):
+        """
+        The train from source to destination that leaves latest while its
+        arrival plus `buffer_mins` is still no later than `deadline` (HH:MM,
+        or minutes since midnight — negative for a deadline before today's
+        service starts). Returns a get_next_trains-style dict, or None if
+        no train makes it.
+        """
+        target = self._deadline_minutes(deadline) - buffer_mins
+        if target < 0:
+            return None
+        found = self.timetable.latest_arriving_by(source, destination, target)
+        return self._train_row(*found) if found else None
 
-            if dept_t < query_time:
-                continue
+    @staticmethod
+    def _deadline_minutes(deadline) -> int:
+        # FIX: Callers near midnight pass minutes, not HH:MM.
+        # WHY: 00:03 less a 13-min walk formatted as '23:50' wrapped the
+        #      deadline to the end of the same day and matched a train that
+        #      leaves a day after the user needs it.
+        return deadline if isinstance(deadline, int) else to_minutes(deadline)
 
-            dept_dt = datetime.combine(datetime.today(), dept_t)
-            arr_dt  = datetime.combine(datetime.today(),
-                                       datetime.strptime(arr_str, '%H:%M').time())
-            duration_mins = int((arr_dt - dept_dt).total_seconds() / 60)
+    # ------------------------------------------------------------------
+    def plan_journey(self, source: str, destination: str,
+                     after_time_str: str, max_transfers: int = None):
+        """
+        Earliest-arriving journey from source to destination leaving at or
+        after `after_time_str` (HH:MM), changing trains where needed.
+        Returns a journey dict (see _journey_row) or None.
+        """
+        found = self.planner.earliest_arrival(
+            source, destination, to_minutes(after_time_str),
+            Config.JOURNEY_MAX_TRANSFERS if max_transfers is None else max_transfers,
+        )
+        return self._journey_row(found) if found else None
 
-            results.append({
-                'train_id':      train['train_id'],
-                'type':          train['type'],
-                'departure':     dept_str,
-                'arrival':       arr_str,
-                'duration_mins': duration_mins,
-            })
+    def latest_journey_arriving_by(self, source: str, destination: str,
+                                   deadline, buffer_mins: int = 0,
+                                   max_transfers: int = None):
+        """
+        Like latest_departure_arriving_by, but may change trains — the
+        journey leaving latest whose arrival plus `buffer_mins` still meets
+        `deadline` (HH:MM or minutes), fewest changes on ties. None if
+        nothing makes it.
+        """
+        target = self._deadline_minutes(deadline) - buffer_mins
+        if target < 0:
+            return None
+        found = self.planner.latest_departure(
+            source, destination, target,
+            Config.JOURNEY_MAX_TRANSFERS if max_transfers is None else max_transfers,
+        )
+        return self._journey_row(found) if found else None
 
-            if len(results) >= limit:
-                break
+    def latest_departures_by(self, source: str, destination: str,
+                             deadlines, buffer_mins: int = 0):
+        """
+        For each deadline (minutes since midnight, ascending): the latest
+        direct train whose arrival plus `buffer_mins` meets it, else the
+        latest journey with changes, else None. One timetable sweep for the
+        whole list rather than a lookup per deadline.
+        """
+        targets = [d - buffer_mins for d in deadlines]
+        direct = self.timetable.latest_arriving_by_sweep(source, destination, targets)
+        rows = [self._train_row(*found) if found else None for found in direct]
+        if all(rows):
+            return rows
+
+        planned = self.planner.latest_departure_sweep(
+            source, destination, targets, Config.JOURNEY_MAX_TRANSFERS
+        )
+        return [row or (self._journey_row(j) if j else None)
+                for row, j in zip(rows, planned)]
 
-        return results
+    def journey_profile(self, source: str, destination: str,
+                        window_start: str, window_end: str, max_transfers: int = None):
+        """
+        Every journey leaving between the two HH:MM times that no other
+        beats on departure, arrival and number of changes, by departure.
+        """
+        return [
+            self._journey_row(j)
+            for j in self.planner.profile(
+                source, destination, to_minutes(window_start), to_minutes(window_end),
+                Config.JOURNEY_MAX_TRANSFERS if max_transfers is None else max_transfers,
+            )
+        ]
+
+    def _journey_row(self, journey):
+        return {
+            'departure':     format_minutes(journey['departure']),
+            'arrival':       format_minutes(journey['arrival']),
+            'duration_mins': journey['arrival'] - journey['departure'],
+            'transfers':     journey['transfers'],
+            'legs': [
+                dict(self._train_row(trip, dep, arr), **{'from': src, 'to': dst})
+                for trip, src, dst, dep, arr in journey['legs']
+            ],
+        }
+
+    def _train_row(self, trip, dep, arr):
+        return {
+            'train_id':      self.timetable.trip_ids[trip],
+            'type':          self.timetable.trip_types[trip],
+            'departure':     format_minutes(dep),
+            'arrival':       format_minutes(arr),
+            'duration_mins': arr - dep,
+        }
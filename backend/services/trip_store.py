@@ -0,0 +1,209 @@
+import os
+import json
+import time
+import fcntl
+import shutil
+import logging
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Append-only columnar trip log.
+#
+# Each column is its own file of fixed-width native values, so a trip is
+# one small append per column and training reads every column straight
+# into a NumPy array through a memory map — no per-trip Python objects.
+#
+# Layout under the store directory:
+#   CURRENT            name of the live generation, e.g. "gen-000003"
+#   lock               flock'd by writers (appends, compaction)
+#   gen-000003/
+#     meta.json        {"columns": {name: dtype}}
+#     recorded_at.bin  f8  unix seconds the trip was logged
+#     hour.bin         u1
+#     minute.bin       u1
+#     day_of_week.bin  u1  0=Mon … 6=Sun
+#     duration.bin     f4  minutes
+#
+# Appends from every gunicorn worker go through the flock, so rows line up
+# across the column files. A crash mid-append can leave some columns one
+# row (or part of a value) longer; readers only trust the shortest
+# column, and the next append truncates the stragglers first.
+#
+# compact() writes the surviving rows into a new generation and switches
+# CURRENT with an atomic rename. Readers holding the old maps keep their
+# (unlinked) files until they let go.
+# ---------------------------------------------------------------------------
+
+COLUMNS = {
+    'recorded_at': np.dtype('<f8'),
+    'hour':        np.dtype('u1'),
+    'minute':      np.dtype('u1'),
+    'day_of_week': np.dtype('u1'),
+    'duration':    np.dtype('<f4'),
+}
+
+
+class TripStore:
+    def __init__(self, path: str, retention_days: float = 365, max_rows: int = 500_000):
+        self.path = path
+        self.retention_days = retention_days
+        self.max_rows = max_rows
+        self._lock = threading.Lock()     # flock is per open file, not per thread
+        os.makedirs(path, exist_ok=True)
+        with self._locked():
+            if self._generation() is None:
+                self._switch_to(self._new_generation(0))
+
+    # ------------------------------------------------------------------
+    @contextmanager
+    def _locked(self):
+        with self._lock, open(os.path.join(self.path, 'lock'), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _generation(self):
+        try:
+            with open(os.path.join(self.path, 'CURRENT')) as f:
+                return os.path.join(self.path, f.read().strip())
+        except FileNotFoundError:
+            return None
+
+    def _new_generation(self, number: int) -> str:
+        gen = os.path.join(self.path, f"gen-{number:06d}")
+        os.makedirs(gen, exist_ok=True)
+        with open(os.path.join(gen, 'meta.json'), 'w') as f:
+            json.dump({'columns': {name: dt.str for name, dt in COLUMNS.items()}}, f)
+        for name in COLUMNS:
+            open(os.path.join(gen, f"{name}.bin"), 'ab').close()
+        return gen
+
+    def _switch_to(self, gen: str):
+        tmp = os.path.join(self.path, 'CURRENT.tmp')
+        with open(tmp, 'w') as f:
+            f.write(os.path.basename(gen))
+        os.replace(tmp, os.path.join(self.path, 'CURRENT'))
+
+    @staticmethod
+    def _rows_in(gen: str) -> int:
+        """Complete rows: the length of the shortest column."""
+        return min(os.path.getsize(os.path.join(gen, f"{name}.bin")) // dt.itemsize
+                   for name, dt in COLUMNS.items())
+
+    # ------------------------------------------------------------------
+    def append(self, hour: int, minute: int, day_of_week: int, duration: float,
+               recorded_at: float = None):
+        """
+        Log one trip. Durable once this returns (modulo the OS page cache).
+        Returns (generation, row) — where the trip landed.
+        """
+        return self.append_many([hour], [minute], [day_of_week], [duration],
+                                None if recorded_at is None else [recorded_at])
+
+    def append_many(self, hours, minutes, days, durations, recorded_at=None):
+        """Log several trips as one append per column. Returns (generation, first row)."""
+        with self._locked():
+            return self._append(hours, minutes, days, durations, recorded_at)
+
+    def seed(self, hours, minutes, days, durations) -> bool:
+        """
+        Log these trips only if the store is empty — checked under the
+        lock, so workers booting together seed it once. True if seeded.
+        """
+        with self._locked():
+            if self._rows_in(self._generation()):
+                return False
+            self._append(hours, minutes, days, durations)
+            return True
+
+    def _append(self, hours, minutes, days, durations, recorded_at=None):
+        # Caller holds the lock
+        if recorded_at is None:
+            recorded_at = np.full(len(hours), time.time())
+        values = {'recorded_at': recorded_at, 'hour': hours, 'minute': minutes,
+                  'day_of_week': days, 'duration': durations}
+        gen = self._generation()
+        rows = self._rows_in(gen)
+        for name, dt in COLUMNS.items():
+            with open(os.path.join(gen, f"{name}.bin"), 'ab') as f:
+                f.truncate(rows * dt.itemsize)     # drop a torn tail, if any
+                f.write(np.asarray(values[name], dtype=dt).tobytes())
+        return os.path.basename(gen), rows
+
+    def __len__(self):
+        return self._read_live(self._rows_in)
+
+    @property
+    def generation(self) -> str:
+        """Name of the live generation; changes on every compaction."""
+        return os.path.basename(self._generation())
+
+    def arrays(self) -> dict:
+        """Every column as a read-only array (memory-mapped), all the same length."""
+        return self.snapshot()[1]
+
+    def snapshot(self):
+        """(generation, arrays()) — the columns together with the generation they belong to."""
+        return self._read_live(lambda gen: (os.path.basename(gen), self._map(gen)))
+
+    def _read_live(self, read):
+        """read(gen) on the live generation, without the lock — retried if compacted away."""
+        for _attempt in range(3):
+            gen = self._generation()
+            try:
+                return read(gen)
+            except FileNotFoundError:
+                continue      # compacted away between reading CURRENT and reading gen
+        return read(self._generation())
+
+    def _map(self, gen: str) -> dict:
+        n = self._rows_in(gen)
+        cols = {}
+        for name, dt in COLUMNS.items():
+            if n == 0:
+                cols[name] = np.empty(0, dtype=dt)
+            else:
+                cols[name] = np.memmap(os.path.join(gen, f"{name}.bin"),
+                                       dtype=dt, mode='r', shape=(n,))
+        return cols
+
+    # ------------------------------------------------------------------
+    def needs_compaction(self) -> bool:
+        """Over max_rows by a quarter, or oldest trip past retention."""
+        cols = self.arrays()
+        n = len(cols['recorded_at'])
+        if n > self.max_rows * 1.25:
+            return True
+        return n > 0 and cols['recorded_at'].min() < time.time() - self.retention_days * 86400
+
+    def compact(self) -> int:
+        """
+        Drop trips older than retention_days, then all but the newest
+        max_rows, into a new generation. Returns the rows kept.
+        """
+        with self._locked():
+            old = self._generation()
+            cols = self.arrays()
+            keep = cols['recorded_at'] >= time.time() - self.retention_days * 86400
+            idx = np.flatnonzero(keep)
+            # [-0:] is the whole array, so max_rows == 0 needs its own case
+            idx = idx[-self.max_rows:] if self.max_rows > 0 else idx[:0]
+
+            number = int(os.path.basename(old).split('-')[1]) + 1
+            gen = self._new_generation(number)
+            for name, dt in COLUMNS.items():
+                with open(os.path.join(gen, f"{name}.bin"), 'wb') as f:
+                    f.write(np.ascontiguousarray(cols[name][idx]).tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+            self._switch_to(gen)
+            shutil.rmtree(old, ignore_errors=True)
+        logger.info("Trip store compacted: %d → %d rows", len(keep), len(idx))
+        return len(idx)
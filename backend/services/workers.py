@@ -0,0 +1,23 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Named, bounded thread pools shared by everything in the worker process.
+# Pools are created lazily and rebuilt after fork: executor threads do not
+# survive a fork, so a pool built in the gunicorn master would be dead in
+# every worker.
+_executors = {}
+_lock = threading.Lock()
+
+
+def get_executor(name: str, max_workers: int) -> ThreadPoolExecutor:
+    entry = _executors.get(name)
+    if entry is None or entry[0] != os.getpid():
+        with _lock:
+            entry = _executors.get(name)
+            if entry is None or entry[0] != os.getpid():
+                entry = (os.getpid(), ThreadPoolExecutor(
+                    max_workers=max_workers, thread_name_prefix=name,
+                ))
+                _executors[name] = entry
+    return entry[1]
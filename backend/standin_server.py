@@ -0,0 +1,101 @@
+"""
+Local stand-in for the Nominatim and OSRM endpoints TrafficService calls.
+
+Used by the benchmarks and manual tests so they never touch the public
+servers. Answers are deterministic: geocodes are derived from a hash of the
+query, and road durations are 1.4× straight-line distance at 30 km/h.
+
+    server, base_url = start()            # background thread
+    ...
+    server.shutdown()
+"""
+import json
+import math
+import time
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+
+def _km(a, b):
+    dlat = math.radians(b[1] - a[1])
+    dlon = math.radians(b[0] - a[0])
+    h = (math.sin(dlat / 2) ** 2
+         + math.cos(math.radians(a[1])) * math.cos(math.radians(b[1]))
+         * math.sin(dlon / 2) ** 2)
+    return 6371 * 2 * math.atan2(math.sqrt(h), math.sqrt(1 - h))
+
+
+def _coords(path_part):
+    return [tuple(float(x) for x in pair.split(',')) for pair in path_part.split(';')]
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'     # keep-alive, like the real servers
+    disable_nagle_algorithm = True    # headers and body go out as separate writes
+    delay = 0.0                       # seconds of simulated upstream latency
+    max_table_size = 100              # router.project-osrm.org's /table limit
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.delay:
+            time.sleep(self.delay)
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+
+        if url.path == '/search':
+            digest = hashlib.md5(query.get('q', [''])[0].encode()).digest()
+            lon = 72.80 + digest[0] / 255 * 0.30
+            lat = 18.95 + digest[1] / 255 * 0.35
+            return self._send(200, [{'lon': str(lon), 'lat': str(lat)}])
+
+        if url.path.startswith('/route/v1/driving/'):
+            o, d = _coords(url.path.rsplit('/', 1)[1])[:2]
+            km = _km(o, d) * 1.4
+            return self._send(200, {'code': 'Ok', 'routes': [
+                {'duration': km / 30 * 3600, 'distance': km * 1000},
+            ]})
+
+        if url.path.startswith('/table/v1/driving/'):
+            points = _coords(url.path.rsplit('/', 1)[1])
+            if len(points) > self.max_table_size:
+                return self._send(400, {'code': 'TooBig'})
+            src = [int(i) for i in query['sources'][0].split(';')]
+            dst = [int(i) for i in query['destinations'][0].split(';')]
+            km = [[_km(points[i], points[j]) * 1.4 for j in dst] for i in src]
+            return self._send(200, {
+                'code':      'Ok',
+                'durations': [[k / 30 * 3600 for k in row] for row in km],
+                'distances': [[k * 1000 for k in row] for row in km],
+            })
+
+        self._send(404, {'code': 'NotFound'})
+
+
+def start(delay: float = 0.0, handler=StandinHandler):
+    """Start a stand-in server on a free localhost port; returns (server, base_url)."""
+    handler = type('Handler', (handler,), {'delay': delay})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+if __name__ == '__main__':
+    srv, base = start()
+    print(f"Stand-in Nominatim/OSRM listening on {base} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        srv.shutdown()
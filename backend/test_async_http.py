@@ -0,0 +1,104 @@
+"""
+Checks AsyncHttpClient's retry policy against the local stand-in
+(standin_server.py): every attempt passes the before_attempt hook, and
+Retry-After is honoured in full or ends the retries.
+
+    python test_async_http.py
+"""
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import requests
+
+import standin_server
+from services import aio
+from services.async_http import AsyncHttpClient
+
+
+def _busy_then_ok(retry_after, busy_calls=1):
+    calls = []
+
+    class Busy(standin_server.StandinHandler):
+        def do_GET(self):
+            calls.append(self.path)
+            if len(calls) <= busy_calls:
+                body = b'{}'
+                self.send_response(429)
+                self.send_header('Retry-After', str(retry_after))
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                super().do_GET()
+
+    return Busy, calls
+
+
+def test_every_attempt_takes_a_token():
+    handler, calls = _busy_then_ok(retry_after=1)
+    server, base = standin_server.start(handler=handler)
+    tokens = []
+
+    async def take_token():
+        tokens.append(time.monotonic())
+
+    try:
+        client = AsyncHttpClient(base, max_retry_after=5, before_attempt=take_token)
+        t0 = time.monotonic()
+        resp = aio.run(client.get('/search', params={'q': 'Thane'}))
+        assert resp.status_code == 200
+        assert len(calls) == 2 and len(tokens) == 2
+        assert time.monotonic() - t0 >= 1, "Retry-After was not honoured in full"
+    finally:
+        server.shutdown()
+
+
+def test_long_retry_after_gives_up():
+    handler, calls = _busy_then_ok(retry_after=30)
+    server, base = standin_server.start(handler=handler)
+    try:
+        client = AsyncHttpClient(base, max_retry_after=5)
+        t0 = time.monotonic()
+        resp = aio.run(client.get('/search', params={'q': 'Thane'}))
+        assert resp.status_code == 429
+        assert len(calls) == 1
+        assert time.monotonic() - t0 < 5
+    finally:
+        server.shutdown()
+
+
+def test_trickling_body_hits_the_total_timeout():
+    class Trickle(standin_server.StandinHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Length', '100')
+            self.end_headers()
+            try:
+                for _ in range(100):        # a byte every 0.1 s, well inside sock_read
+                    self.wfile.write(b' ')
+                    self.wfile.flush()
+                    time.sleep(0.1)
+            except OSError:
+                pass
+
+    server, base = standin_server.start(handler=Trickle)
+    try:
+        client = AsyncHttpClient(base, connect_timeout=0.5, read_timeout=0.5)
+        t0 = time.monotonic()
+        try:
+            aio.run(client.get('/search', params={'q': 'Thane'}))
+            raise AssertionError('expected a timeout')
+        except requests.exceptions.Timeout:
+            pass
+        assert time.monotonic() - t0 < 2
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    test_every_attempt_takes_a_token()
+    test_long_retry_after_gives_up()
+    test_trickling_body_hits_the_total_timeout()
+    print("OK")
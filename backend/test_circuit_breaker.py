@@ -0,0 +1,138 @@
+"""
+Checks CircuitBreaker's state transitions, and that traffic_service's
+OSRM calls always report back to it — against the local stand-in
+(standin_server.py) for the latter.
+
+    python test_circuit_breaker.py
+"""
+import sys
+import os
+import time
+import asyncio
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import standin_server
+from services import aio, traffic_service
+from services.circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+
+
+def _opened(probe_interval=0.05):
+    breaker = CircuitBreaker('test', window=4, min_calls=4, failure_rate=0.5,
+                             probe_interval=probe_interval)
+    for ok in (True, False, True, False):
+        assert breaker.allow()
+        breaker.record_success() if ok else breaker.record_failure()
+    assert breaker.state == OPEN
+    return breaker
+
+
+def test_opens_at_failure_rate():
+    breaker = CircuitBreaker('test', window=4, min_calls=4, failure_rate=0.5)
+    for _ in range(3):
+        breaker.record_failure()
+    assert breaker.state == CLOSED          # under min_calls
+    _opened()
+
+
+def test_open_short_circuits_until_probe_interval():
+    breaker = _opened(probe_interval=60)
+    assert not breaker.allow()
+    assert breaker.status()['short_circuited'] == 1
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = _opened()
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()              # the probe is still out
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.status()['recent_calls'] == 0
+
+
+def test_failed_probe_reopens():
+    breaker = _opened()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+
+def test_released_probe_lets_the_next_caller_probe():
+    breaker = _opened()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+
+
+# ---------------------------------------------------------------------------
+class NotJson(standin_server.StandinHandler):
+    def do_GET(self):
+        if self.path.startswith('/route'):
+            body = b'<html>upstream proxy error</html>'
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            return self.wfile.write(body)
+        super().do_GET()
+
+
+def _half_open_osrm(**standin):
+    server, base = standin_server.start(**standin)
+    old = traffic_service._osrm.base_url, traffic_service._osrm_breaker
+    traffic_service._osrm.base_url = base
+    traffic_service._osrm_breaker = _opened()
+    time.sleep(0.06)
+    return server, old
+
+
+def _restore(server, old):
+    traffic_service._osrm.base_url, traffic_service._osrm_breaker = old
+    server.shutdown()
+
+
+def test_probe_with_non_json_body_reopens():
+    server, old = _half_open_osrm(handler=NotJson)
+    try:
+        try:
+            aio.run(traffic_service._osrm_call('/route/v1/driving/72.8,19.0;72.9,19.1', {}))
+            raise AssertionError('expected a JSON decode error')
+        except ValueError:
+            pass
+        assert traffic_service._osrm_breaker.state == OPEN
+    finally:
+        _restore(server, old)
+
+
+def test_cancelled_probe_does_not_wedge_the_breaker():
+    server, old = _half_open_osrm(delay=1.0)
+    try:
+        async def cancelled_probe():
+            try:
+                await asyncio.wait_for(
+                    traffic_service._osrm_call('/route/v1/driving/72.8,19.0;72.9,19.1', {}), 0.1)
+            except asyncio.TimeoutError:
+                pass
+
+        aio.run(cancelled_probe())
+        breaker = traffic_service._osrm_breaker
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow(), 'the cancelled probe still holds the breaker'
+    finally:
+        _restore(server, old)
+
+
+if __name__ == '__main__':
+    test_opens_at_failure_rate()
+    test_open_short_circuits_until_probe_interval()
+    test_half_open_lets_one_probe_through()
+    test_failed_probe_reopens()
+    test_released_probe_lets_the_next_caller_probe()
+    test_probe_with_non_json_body_reopens()
+    test_cancelled_probe_does_not_wedge_the_breaker()
+    print("OK")
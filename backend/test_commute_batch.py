@@ -0,0 +1,49 @@
+"""
+Checks CommuteService.calculate_batch against the local stand-in
+(standin_server.py): an origin that does not geocode becomes an error
+entry while the rest of the batch is planned.
+
+    python test_commute_batch.py
+"""
+import sys
+import os
+import uuid
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import standin_server
+from services import traffic_service
+from services.commute_service import CommuteService
+
+UNKNOWN = f"Nowhere Lane {uuid.uuid4().hex}"
+
+
+class NoSuchAddress(standin_server.StandinHandler):
+    def do_GET(self):
+        if self.path.startswith('/search') and 'Nowhere' in self.path:
+            return self._send(200, [])
+        super().do_GET()
+
+
+def test_batch_with_one_bad_address():
+    server, base = standin_server.start(handler=NoSuchAddress)
+    old = traffic_service._nominatim.base_url, traffic_service._osrm.base_url
+    traffic_service._nominatim.base_url = traffic_service._osrm.base_url = base
+    try:
+        requests = [('Thane', '09:00', 0), (UNKNOWN, '09:00', 0),
+                    ('Dadar', '18:30', 5), ('Ghansoli', '08:15', 0)]
+        results = CommuteService().calculate_batch(requests)
+
+        assert len(results) == len(requests)
+        errors = [i for i, r in enumerate(results) if 'error' in r]
+        assert errors == [1], results
+        assert 'geocode' in results[1]['error']
+        for i in (0, 2, 3):
+            assert results[i]['road_route']['details']['duration'] != '~30 mins (est)'
+    finally:
+        traffic_service._nominatim.base_url, traffic_service._osrm.base_url = old
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    test_batch_with_one_bad_address()
+    print("OK")
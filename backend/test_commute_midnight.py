@@ -0,0 +1,41 @@
+"""
+Arrivals just after midnight: the train has to reach Vidyavihar before
+00:00, which no train of the arrival day can do, so the plan must come
+back by road — not with a train from the end of the same day and a
+negative duration. Road legs go to the local OSRM stand-in.
+
+    python test_commute_midnight.py
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import standin_server
+from services import traffic_service
+from services.commute_service import CommuteService, VIDYAVIHAR_TO_KJSCE_WALK_MINS
+
+
+def test_arrival_just_after_midnight_goes_by_road():
+    server, base = standin_server.start()
+    old_base = traffic_service._osrm.base_url
+    traffic_service._osrm.base_url = base
+    try:
+        cs = CommuteService()
+        assert cs._find_best_train('Thane', 3 - VIDYAVIHAR_TO_KJSCE_WALK_MINS, 0) is None
+
+        plan = cs.calculate_best_route('Thane', '00:03')
+        assert plan['train_route'] is None, plan['train_route']
+        assert plan['recommendation'] == 'Road'
+        assert plan['road_route']['total_duration_mins'] > 0
+
+        # Later the same night the table and the live lookup still agree
+        plan = cs.calculate_best_route('Thane', '23:50')
+        assert plan['train_route']['total_duration_mins'] > 0
+    finally:
+        traffic_service._osrm.base_url = old_base
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    test_arrival_just_after_midnight_goes_by_road()
+    print("OK")
@@ -0,0 +1,73 @@
+"""
+Checks GeocodeStore: normalised keys, negative entries, TTL expiry,
+size-bounded eviction, and that a broken file degrades to misses.
+
+    python test_geocode_store.py
+"""
+import sys
+import os
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.geocode_store import GeocodeStore
+
+
+def _store(**kwargs):
+    settings = dict(ttl_secs=3600, negative_ttl_secs=600, max_entries=1000)
+    settings.update(kwargs)
+    return GeocodeStore(os.path.join(tempfile.mkdtemp(), 'geocode.sqlite3'), **settings)
+
+
+def test_hit_miss_and_negative():
+    store = _store()
+    assert store.get('Thane West') == (False, None)
+
+    store.put('Thane West', (72.97, 19.19))
+    assert store.get('  thane   WEST ') == (True, (72.97, 19.19))
+
+    store.put_negative('Nowhere Lane')
+    assert store.get('nowhere lane') == (True, None)
+
+    stats = store.stats()
+    assert (stats['hits'], stats['negative_hits'], stats['misses']) == (1, 1, 1)
+
+
+def test_shared_between_instances():
+    store = _store()
+    store.put('Dadar', (72.84, 19.02))
+    other = GeocodeStore(store.path, ttl_secs=3600, negative_ttl_secs=600, max_entries=1000)
+    assert other.get('dadar') == (True, (72.84, 19.02))
+
+
+def test_expired_entries_are_misses():
+    store = _store(ttl_secs=0, negative_ttl_secs=0)
+    store.put('Thane', (72.97, 19.19))
+    store.put_negative('Nowhere Lane')
+    assert store.get('Thane') == (False, None)
+    assert store.get('Nowhere Lane') == (False, None)
+
+
+def test_eviction_keeps_the_newest():
+    store = _store(max_entries=3)
+    store.EVICT_EVERY = 1
+    for i in range(5):
+        store.put(f"address {i}", (72.0 + i, 19.0))
+    found = [store.get(f"address {i}")[0] for i in range(5)]
+    assert found == [False, False, True, True, True], found
+
+
+def test_broken_file_degrades_to_misses():
+    store = GeocodeStore(os.path.join(tempfile.mkdtemp(), 'missing', 'geocode.sqlite3'),
+                         ttl_secs=3600, negative_ttl_secs=600, max_entries=1000)
+    store.put('Thane', (72.97, 19.19))
+    assert store.get('Thane') == (False, None)
+    assert store.stats()['errors'] == 2
+
+
+if __name__ == '__main__':
+    test_hit_miss_and_negative()
+    test_shared_between_instances()
+    test_expired_entries_are_misses()
+    test_eviction_keeps_the_newest()
+    test_broken_file_degrades_to_misses()
+    print("OK")
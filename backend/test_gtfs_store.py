@@ -0,0 +1,107 @@
+"""
+Checks the GTFS compiler and loader on a tiny hand-written feed:
+platforms merge into their station, service_ids filter trips, times run
+past midnight, and a zip compiles the same as a directory. The loaded
+timetable answers TrainService queries.
+
+    python test_gtfs_store.py
+"""
+import sys
+import os
+import tempfile
+import zipfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services import gtfs_store
+from services.train_service import TrainService
+
+FEED = {
+    'stops.txt': """stop_id,stop_name,parent_station
+THN,Thane Railway Station,
+THN1,Thane Platform 1,THN
+THN2,Thane Platform 2,THN
+GC,Ghatkopar,
+VVH,Vidyavihar Station,
+""",
+    'routes.txt': """route_id,route_short_name,route_long_name
+SLOW,Slow,Central Slow
+""",
+    'trips.txt': """route_id,service_id,trip_id
+SLOW,WEEKDAY,T1
+SLOW,WEEKDAY,T2
+SLOW,SUNDAY,T3
+""",
+    'stop_times.txt': """trip_id,arrival_time,departure_time,stop_id,stop_sequence
+T1,08:00:00,08:01:00,THN1,1
+T1,08:02:00,08:03:00,THN2,2
+T1,08:15:00,08:15:00,GC,3
+T1,08:20:00,08:20:00,VVH,4
+T2,23:50:00,23:50:00,THN1,1
+T2,24:05:00,24:05:00,GC,2
+T2,24:10:00,24:10:00,VVH,3
+T3,09:00:00,09:00:00,THN1,1
+T3,09:20:00,09:20:00,VVH,2
+""",
+}
+
+
+def _feed_dir():
+    path = tempfile.mkdtemp()
+    for name, text in FEED.items():
+        with open(os.path.join(path, name), 'w') as f:
+            f.write(text)
+    return path
+
+
+def test_compile_and_load():
+    out = os.path.join(tempfile.mkdtemp(), 'timetable.bin')
+    summary = gtfs_store.compile_feed(_feed_dir(), out, service_ids={'WEEKDAY'})
+    assert summary == {'stations': 3, 'trips': 2, 'stop_times': 6}, summary
+
+    timetable = gtfs_store.load(out)
+    assert sorted(timetable.stations) == ['Ghatkopar', 'Thane', 'Vidyavihar']
+    rides = list(timetable.departures('Thane', 'Vidyavihar', 0, 5))
+    # T1's two Thane platforms collapse into one stop: in at 08:00, out at 08:03
+    assert [(timetable.trip_ids[t], dep, arr) for t, dep, arr in rides] == \
+        [('T1', 8 * 60 + 3, 8 * 60 + 20), ('T2', 23 * 60 + 50, 24 * 60 + 10)]
+    assert timetable.trip_types[rides[0][0]] == 'Slow'
+    assert list(timetable.departures('Vidyavihar', 'Thane', 0, 5)) == []
+
+
+def test_zip_matches_directory():
+    feed = _feed_dir()
+    zipped = os.path.join(tempfile.mkdtemp(), 'feed.zip')
+    with zipfile.ZipFile(zipped, 'w') as zf:
+        for name in FEED:
+            zf.write(os.path.join(feed, name), name)
+
+    out_dir, out_zip = (os.path.join(tempfile.mkdtemp(), 't.bin') for _ in range(2))
+    gtfs_store.compile_feed(feed, out_dir)
+    gtfs_store.compile_feed(zipped, out_zip)
+    with open(out_dir, 'rb') as a, open(out_zip, 'rb') as b:
+        assert a.read() == b.read()
+
+
+def test_train_service_uses_the_compiled_feed():
+    out = os.path.join(tempfile.mkdtemp(), 'timetable.bin')
+    gtfs_store.compile_feed(_feed_dir(), out, service_ids={'WEEKDAY'})
+    trains = TrainService(timetable_path=out)
+    assert trains.latest_departure_arriving_by('Thane', 'Vidyavihar', '09:00') is not None
+    assert [t['departure'] for t in trains.get_next_trains('Thane', 'Vidyavihar', '07:00')] \
+        == ['08:03', '23:50']
+
+
+def test_invalid_or_missing_file_loads_as_none():
+    bad = os.path.join(tempfile.mkdtemp(), 'timetable.bin')
+    with open(bad, 'wb') as f:
+        f.write(b'not a timetable')
+    assert gtfs_store.load(bad) is None
+    assert gtfs_store.load(bad + '.missing') is None
+
+
+if __name__ == '__main__':
+    test_compile_and_load()
+    test_zip_matches_directory()
+    test_train_service_uses_the_compiled_feed()
+    test_invalid_or_missing_file_loads_as_none()
+    print("OK")
@@ -0,0 +1,68 @@
+"""
+Checks JourneyPlanner against a brute-force scan of every trip on the
+synthetic four-line timetable.
+
+    python test_journey_planner.py
+"""
+import sys
+import os
+import random
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.journey_planner import INF
+from services.train_service import TrainService
+
+MAX_TRANSFERS = 2
+
+
+def _brute_force_arrival(planner, source, dest, depart_min):
+    """Earliest arrival with at most MAX_TRANSFERS changes, trip by trip."""
+    tt = planner.timetable
+    reach = [INF] * len(tt.stations)
+    reach[source] = depart_min
+    ready = {source: depart_min}
+    for _round in range(MAX_TRANSFERS + 1):
+        new = list(reach)
+        for t in range(len(tt.trip_ids)):
+            boarded = False
+            for r in range(tt.trip_ptr[t], tt.trip_ptr[t + 1]):
+                s = tt.st_station[r]
+                if boarded and tt.st_arr[r] < new[s]:
+                    new[s] = tt.st_arr[r]
+                if s in ready and ready[s] <= tt.st_dep[r]:
+                    boarded = True
+        reach = new
+        ready = {s: a + planner._change[s] for s, a in enumerate(reach) if a < INF}
+        ready[source] = depart_min
+    return reach[dest]
+
+
+def test_earliest_arrival_matches_brute_force():
+    planner = TrainService().planner
+    names = planner.timetable.stations
+    rng = random.Random(5)
+    for _ in range(100):
+        a, b = rng.sample(names, 2)
+        depart = rng.randrange(5 * 60, 22 * 60)
+        journey = planner.earliest_arrival(a, b, depart, MAX_TRANSFERS)
+        expected = _brute_force_arrival(planner, planner.timetable.station_idx[a],
+                                        planner.timetable.station_idx[b], depart)
+        assert (journey['arrival'] if journey else INF) == expected, (a, b, depart)
+
+
+def test_latest_departure_is_on_the_profile():
+    trains = TrainService()
+    journey = trains.latest_journey_arriving_by('Andheri', 'Vidyavihar', '09:00')
+    assert journey['transfers'] == 1
+    assert journey['legs'][0]['to'] == 'Dadar'
+    assert journey['arrival'] <= '09:00'
+
+    profile = trains.journey_profile('Andheri', 'Vidyavihar', '07:00', '09:00')
+    best = max((j for j in profile if j['arrival'] <= '09:00'), key=lambda j: j['departure'])
+    assert best['departure'] == journey['departure']
+
+
+if __name__ == '__main__':
+    test_earliest_arrival_matches_brute_force()
+    test_latest_departure_is_on_the_profile()
+    print("OK")
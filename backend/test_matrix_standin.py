@@ -0,0 +1,117 @@
+"""
+Checks TrafficService.get_travel_time_matrix against the local OSRM
+stand-in (standin_server.py) — no public servers involved.
+
+    python test_matrix_standin.py
+"""
+import sys
+import os
+from contextlib import contextmanager
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import standin_server
+from services import traffic_service
+from services.traffic_service import TrafficService, STATION_COORDS
+
+
+@contextmanager
+def _standin(handler=standin_server.StandinHandler):
+    """Point OSRM at a stand-in for the duration of the block, then put it back."""
+    server, base = standin_server.start(handler=handler)
+    old_base = traffic_service._osrm.base_url
+    traffic_service._osrm.base_url = base
+    try:
+        yield
+    finally:
+        traffic_service._osrm.base_url = old_base
+        server.shutdown()
+
+
+def test_matrix_chunks_large_tables():
+    calls = []
+
+    class Counting(standin_server.StandinHandler):
+        max_table_size = 10
+
+        def do_GET(self):
+            calls.append(self.path)
+            super().do_GET()
+
+    with _standin(Counting):
+        old_limit = traffic_service.Config.OSRM_TABLE_MAX_LOCATIONS
+        traffic_service.Config.OSRM_TABLE_MAX_LOCATIONS = 10
+        try:
+            stations = list(STATION_COORDS.values())
+            origins, destinations = stations[:12], stations[12:20]
+            result = TrafficService().get_travel_time_matrix(origins, destinations)
+
+            assert len(calls) > 1, "expected the table to be split into chunks"
+            assert len(result['durations_seconds']) == 12
+            assert all(len(row) == 8 for row in result['durations_seconds'])
+            assert not any(any(row) for row in result['fallback'])
+
+            # Stand-in answers 1.4 × straight line at 30 km/h — same as /route
+            single = TrafficService()._osrm_route(tuple(origins[0]), tuple(destinations[0]))
+            assert abs(result['durations_seconds'][0][0] - single['duration_seconds']) <= 1
+        finally:
+            traffic_service.Config.OSRM_TABLE_MAX_LOCATIONS = old_limit
+
+
+def test_matrix_falls_back_to_haversine():
+    class Down(standin_server.StandinHandler):
+        def do_GET(self):
+            self._send(503, {'code': 'Unavailable'})
+
+    with _standin(Down):
+        old_retries = traffic_service._osrm.max_retries
+        traffic_service._osrm.max_retries = 0
+        try:
+            origins = [STATION_COORDS['Thane'], STATION_COORDS['Dadar']]
+            destinations = [STATION_COORDS['KJSCE']]
+            result = TrafficService().get_travel_time_matrix(origins, destinations)
+
+            assert result['fallback'] == [[True], [True]]
+            expected = TrafficService()._haversine_fallback(origins[0], destinations[0])
+            assert result['durations_seconds'][0][0] == expected['duration_seconds']
+        finally:
+            traffic_service._osrm.max_retries = old_retries
+
+
+def test_matrix_null_duration_cell():
+    # OSRM answers null for an unroutable pair; here its distance survives
+    class NullDuration(standin_server.StandinHandler):
+        def _send(self, status, payload):
+            if isinstance(payload, dict) and 'durations' in payload:
+                payload['durations'][0][0] = None
+            super()._send(status, payload)
+
+    with _standin(NullDuration):
+        origins = [STATION_COORDS['Thane'], STATION_COORDS['Dadar']]
+        destinations = [STATION_COORDS['KJSCE']]
+        result = TrafficService().get_travel_time_matrix(origins, destinations)
+
+        assert result['fallback'] == [[True], [False]]
+        expected = TrafficService()._haversine_fallback(origins[0], destinations[0])
+        assert result['durations_seconds'][0][0] == expected['duration_seconds']
+        assert result['distances_km'][0][0] is not None
+        assert result['durations_seconds'][1][0] is not None
+
+
+def test_matrix_malformed_points():
+    with _standin():
+        origins = [['a', 1], [72.9], STATION_COORDS['Thane'], [float('nan'), 19.0]]
+        destinations = [STATION_COORDS['KJSCE']]
+        result = TrafficService().get_travel_time_matrix(origins, destinations)
+
+        assert [('error' in p) for p in result['origins']] == [True, True, False, True]
+        assert [row[0] is None for row in result['durations_seconds']] == \
+            [True, True, False, True]
+        assert result['fallback'] == [[False]] * 4
+
+
+if __name__ == '__main__':
+    test_matrix_chunks_large_tables()
+    test_matrix_falls_back_to_haversine()
+    test_matrix_null_duration_cell()
+    test_matrix_malformed_points()
+    print("OK")
@@ -0,0 +1,55 @@
+"""
+Checks MLService's persistence against a throwaway model directory:
+the saved prediction table is reused on the next load.
+
+    python test_ml_service.py
+"""
+import sys
+import os
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+_tmp = tempfile.mkdtemp()
+os.environ['ML_MODEL_PATH'] = os.path.join(_tmp, 'model.joblib')
+os.environ['TRIP_STORE_PATH'] = os.path.join(_tmp, 'trips')
+os.environ['ML_ESTIMATOR'] = 'forest'
+
+import numpy as np
+
+from services import ml_service
+from services.ml_service import MLService
+
+
+def test_saved_table_is_reused():
+    trained = MLService()                 # empty store: trains on the seed and saves
+    assert os.path.exists(ml_service.TABLE_PATH)
+
+    table = MLService._load_table(trained._model_version)
+    assert table is not None
+    assert np.array_equal(table, trained.table)
+
+    compiled = []
+    original = MLService.compile_table
+    MLService.compile_table = staticmethod(lambda model: compiled.append(model) or original(model))
+    try:
+        reloaded = MLService()
+    finally:
+        MLService.compile_table = staticmethod(original)
+    assert not compiled, "table was recompiled instead of loaded"
+    assert np.array_equal(reloaded.table, trained.table)
+
+
+def test_table_from_another_model_is_ignored():
+    service = MLService()
+    assert MLService._load_table((0, 0)) is None
+    # A newer model file (another worker's save) invalidates the table
+    with open(ml_service.MODEL_PATH, 'rb') as f:
+        model_bytes = f.read()
+    service._atomic_write(ml_service.MODEL_PATH, lambda f: f.write(model_bytes))
+    assert MLService._load_table(MLService._file_version(ml_service.MODEL_PATH)) is None
+
+
+if __name__ == '__main__':
+    test_saved_table_is_reused()
+    test_table_from_another_model_is_ignored()
+    print("OK")
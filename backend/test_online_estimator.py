@@ -0,0 +1,74 @@
+"""
+Checks EwmaEstimator: per-cell decayed means, borrowing for empty cells,
+update_many matching one-at-a-time updates, and save/load.
+
+    python test_online_estimator.py
+"""
+import sys
+import os
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from services.online_estimator import EwmaEstimator
+
+
+def test_old_trips_count_half_after_half_life():
+    est = EwmaEstimator(bucket_mins=15, half_life=2)
+    for duration in (100, 0, 0):
+        est.update(8, 0, 0, duration)
+    expected = 100 * 0.5 / (0.5 + 0.5 ** 0.5 + 1)
+    assert abs(est.table[0, 8, 0] - expected) < 1e-3
+    assert est.table[0, 8, 14] == est.table[0, 8, 0]     # same 15-minute bucket
+
+
+def test_empty_cells_borrow():
+    est = EwmaEstimator(bucket_mins=60)
+    est.update(8, 0, 0, 40)
+    est.update(23, 0, 0, 60)
+    est.update(12, 0, 2, 20)
+    assert est.table[0, 10, 0] == 40            # nearest filled hour
+    assert est.table[0, 1, 0] == 60             # wraps round midnight to 23:00
+    assert est.table[2, 0, 0] == 20             # a day with one bucket fills from it
+    assert abs(est.table[5, 8, 0] - 40) < 1e-4  # a day with no trips: the overall mean
+
+
+def test_update_many_matches_update():
+    rng = np.random.default_rng(7)
+    n = 500
+    hours, minutes = rng.integers(6, 11, n), rng.integers(0, 60, n)
+    days, durations = rng.integers(0, 7, n), rng.uniform(20, 90, n)
+
+    one_by_one = EwmaEstimator()
+    for trip in zip(hours, minutes, days, durations):
+        one_by_one.update(*(int(v) for v in trip[:3]), float(trip[3]))
+    batched = EwmaEstimator()
+    batched.update_many(hours[:200], minutes[:200], days[:200], durations[:200])
+    batched.update_many(hours[200:], minutes[200:], days[200:], durations[200:])
+
+    assert np.allclose(batched.weight, one_by_one.weight, rtol=1e-4)
+    assert np.allclose(batched.table, one_by_one.table, rtol=1e-4)
+
+
+def test_save_and_load():
+    est = EwmaEstimator()
+    est.fit([8, 9], [0, 30], [0, 1], [40, 50])
+    path = os.path.join(tempfile.mkdtemp(), 'ewma.npz')
+    with open(path, 'wb') as f:
+        est.save(f, trips_seen=2)
+
+    restored = EwmaEstimator()
+    assert restored.load(path) == {'trips_seen': 2}
+    assert np.array_equal(restored.table, est.table)
+
+    assert EwmaEstimator(bucket_mins=30).load(path) is None
+    assert EwmaEstimator().load(os.path.join(tempfile.mkdtemp(), 'missing.npz')) is None
+
+
+if __name__ == '__main__':
+    test_old_trips_count_half_after_half_life()
+    test_empty_cells_borrow()
+    test_update_many_matches_update()
+    test_save_and_load()
+    print("OK")
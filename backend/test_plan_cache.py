@@ -0,0 +1,76 @@
+"""
+Checks the commute plan cache: LRUCache's TTL, LRU eviction and stale
+window, and CommuteService.cached_best_route going miss → hit → stale →
+hit again once the background refresh lands. Road legs go to the local
+OSRM stand-in (standin_server.py).
+
+    python test_plan_cache.py
+"""
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import standin_server
+from services import traffic_service
+from services.cache import LRUCache
+from services.commute_service import CommuteService
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2, ttl_secs=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1          # 'b' is now the oldest
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+
+
+def test_ttl_and_stale_window():
+    cache = LRUCache(max_entries=10, ttl_secs=0.05, stale_secs=0.1)
+    cache.set('k', 'v')
+    value, fresh_for = cache.get_with_freshness('k')
+    assert value == 'v' and fresh_for > 0
+
+    time.sleep(0.06)
+    assert cache.get('k') is None                   # expired for plain get
+    value, fresh_for = cache.get_with_freshness('k')
+    assert value == 'v' and fresh_for <= 0          # but still served stale
+
+    time.sleep(0.1)
+    assert cache.get_with_freshness('k') == (None, None)
+    assert len(cache) == 0
+
+
+def test_cached_best_route_revalidates_in_background():
+    server, base = standin_server.start()
+    old_base = traffic_service._osrm.base_url
+    traffic_service._osrm.base_url = base
+    try:
+        cs = CommuteService()
+        cs.plan_cache = LRUCache(max_entries=10, ttl_secs=0.2, stale_secs=60)
+
+        plan, etag, _fresh, status = cs.cached_best_route('Thane', '09:00')
+        assert status == 'miss'
+        again, same_etag, _fresh, status = cs.cached_best_route('  THANE ', '09:00')
+        assert status == 'hit' and same_etag == etag and again == plan
+
+        time.sleep(0.25)
+        stale, stale_etag, fresh_for, status = cs.cached_best_route('Thane', '09:00')
+        assert status == 'stale' and stale_etag == etag and fresh_for == 0
+
+        deadline = time.monotonic() + 5
+        while cs.cached_best_route('Thane', '09:00')[3] != 'hit':
+            assert time.monotonic() < deadline, 'background refresh never landed'
+            time.sleep(0.02)
+    finally:
+        traffic_service._osrm.base_url = old_base
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    test_lru_evicts_least_recently_used()
+    test_ttl_and_stale_window()
+    test_cached_best_route_revalidates_in_background()
+    print("OK")
@@ -0,0 +1,68 @@
+"""
+Checks POST /api/predict/batch through Flask's test client against a
+throwaway model directory: every cell matches /api/predict, and bad
+times, day ranges and oversized batches are 400s.
+
+    python test_predict_batch.py
+"""
+import sys
+import os
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+_tmp = tempfile.mkdtemp()
+os.environ['ML_MODEL_PATH'] = os.path.join(_tmp, 'model.joblib')
+os.environ['TRIP_STORE_PATH'] = os.path.join(_tmp, 'trips')
+
+from app import app
+
+client = app.test_client()
+
+
+def _batch(body):
+    resp = client.post('/api/predict/batch', json=body)
+    return resp.status_code, resp.get_json()
+
+
+def test_batch_matches_single_predictions():
+    status, result = _batch({'times': {'from': '08:00', 'to': '09:00', 'step_mins': 15},
+                             'days': [0, 5]})
+    assert status == 200, result
+    assert result['times'] == ['08:00', '08:15', '08:30', '08:45', '09:00']
+    assert result['days'] == [0, 5]
+    grid = result['predicted_duration_mins']
+    assert len(grid) == 2 and all(len(row) == 5 for row in grid)
+
+    for i, day in enumerate(result['days']):
+        for j, hhmm in enumerate(result['times']):
+            single = client.post('/api/predict', json={'time': hhmm, 'day_of_week': day})
+            assert abs(single.get_json()['predicted_duration_mins'] - grid[i][j]) < 0.01
+
+
+def test_default_days_are_the_whole_week():
+    status, result = _batch({'times': ['07:30', '18:05']})
+    assert status == 200 and result['days'] == list(range(7))
+
+
+def test_bad_requests_are_rejected():
+    bad = [
+        {'times': ['8:00']},
+        {'times': ['08:60']},
+        {'times': []},
+        {'times': ['08:00'], 'days': [7]},
+        {'times': ['08:00'], 'days': [True]},
+        {'times': ['08:00'], 'days': {'from': 0, 'to': 10 ** 7}},
+        {'times': {'from': '09:00', 'to': '08:00'}},
+        {'times': {'from': '08:00', 'to': '09:00', 'step_mins': 0}},
+        {'times': ['08:00'] * 1441, 'days': {'from': 0, 'to': 6}},
+    ]
+    for body in bad:
+        status, result = _batch(body)
+        assert status == 400 and 'error' in result, (body, status, result)
+
+
+if __name__ == '__main__':
+    test_batch_matches_single_predictions()
+    test_default_days_are_the_whole_week()
+    test_bad_requests_are_rejected()
+    print("OK")
@@ -0,0 +1,54 @@
+"""
+Checks the service registry: each service is built once per process,
+even when many threads ask for it at the same moment, and dependent
+services share the registry's instances.
+
+    python test_registry.py
+"""
+import sys
+import os
+import time
+import tempfile
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault('GEOCODE_DB_PATH', os.path.join(tempfile.mkdtemp(), 'geocode.sqlite3'))
+
+from services import registry
+
+
+def test_concurrent_get_builds_once():
+    builds = []
+
+    def slow_builder():
+        builds.append(threading.get_ident())
+        time.sleep(0.05)
+        return object()
+
+    registry._BUILDERS['probe'] = slow_builder
+    try:
+        got = []
+        threads = [threading.Thread(target=lambda: got.append(registry.get('probe')))
+                   for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(builds) == 1
+        assert len(got) == 8 and all(g is got[0] for g in got)
+    finally:
+        registry._BUILDERS.pop('probe', None)
+        registry._instances.pop('probe', None)
+
+
+def test_commute_shares_traffic_and_trains():
+    commute = registry.get('commute')
+    assert commute.traffic is registry.get('traffic')
+    assert commute.trains is registry.get('trains')
+    assert registry.get('commute') is commute
+
+
+if __name__ == '__main__':
+    test_concurrent_get_builds_once()
+    test_commute_shares_traffic_and_trains()
+    print("OK")
@@ -0,0 +1,88 @@
+"""
+Checks TrafficService's route cache against the local OSRM stand-in
+(standin_server.py): points a few metres apart share one OSRM call, and
+a Haversine fallback is only cached for ROUTE_CACHE_FALLBACK_TTL_SECS.
+
+    python test_route_cache.py
+"""
+import sys
+import os
+from contextlib import contextmanager
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import standin_server
+from services import traffic_service
+from services.traffic_service import TrafficService, STATION_COORDS
+
+
+@contextmanager
+def _standin(handler):
+    server, base = standin_server.start(handler=handler)
+    old_base = traffic_service._osrm.base_url
+    traffic_service._osrm.base_url = base
+    try:
+        yield
+    finally:
+        traffic_service._osrm.base_url = old_base
+        server.shutdown()
+
+
+def _counting(down=None):
+    calls = []
+
+    class Counting(standin_server.StandinHandler):
+        def do_GET(self):
+            if self.path.startswith('/route'):
+                calls.append(self.path)
+                if down and down[0]:
+                    return self._send(503, {'code': 'Unavailable'})
+            super().do_GET()
+
+    return Counting, calls
+
+
+def _service():
+    ts = TrafficService()
+    ts.offline_router = None      # every miss goes to OSRM
+    return ts
+
+
+def test_nearby_points_share_a_route():
+    handler, calls = _counting()
+    with _standin(handler):
+        ts = _service()
+        thane, kjsce = STATION_COORDS['Thane'], STATION_COORDS['KJSCE']
+        first = ts.get_travel_time_coords(thane, kjsce)
+        nudged = ts.get_travel_time_coords([thane[0] + 0.00001, thane[1]], kjsce)
+        assert len(calls) == 1 and nudged == first
+
+        ts.get_travel_time_coords(STATION_COORDS['Dadar'], kjsce)
+        assert len(calls) == 2
+        assert ts.route_cache.stats()['hits'] == 1
+
+
+def test_fallback_is_cached_briefly():
+    down = [True]
+    handler, calls = _counting(down)
+    old_retries = traffic_service._osrm.max_retries
+    old_ttl = traffic_service.Config.ROUTE_CACHE_FALLBACK_TTL_SECS
+    traffic_service._osrm.max_retries = 0
+    traffic_service.Config.ROUTE_CACHE_FALLBACK_TTL_SECS = 0
+    try:
+        with _standin(handler):
+            ts = _service()
+            thane, kjsce = STATION_COORDS['Thane'], STATION_COORDS['KJSCE']
+            assert ts.get_travel_time_coords(thane, kjsce).get('fallback')
+
+            down[0] = False
+            live = ts.get_travel_time_coords(thane, kjsce)
+            assert not live.get('fallback') and len(calls) == 2
+    finally:
+        traffic_service._osrm.max_retries = old_retries
+        traffic_service.Config.ROUTE_CACHE_FALLBACK_TTL_SECS = old_ttl
+
+
+if __name__ == '__main__':
+    test_nearby_points_share_a_route()
+    test_fallback_is_cached_briefly()
+    print("OK")
@@ -0,0 +1,91 @@
+"""
+Checks the Nominatim throttle: TokenBucket paces callers first come,
+first served and turns away those who would wait too long;
+AsyncSingleFlight runs concurrent identical calls once.
+
+    python test_throttle.py
+"""
+import sys
+import os
+import asyncio
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.throttle import TokenBucket, AsyncSingleFlight, RateLimitExceeded
+
+
+def test_bucket_queues_in_order():
+    bucket = TokenBucket(rate=10, capacity=2, max_wait=1.0)
+    waits = [bucket.reserve() for _ in range(5)]
+    assert waits[:2] == [0.0, 0.0]                  # the burst
+    assert all(0 < a < b for a, b in zip(waits[2:], waits[3:]))
+    assert abs(waits[2] - 0.1) < 0.01 and abs(waits[4] - 0.3) < 0.01
+
+
+def test_bucket_rejects_past_max_wait():
+    bucket = TokenBucket(rate=1, capacity=1, max_wait=1.5)
+    bucket.reserve()
+    bucket.reserve()                                # waits ~1 s
+    try:
+        bucket.reserve()                            # would wait ~2 s
+        raise AssertionError('expected RateLimitExceeded')
+    except RateLimitExceeded:
+        pass
+    assert bucket.rejected == 1
+
+
+def test_acquire_async_sleeps_for_its_token():
+    bucket = TokenBucket(rate=20, capacity=1)
+
+    async def three():
+        loop = asyncio.get_running_loop()
+        t0 = loop.time()
+        for _ in range(3):
+            await bucket.acquire_async()
+        return loop.time() - t0
+
+    assert asyncio.run(three()) >= 0.09
+
+
+def test_single_flight_shares_one_call():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def geocode():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return (72.97, 19.19)
+
+    async def many():
+        same = await asyncio.gather(*(flight.do('thane', geocode) for _ in range(5)))
+        later = await flight.do('thane', geocode)
+        return same, later
+
+    same, later = asyncio.run(many())
+    assert same == [(72.97, 19.19)] * 5 and later == (72.97, 19.19)
+    assert len(calls) == 2 and flight.shared == 4
+
+
+def test_single_flight_survives_a_cancelled_caller():
+    flight = AsyncSingleFlight()
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return 'done'
+
+    async def run():
+        first = asyncio.ensure_future(flight.do('k', slow))
+        second = asyncio.ensure_future(flight.do('k', slow))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == 'done'
+
+
+if __name__ == '__main__':
+    test_bucket_queues_in_order()
+    test_bucket_rejects_past_max_wait()
+    test_acquire_async_sleeps_for_its_token()
+    test_single_flight_shares_one_call()
+    test_single_flight_survives_a_cancelled_caller()
+    print("OK")
@@ -0,0 +1,57 @@
+"""
+Checks Timetable's integer-minute lookups on hand-built trips: departures
+come back earliest first and in the right direction only, and
+latest_arriving_by picks the latest departure even when a fast train
+overtakes a slow one.
+
+    python test_timetable.py
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.timetable import Timetable, to_minutes, format_minutes
+
+TRIPS = [
+    # trip_id, type, [(station, arr, dep)] — minutes since midnight
+    ('S1', 'Slow', [('Thane', 480, 480), ('Ghatkopar', 500, 501), ('Vidyavihar', 505, 505)]),
+    ('F1', 'Fast', [('Thane', 490, 490), ('Ghatkopar', 502, 502), ('Vidyavihar', 504, 504)]),
+    ('S2', 'Slow', [('Thane', 510, 510), ('Vidyavihar', 535, 535)]),
+    ('UP', 'Slow', [('Vidyavihar', 500, 500), ('Thane', 525, 525)]),
+    ('NT', 'Slow', [('Thane', 1430, 1430), ('Vidyavihar', 1455, 1455)]),
+]
+
+
+def test_departures_are_earliest_first_and_directional():
+    tt = Timetable.from_trips(TRIPS)
+    rides = [(tt.trip_ids[t], dep, arr)
+             for t, dep, arr in tt.departures('Thane', 'Vidyavihar', 485, 5)]
+    assert rides == [('F1', 490, 504), ('S2', 510, 535), ('NT', 1430, 1455)]
+    assert [tt.trip_ids[t] for t, _d, _a in tt.departures('Vidyavihar', 'Thane', 0, 5)] == ['UP']
+    assert list(tt.departures('Thane', 'Nowhere', 0, 5)) == []
+    assert len(list(tt.departures('Thane', 'Vidyavihar', 0, 2))) == 2
+
+
+def test_latest_arriving_by_handles_overtaking():
+    tt = Timetable.from_trips(TRIPS)
+    # S1 arrives 505 but F1 (leaves later, arrives 504) is the better train
+    trip, dep, arr = tt.latest_arriving_by('Thane', 'Vidyavihar', 505)
+    assert (tt.trip_ids[trip], dep, arr) == ('F1', 490, 504)
+    assert tt.latest_arriving_by('Thane', 'Vidyavihar', 503) is None
+
+    deadlines = [479, 504, 534, 535, 1500]
+    swept = tt.latest_arriving_by_sweep('Thane', 'Vidyavihar', deadlines)
+    assert swept == [tt.latest_arriving_by('Thane', 'Vidyavihar', d) for d in deadlines]
+
+
+def test_minutes_round_trip_past_midnight():
+    assert to_minutes('08:05') == 485
+    assert format_minutes(485) == '08:05'
+    assert format_minutes(1455) == '00:15'
+
+
+if __name__ == '__main__':
+    test_departures_are_earliest_first_and_directional()
+    test_latest_arriving_by_handles_overtaking()
+    test_minutes_round_trip_past_midnight()
+    print("OK")
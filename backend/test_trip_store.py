@@ -0,0 +1,76 @@
+"""
+Checks TripStore: appends line up across columns, compaction keeps the
+newest trips inside retention, and unlocked readers survive a compaction
+removing the generation they were about to read.
+
+    python test_trip_store.py
+"""
+import sys
+import os
+import time
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.trip_store import TripStore
+
+
+def _store(**kwargs):
+    return TripStore(os.path.join(tempfile.mkdtemp(), 'trips'), **kwargs)
+
+
+def test_append_and_read_back():
+    store = _store()
+    assert len(store) == 0
+    assert store.append(8, 30, 0, 42.5) == (store.generation, 0)
+    assert store.append_many([9, 18], [0, 45], [1, 4], [30.0, 55.0]) == (store.generation, 1)
+
+    cols = store.arrays()
+    assert len(store) == 3
+    assert cols['hour'].tolist() == [8, 9, 18]
+    assert cols['duration'].tolist() == [42.5, 30.0, 55.0]
+
+
+def test_seed_only_into_an_empty_store():
+    store = _store()
+    assert store.seed([8], [0], [0], [40.0])
+    assert not store.seed([9], [0], [0], [50.0])
+    assert len(store) == 1
+
+
+def test_compact_keeps_newest_within_retention():
+    store = _store(retention_days=1, max_rows=2)
+    now = time.time()
+    store.append_many([6, 7, 8, 9], [0, 0, 0, 0], [0, 0, 0, 0], [1.0, 2.0, 3.0, 4.0],
+                      recorded_at=[now - 3 * 86400, now - 60, now - 30, now])
+    assert store.needs_compaction()
+    old = store.generation
+
+    assert store.compact() == 2
+    assert store.generation != old
+    assert store.arrays()['duration'].tolist() == [3.0, 4.0]
+    assert not os.path.exists(os.path.join(store.path, old))
+
+
+def test_readers_retry_a_compacted_generation():
+    store = _store()
+    store.append_many([8, 9], [0, 0], [0, 0], [1.0, 2.0])
+    stale = store._generation()
+    store.compact()
+
+    # Read CURRENT just before compact() switched it and removed the old dir
+    reads = [stale]
+    live = store._generation
+    store._generation = lambda: reads.pop() if reads else live()
+    assert len(store) == 2
+
+    reads.append(stale)
+    gen, cols = store.snapshot()
+    assert gen == os.path.basename(live()) and len(cols['hour']) == 2
+
+
+if __name__ == '__main__':
+    test_append_and_read_back()
+    test_seed_only_into_an_empty_store()
+    test_compact_keeps_newest_within_retention()
+    test_readers_retry_a_compacted_generation()
+    print("OK")